@@ -46,6 +46,11 @@ with open("README.md") as fp:
 
 extras_require = {
     "aiohttp": ["aiohttp~=3.8"],
+    "numpy": ["numpy"],
+    "pandas": ["pandas"],
+    "lz4": ["lz4"],
+    "zstd": ["zstandard"],
+    "orjson": ["orjson"],
 }
 
 setup(
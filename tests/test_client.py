@@ -13,9 +13,12 @@
 # limitations under the License.
 #
 import array
+import concurrent.futures
 import datetime
+import io
 import json
 import os.path
+import tempfile
 import time
 import unittest
 import unittest.mock
@@ -24,8 +27,14 @@ import future.utils
 
 import v3io.common.helpers
 import v3io.dataplane
+import v3io.dataplane.compression
+import v3io.dataplane.json_codec
+import v3io.dataplane.kv_cache
 import v3io.dataplane.output
+import v3io.dataplane.request
 import v3io.dataplane.response
+import v3io.dataplane.single_flight
+import v3io.dataplane.stream_producer
 import v3io.logger
 
 
@@ -106,6 +115,92 @@ class TestContainer(Test):
         # clean up
         self._delete_dir(self._path)
 
+    def test_iter_contents_and_walk(self):
+        object_paths = set()
+
+        for dir_index in range(3):
+            for sub_dir_index in range(2):
+                for object_index in range(3):
+                    object_path = os.path.join(
+                        self._path, f"dir-{dir_index}", f"sub-{sub_dir_index}", f"obj-{object_index}"
+                    )
+                    object_paths.add(object_path.lstrip("/"))
+
+        for object_index in range(5):
+            object_paths.add(os.path.join(self._path, f"obj-{object_index}").lstrip("/"))
+
+        for object_path in object_paths:
+            self._client.object.put(container=self._container, path=object_path, body="x")
+
+        # list a directory two entries at a time
+        entries = list(self._client.container.iter_contents(container=self._container, path=self._path, limit=2))
+
+        self.assertEqual(
+            sorted(getattr(entry, "key", None) or entry.prefix for entry in entries),
+            sorted(
+                [f"{self._path.lstrip('/')}/obj-{index}" for index in range(5)]
+                + [f"{self._path.lstrip('/')}/dir-{index}/" for index in range(3)]
+            ),
+        )
+
+        # walk the tree
+        walked_object_paths = []
+        num_prefixes = 0
+
+        for _, common_prefixes, contents in self._client.container.walk(
+            container=self._container, path=self._path, limit=2
+        ):
+            walked_object_paths.extend(content.key for content in contents)
+            num_prefixes += len(common_prefixes)
+
+        self.assertEqual(sorted(walked_object_paths), sorted(object_paths))
+        self.assertEqual(num_prefixes, 9)
+
+        # clean up
+        self._delete_dir(self._path)
+
+    def test_iter_contents_and_walk_invalid_path(self):
+        # listings can't continue past a page that failed, whatever raise_for_status allows
+        for list_contents in (self._client.container.iter_contents, self._client.container.walk):
+            with self.assertRaises(v3io.dataplane.response.HttpResponseError) as context:
+                list(
+                    list_contents(
+                        container=self._container,
+                        path="/no-such-path",
+                        raise_for_status=v3io.dataplane.RaiseForStatus.never,
+                    )
+                )
+
+            self.assertEqual(404, context.exception.status_code)
+
+    def test_parse_contents_incrementally(self):
+        for object_index in range(10):
+            self._client.object.put(container=self._container, path=os.path.join(self._path, f"obj-{object_index}"))
+
+        response = self._client.container.list(container=self._container, path=self._path, get_all_attributes=True)
+
+        # feed the listing in small chunks. entries are returned as soon as they end
+        parser = v3io.dataplane.output.ContainerContentsParser()
+        entries = []
+
+        for offset in range(0, len(response.body), 16):
+            entries.extend(parser.feed(response.body[offset : offset + 16]))
+
+        self.assertEqual(parser.close(), [])
+        self.assertEqual(len(entries), len(response.output.contents) + len(response.output.common_prefixes))
+
+        contents = [entry for entry in entries if isinstance(entry, v3io.dataplane.output.ContainerContent)]
+        self.assertEqual(len(contents), 10)
+        self.assertEqual([content.key for content in contents], [content.key for content in response.output.contents])
+        self.assertEqual(parser.output.is_truncated, response.output.is_truncated)
+
+        # entries don't have a __dict__
+        with self.assertRaises(AttributeError):
+            entries[0].no_such_attribute = 1
+
+        # clean up
+        self._delete_dir(self._path)
+
 
 class TestStream(Test):
     def setUp(self):
@@ -197,6 +292,479 @@ class TestStream(Test):
 
         self._client.stream.delete(container=self._container, stream_path=self._path)
 
+    def test_consumer(self):
+        num_shards = 4
+        num_records = 40
+
+        self._client.stream.create(container=self._container, stream_path=self._path, shard_count=num_shards)
+
+        records = [{"shard_id": idx % num_shards, "data": f"record #{idx}"} for idx in range(num_records)]
+        self._client.stream.put_records(container=self._container, stream_path=self._path, records=records)
+
+        received_records = []
+
+        # read a few records per request, so that every shard is read in several requests
+        with self._client.stream.new_consumer(
+            container=self._container, stream_path=self._path, limit=3, poll_interval=0.1
+        ) as consumer:
+            while len(received_records) < num_records:
+                record = consumer.next_record(timeout=10)
+                self.assertIsNotNone(record)
+                received_records.append(record)
+
+            # no more records
+            self.assertIsNone(consumer.next_record(timeout=0.5))
+
+        # a shard must be able to hand over records
+        with self.assertRaises(ValueError):
+            self._client.stream.new_consumer(container=self._container, stream_path=self._path, prefetch=0)
+
+        # records of each shard arrive in order
+        for shard_id in range(num_shards):
+            self.assertEqual(
+                [record["data"] for record in records if record["shard_id"] == shard_id],
+                [record.data.decode("utf-8") for record in received_records if record.shard_id == shard_id],
+            )
+
+        self._client.stream.delete(container=self._container, stream_path=self._path)
+
+    def test_producer(self):
+        num_shards = 4
+        num_records = 2500
+
+        self._client.stream.create(container=self._container, stream_path=self._path, shard_count=num_shards)
+
+        failures = []
+
+        with self._client.stream.new_producer(
+            container=self._container,
+            max_retries=1,
+            on_failure=lambda stream_path, record, error: failures.append((record, error)),
+        ) as producer:
+            for idx in range(num_records):
+                producer.put(self._path, {"shard_id": idx % num_shards, "data": f"record #{idx}"})
+
+            # a record to a shard that doesn't exist fails
+            producer.put(self._path, {"shard_id": num_shards, "data": "invalid shard record"})
+
+        self.assertEqual(1, len(failures))
+        self.assertEqual("invalid shard record", failures[0][0]["data"])
+        self.assertIsNotNone(failures[0][1].error_code)
+
+        received_records = []
+
+        with self._client.stream.new_consumer(container=self._container, stream_path=self._path) as consumer:
+            while len(received_records) < num_records:
+                record = consumer.next_record(timeout=10)
+                self.assertIsNotNone(record)
+                received_records.append(record)
+
+        self.assertEqual(
+            sorted(f"record #{idx}" for idx in range(num_records)),
+            sorted(record.data.decode("utf-8") for record in received_records),
+        )
+
+        self._client.stream.delete(container=self._container, stream_path=self._path)
+
+    def test_producer_retries(self):
+        records = [
+            {"shard_id": 0, "data": "shard 0 record 0"},
+            {"shard_id": 1, "data": "shard 1 record 0"},
+            {"shard_id": 0, "data": "shard 0 record 1"},
+            {"shard_id": 1, "data": "shard 1 record 1"},
+            {"shard_id": 0, "data": "shard 0 record 2"},
+        ]
+        results = [
+            v3io.dataplane.output.PutRecordsResult({"ErrorCode": error_code}) for error_code in (None, 1, None, None, 1)
+        ]
+
+        # records that followed a failed record in its shard are retried along with it, so that they stay in order
+        self.assertEqual(
+            [records[1], records[3], records[4]],
+            v3io.dataplane.stream_producer.get_records_to_retry(records, results),
+        )
+
+        # strings are sized by their encoded length
+        self.assertEqual(
+            v3io.dataplane.stream_producer.get_record_size({"data": "\u05e9" * 6, "partition_key": "\u05e9"}),
+            v3io.dataplane.stream_producer.get_record_size({"data": b"12" * 6, "partition_key": b"12"}),
+        )
+
+    def test_router(self):
+        num_shards = 4
+        num_records = 500
+        partition_keys = [f"key-{idx}" for idx in range(10)]
+
+        self._client.stream.create(container=self._container, stream_path=self._path, shard_count=num_shards)
+
+        router = self._client.stream.new_router(container=self._container)
+
+        with self._client.stream.new_producer(container=self._container, max_records=20, router=router) as producer:
+            for idx in range(num_records):
+                partition_key = partition_keys[idx % len(partition_keys)]
+                producer.put(self._path, {"partition_key": partition_key, "data": str(idx)})
+
+        records_by_partition_key = {}
+
+        with self._client.stream.new_consumer(container=self._container, stream_path=self._path) as consumer:
+            for _ in range(num_records):
+                record = consumer.next_record(timeout=10)
+                self.assertIsNotNone(record)
+                records_by_partition_key.setdefault(record.partition_key, []).append(record)
+
+        self.assertEqual(sorted(partition_keys), sorted(records_by_partition_key))
+
+        for partition_key, records in records_by_partition_key.items():
+            expected_shard_id = router.get_shard_id(self._path, partition_key)
+
+            # all records of a partition key are put to its shard, in order
+            self.assertEqual({expected_shard_id}, {record.shard_id for record in records})
+            indices = [int(record.data) for record in records]
+            self.assertEqual(sorted(indices), indices)
+
+        self._client.stream.delete(container=self._container, stream_path=self._path)
+
+    def test_checkpoint(self):
+        num_shards = 2
+        num_records_per_shard = 10
+        checkpoints_path = os.path.join(self._test_parent_dir, "v3io-py-test-checkpoints")
+
+        self._delete_dir(checkpoints_path)
+        self._client.stream.create(container=self._container, stream_path=self._path, shard_count=num_shards)
+
+        for shard_id in range(num_shards):
+            self._client.stream.put_records(
+                container=self._container,
+                stream_path=self._path,
+                records=[
+                    {"shard_id": shard_id, "data": f"shard {shard_id} record {idx}"}
+                    for idx in range(num_records_per_shard)
+                ],
+            )
+
+        # process some records, checkpointing each
+        processed_records = []
+        checkpoint_store = self._client.stream.new_checkpoint_store(
+            container=self._container, table_path=checkpoints_path
+        )
+
+        with self._client.stream.new_consumer(
+            container=self._container, stream_path=self._path, checkpoint_store=checkpoint_store
+        ) as consumer:
+            for _ in range(5):
+                record = consumer.next_record(timeout=10)
+                processed_records.append(record.data)
+                consumer.checkpoint(record)
+
+        # a stale checkpoint doesn't move the stored one backwards
+        checkpoint_store.checkpoint(record.shard_id, record.sequence_number - 1)
+        checkpoint_store.flush()
+
+        # a new consumer resumes after the checkpoints
+        checkpoint_store = self._client.stream.new_checkpoint_store(
+            container=self._container, table_path=checkpoints_path
+        )
+
+        with self._client.stream.new_consumer(
+            container=self._container, stream_path=self._path, checkpoint_store=checkpoint_store
+        ) as consumer:
+            for _ in range(num_shards * num_records_per_shard - len(processed_records)):
+                record = consumer.next_record(timeout=10)
+                processed_records.append(record.data)
+
+            self.assertIsNone(consumer.next_record(timeout=0.5))
+
+        self.assertEqual(
+            sorted(
+                f"shard {shard_id} record {idx}".encode("utf-8")
+                for shard_id in range(num_shards)
+                for idx in range(num_records_per_shard)
+            ),
+            sorted(processed_records),
+        )
+
+        self._client.stream.delete(container=self._container, stream_path=self._path)
+        self._delete_dir(checkpoints_path)
+
+    def test_checkpoint_aggregated(self):
+        num_records = 10
+        checkpoints_path = os.path.join(self._test_parent_dir, "v3io-py-test-checkpoints")
+
+        self._delete_dir(checkpoints_path)
+        self._client.stream.create(container=self._container, stream_path=self._path, shard_count=1)
+
+        # all the records are packed into the first record of the shard
+        with self._client.stream.new_producer(container=self._container, aggregate=True) as producer:
+            for idx in range(num_records):
+                producer.put(self._path, {"shard_id": 0, "data": str(idx)})
+
+        # process some of the records packed into it
+        checkpoint_store = self._client.stream.new_checkpoint_store(
+            container=self._container, table_path=checkpoints_path
+        )
+
+        with self._client.stream.new_consumer(
+            container=self._container, stream_path=self._path, checkpoint_store=checkpoint_store
+        ) as consumer:
+            for _ in range(4):
+                consumer.checkpoint(consumer.next_record(timeout=10))
+
+        # a new consumer resumes from the first record, skipping the records processed
+        checkpoint_store = self._client.stream.new_checkpoint_store(
+            container=self._container, table_path=checkpoints_path
+        )
+
+        with self._client.stream.new_consumer(
+            container=self._container, stream_path=self._path, checkpoint_store=checkpoint_store
+        ) as consumer:
+            received_records = [consumer.next_record(timeout=10) for _ in range(num_records - 4)]
+            self.assertIsNone(consumer.next_record(timeout=0.5))
+
+        self.assertEqual(
+            [str(idx).encode("utf-8") for idx in range(4, num_records)], [r.data for r in received_records]
+        )
+
+        self._client.stream.delete(container=self._container, stream_path=self._path)
+        self._delete_dir(checkpoints_path)
+
+    def test_consumer_group(self):
+        num_shards = 4
+        leases_path = os.path.join(self._test_parent_dir, "v3io-py-test-leases")
+
+        self._delete_dir(leases_path)
+        self._client.stream.create(container=self._container, stream_path=self._path, shard_count=num_shards)
+
+        for shard_id in range(num_shards):
+            self._client.stream.put_records(
+                container=self._container,
+                stream_path=self._path,
+                records=[{"shard_id": shard_id, "data": f"shard {shard_id}"}],
+            )
+
+        members = [
+            self._client.stream.new_consumer_group(
+                container=self._container,
+                stream_path=self._path,
+                lease_table_path=leases_path,
+                member_id=member_id,
+                lease_duration=1.5,
+                poll_interval=0.1,
+            )
+            for member_id in ("member-0", "member-1")
+        ]
+
+        # the first member takes all the leases
+        record = members[0].next_record(timeout=5)
+        self.assertIsNotNone(record)
+        self.assertEqual(list(range(num_shards)), members[0].owned_shard_ids)
+
+        # the second member steals its share
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            for member in members:
+                member.next_record(timeout=0.1)
+
+            if [len(member.owned_shard_ids) for member in members] == [2, 2]:
+                break
+
+        self.assertEqual([2, 2], [len(member.owned_shard_ids) for member in members])
+        self.assertEqual(list(range(num_shards)), sorted(members[0].owned_shard_ids + members[1].owned_shard_ids))
+
+        # once a member leaves, the others take its leases
+        members[0].close()
+
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline and len(members[1].owned_shard_ids) < num_shards:
+            members[1].next_record(timeout=0.1)
+
+        self.assertEqual(list(range(num_shards)), members[1].owned_shard_ids)
+
+        members[1].close()
+        self._client.stream.delete(container=self._container, stream_path=self._path)
+        self._delete_dir(leases_path)
+
+    def test_consumer_group_lease_expiry(self):
+        leases_path = os.path.join(self._test_parent_dir, "v3io-py-test-leases")
+
+        self._delete_dir(leases_path)
+        self._client.stream.create(container=self._container, stream_path=self._path, shard_count=2)
+
+        with self._client.stream.new_consumer_group(
+            container=self._container,
+            stream_path=self._path,
+            lease_table_path=leases_path,
+            lease_duration=1.5,
+            poll_interval=0.1,
+        ) as member:
+            self.assertIsNone(member.next_record(timeout=0.5))
+            self.assertEqual([0, 1], member.owned_shard_ids)
+
+            # a member that fails to renew its leases stops reading their shards once they may have expired
+            with unittest.mock.patch.object(member, "_balance", side_effect=RuntimeError("unreachable")):
+                time.sleep(1.5)
+                self.assertEqual([], member.owned_shard_ids)
+
+                self._client.stream.put_records(
+                    container=self._container, stream_path=self._path, records=[{"shard_id": 0, "data": "record"}]
+                )
+                self.assertIsNone(member.next_record(timeout=1))
+
+            # and reads them again once it renews them
+            record = member.next_record(timeout=5)
+            self.assertEqual(b"record", record.data)
+
+        self._client.stream.delete(container=self._container, stream_path=self._path)
+        self._delete_dir(leases_path)
+
+    def test_consumer_group_rebalance(self):
+        num_shards = 4
+        num_records_per_shard = 5
+        leases_path = os.path.join(self._test_parent_dir, "v3io-py-test-leases")
+
+        self._delete_dir(leases_path)
+        self._client.stream.create(container=self._container, stream_path=self._path, shard_count=num_shards)
+
+        for shard_id in range(num_shards):
+            self._client.stream.put_records(
+                container=self._container,
+                stream_path=self._path,
+                records=[
+                    {"shard_id": shard_id, "data": f"shard {shard_id} record {idx}"}
+                    for idx in range(num_records_per_shard)
+                ],
+            )
+
+        members = [
+            self._client.stream.new_consumer_group(
+                container=self._container,
+                stream_path=self._path,
+                lease_table_path=leases_path,
+                member_id=member_id,
+                lease_duration=1.5,
+                poll_interval=0.1,
+            )
+            for member_id in ("member-0", "member-1")
+        ]
+
+        # the first member reads all the records
+        for _ in range(num_shards * num_records_per_shard):
+            self.assertIsNotNone(members[0].next_record(timeout=5))
+
+        # the second member steals its share
+        received_records = []
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline and [len(member.owned_shard_ids) for member in members] != [2, 2]:
+            members[1].next_record(timeout=0.1)
+            received_records.append(members[0].next_record(timeout=0.1))
+
+        self.assertEqual([2, 2], [len(member.owned_shard_ids) for member in members])
+
+        # the first member continues reading the shards it kept from where it was, rather than from their beginning
+        new_records = [f"shard {shard_id} new record".encode("utf-8") for shard_id in members[0].owned_shard_ids]
+        self._client.stream.put_records(
+            container=self._container,
+            stream_path=self._path,
+            records=[{"shard_id": shard_id, "data": "new record"} for shard_id in members[0].owned_shard_ids],
+        )
+
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and len([record for record in received_records if record]) < 2:
+            received_records.append(members[0].next_record(timeout=0.1))
+
+        self.assertEqual(
+            sorted(new_records),
+            sorted(
+                f"shard {record.shard_id} {record.data.decode('utf-8')}".encode("utf-8")
+                for record in received_records
+                if record
+            ),
+        )
+
+        for member in members:
+            member.close()
+
+        self._client.stream.delete(container=self._container, stream_path=self._path)
+        self._delete_dir(leases_path)
+
+    def test_aggregation(self):
+        num_shards = 2
+        num_records = 1000
+
+        self._client.stream.create(container=self._container, stream_path=self._path, shard_count=num_shards)
+
+        with self._client.stream.new_producer(container=self._container, aggregate=True) as producer:
+            for idx in range(num_records):
+                producer.put(
+                    self._path, {"shard_id": idx % num_shards, "partition_key": str(idx % 7), "data": str(idx)}
+                )
+
+        # the records are packed into a few stream records
+        location = (
+            self._client.stream.seek(
+                container=self._container, stream_path=self._path, shard_id=0, seek_type="EARLIEST"
+            )
+        ).output.location
+        response = self._client.stream.get_records(
+            container=self._container, stream_path=self._path, shard_id=0, location=location
+        )
+        self.assertLess(len(response.output.records), 10)
+
+        received_records = []
+
+        with self._client.stream.new_consumer(container=self._container, stream_path=self._path) as consumer:
+            while len(received_records) < num_records:
+                record = consumer.next_record(timeout=10)
+                self.assertIsNotNone(record)
+                self.assertIsNotNone(record.sub_sequence_number)
+                received_records.append(record)
+
+        received_records.sort(key=lambda record: int(record.data))
+
+        for idx, record in enumerate(received_records):
+            self.assertEqual(str(idx).encode("utf-8"), record.data)
+            self.assertEqual(str(idx % 7), record.partition_key)
+            self.assertEqual(idx % num_shards, record.shard_id)
+
+        self._client.stream.delete(container=self._container, stream_path=self._path)
+
+    def test_record_compression(self):
+        self._client.stream.create(container=self._container, stream_path=self._path, shard_count=1)
+
+        records = [
+            {"shard_id": 0, "data": "compressible " * 100},
+            {"shard_id": 0, "data": b"compressible " * 100, "client_info": b"some client info"},
+        ]
+
+        self._client.stream.put_records(
+            container=self._container, stream_path=self._path, records=records, compression="zlib"
+        )
+
+        # a record whose client info only happens to start with the marker is returned as is
+        client_info = v3io.dataplane.compression.marker + b"\x04zlib not compressed"
+        self._client.stream.put_records(
+            container=self._container,
+            stream_path=self._path,
+            records=[{"shard_id": 0, "data": b"not compressed", "client_info": client_info}],
+        )
+
+        response = self._client.stream.seek(
+            container=self._container, stream_path=self._path, shard_id=0, seek_type="EARLIEST"
+        )
+
+        response = self._client.stream.get_records(
+            container=self._container, stream_path=self._path, shard_id=0, location=response.output.location
+        )
+
+        self.assertEqual(3, len(response.output.records))
+        self.assertEqual(b"compressible " * 100, response.output.records[0].data)
+        self.assertIsNone(response.output.records[0].client_info)
+        self.assertEqual(b"compressible " * 100, response.output.records[1].data)
+        self.assertEqual(b"some client info", response.output.records[1].client_info)
+        self.assertEqual(b"not compressed", response.output.records[2].data)
+        self.assertEqual(client_info, response.output.records[2].client_info)
+
+        self._client.stream.delete(container=self._container, stream_path=self._path)
+
     def _stream_exists(self):
         response = self._client.stream.describe(
             container=self._container, stream_path=self._path, raise_for_status=v3io.dataplane.RaiseForStatus.never
@@ -257,6 +825,25 @@ class TestObject(Test):
 
         self.assertEqual(404, response.status_code)
 
+    def test_single_flight(self):
+        self._client.object.put(container=self._container, path=self._object_path, body="contents")
+
+        self._client.object.single_flight = v3io.dataplane.single_flight.SingleFlight()
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            responses = list(
+                executor.map(
+                    lambda _: self._client.object.get(container=self._container, path=self._object_path), range(16)
+                )
+            )
+
+        for response in responses:
+            self.assertEqual(b"contents", response.body)
+
+        # a failed call raises in all the callers that share it
+        with self.assertRaises(v3io.dataplane.response.HttpResponseError):
+            self._client.object.get(container=self._container, path=self._object_dir + "/missing")
+
     def test_append(self):
         contents = [
             "First part",
@@ -273,6 +860,117 @@ class TestObject(Test):
 
         self.assertEqual(response.body.decode("utf-8"), "".join(contents))
 
+    def test_compression(self):
+        contents = [json.dumps({"key": "value", "index": idx}) * 20 for idx in range(3)]
+
+        # a compressed put followed by compressed appends
+        for content in contents:
+            self._client.object.put(
+                container=self._container, path=self._object_path, body=content, append=True, compression="zlib"
+            )
+
+        response = self._client.object.get(container=self._container, path=self._object_path, decompress=True)
+        self.assertEqual("".join(contents), response.body.decode("utf-8"))
+
+        # the stored object is compressed, and only decompressed on request
+        response = self._client.object.get(container=self._container, path=self._object_path)
+        self.assertTrue(response.body.startswith(v3io.dataplane.compression.marker))
+        self.assertLess(len(response.body), len("".join(contents)))
+
+        # objects that only happen to start with the marker are returned as they are
+        contents = v3io.dataplane.compression.marker + b"\x04zlib not compressed"
+        self._client.object.put(container=self._container, path=self._object_path, body=contents)
+
+        for decompress in (False, True):
+            response = self._client.object.get(container=self._container, path=self._object_path, decompress=decompress)
+            self.assertEqual(contents, response.body)
+
+    def test_download(self):
+        contents = os.urandom(100 * 1024 + 17)
+        self._client.object.put(container=self._container, path=self._object_path, body=contents)
+
+        # into a buffer
+        buffer = bytearray(len(contents))
+        size = self._client.object.download(
+            container=self._container, path=self._object_path, dest=buffer, part_size=7000
+        )
+        self.assertEqual(len(contents), size)
+        self.assertEqual(contents, buffer)
+
+        # into a file object
+        file_object = io.BytesIO()
+        self._client.object.download(
+            container=self._container, path=self._object_path, dest=file_object, part_size=7000
+        )
+        self.assertEqual(contents, file_object.getvalue())
+
+        # into a file
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "object")
+            self._client.object.download(
+                container=self._container, path=self._object_path, dest=file_path, part_size=7000
+            )
+
+            with open(file_path, "rb") as f:
+                self.assertEqual(contents, f.read())
+
+        # objects put with compression are downloaded as they are stored
+        self._client.object.put(
+            container=self._container, path=self._object_path, body=b"compressible " * 100, compression="zlib"
+        )
+        response = self._client.object.get(container=self._container, path=self._object_path)
+
+        file_object = io.BytesIO()
+        self._client.object.download(container=self._container, path=self._object_path, dest=file_object)
+        self.assertEqual(response.body, file_object.getvalue())
+
+        # a missing object is raised even if its status is allowed
+        with self.assertRaises(v3io.dataplane.response.HttpResponseError) as context:
+            self._client.object.download(
+                container=self._container,
+                path=self._object_path + "-missing",
+                dest=io.BytesIO(),
+                raise_for_status=v3io.dataplane.RaiseForStatus.never,
+            )
+
+        self.assertEqual(404, context.exception.status_code)
+
+    def test_upload(self):
+        contents = os.urandom(50 * 1024 + 3)
+        progress = []
+
+        # from a file object
+        size = self._client.object.upload(
+            container=self._container,
+            path=self._object_path,
+            source=io.BytesIO(contents),
+            chunk_size=7000,
+            progress=progress.append,
+        )
+
+        self.assertEqual(len(contents), size)
+        self.assertEqual([min(idx * 7000, len(contents)) for idx in range(1, 9)], progress)
+        response = self._client.object.get(container=self._container, path=self._object_path)
+        self.assertEqual(contents, response.body)
+
+        # from a file, overwriting the object
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "object")
+            with open(file_path, "wb") as f:
+                f.write(contents[:10000])
+
+            self._client.object.upload(
+                container=self._container, path=self._object_path, source=file_path, chunk_size=7000
+            )
+
+        response = self._client.object.get(container=self._container, path=self._object_path)
+        self.assertEqual(contents[:10000], response.body)
+
+        # an empty source creates an empty object
+        self._client.object.upload(container=self._container, path=self._object_path, source=io.BytesIO())
+        response = self._client.object.get(container=self._container, path=self._object_path)
+        self.assertEqual(b"", response.body)
+
     def test_get_offset(self):
         self._client.object.put(container=self._container, path=self._object_path, body="1234567890")
 
@@ -286,6 +984,57 @@ class TestObject(Test):
 
         self.assertEqual(response.body.decode("utf-8"), "567")
 
+    def test_get_into(self):
+        self._client.object.put(container=self._container, path=self._object_path, body="1234567890")
+
+        # read the whole object
+        buffer = bytearray(16)
+        response = self._client.object.get_into(container=self._container, path=self._object_path, buffer=buffer)
+
+        self.assertEqual(bytes(response.body), b"1234567890")
+        self.assertEqual(buffer[:10], b"1234567890")
+
+        # read a range into a view of the buffer
+        response = self._client.object.get_into(
+            container=self._container, path=self._object_path, buffer=memoryview(buffer)[10:], offset=4, num_bytes=3
+        )
+
+        self.assertEqual(bytes(response.body), b"567")
+        self.assertEqual(buffer, b"1234567890567\x00\x00\x00")
+
+        # the buffer must fit the data
+        with self.assertRaises(ValueError):
+            self._client.object.get_into(container=self._container, path=self._object_path, buffer=bytearray(4))
+
+    def test_get_stream(self):
+        contents = os.urandom(100 * 1024)
+        self._client.object.put(container=self._container, path=self._object_path, body=contents)
+
+        # read the object in chunks
+        response = self._client.object.get_stream(container=self._container, path=self._object_path, chunk_size=4096)
+
+        with response.body as body:
+            chunks = list(body)
+
+        self.assertTrue(all(len(chunk) <= 4096 for chunk in chunks))
+        self.assertEqual(b"".join(chunks), contents)
+
+        # read a range, closing the stream before it's drained
+        response = self._client.object.get_stream(
+            container=self._container, path=self._object_path, offset=10, num_bytes=1000
+        )
+
+        self.assertEqual(response.body.read(100), contents[10:110])
+        response.body.close()
+
+        # the connections are reusable
+        for _ in range(2 * self._client._transport.max_connections):
+            response = self._client.object.get_stream(container=self._container, path=self._object_path)
+            response.body.close()
+
+        response = self._client.object.get(container=self._container, path=self._object_path)
+        self.assertEqual(response.body, contents)
+
     def test_batch(self):
         def _object_path(idx):
             return self._object_dir + "/object" + str(idx)
@@ -312,6 +1061,68 @@ class TestObject(Test):
             self.assertEqual(200, response.status_code)
             self.assertEqual(_object_contents(response_idx), response.body.decode("utf-8"))
 
+    def test_batch_unordered(self):
+        def _object_path(idx):
+            return self._object_dir + "/object" + str(idx)
+
+        def _object_contents(idx):
+            # mix small and large objects
+            return ("object-" + str(idx)) * (1 if idx % 2 else 100000)
+
+        num_objects = 16
+
+        for object_idx in range(num_objects):
+            self._client.batch.object.put(self._container, _object_path(object_idx), body=_object_contents(object_idx))
+
+        responses = self._client.batch.wait_unordered()
+
+        self.assertEqual(list(range(num_objects)), sorted(response_idx for response_idx, _ in responses))
+
+        for object_idx in range(num_objects):
+            self._client.batch.object.get(self._container, _object_path(object_idx))
+
+        responses = self._client.batch.wait_unordered()
+
+        self.assertEqual(num_objects, len(responses))
+
+        for response_idx, response in responses:
+            self.assertEqual(200, response.status_code)
+            self.assertEqual(_object_contents(response_idx), response.body.decode("utf-8"))
+
+    def test_batch_imap(self):
+        def _object_path(idx):
+            return self._object_dir + "/object" + str(idx)
+
+        def _object_contents(idx):
+            return "object-" + str(idx)
+
+        num_objects = 32
+        batch = self._client.batch
+
+        # put the objects from a generator
+        responses = batch.imap(
+            lambda idx: batch.object.put(self._container, _object_path(idx), body=_object_contents(idx)),
+            range(num_objects),
+        )
+
+        self.assertEqual([200] * num_objects, [response.status_code for response in responses])
+
+        # get them back, as they complete
+        responses = batch.as_completed(
+            lambda idx: batch.object.get(self._container, _object_path(idx)), range(num_objects)
+        )
+
+        for response_idx, response in responses:
+            self.assertEqual(_object_contents(response_idx), response.body.decode("utf-8"))
+
+        # stop iterating midway and make sure the batch can still be used
+        responses = batch.imap(lambda idx: batch.object.get(self._container, _object_path(idx)), range(num_objects))
+        next(responses)
+        responses.close()
+
+        batch.object.get(self._container, _object_path(0))
+        self.assertEqual(_object_contents(0), batch.wait()[0].body.decode("utf-8"))
+
 
 class TestSchema(Test):
     def setUp(self):
@@ -551,6 +1362,234 @@ class TestKv(Test):
 
         self.assertEqual(len(received_items), 30)
 
+    def test_prefetch(self):
+        for idx in range(100):
+            self._client.kv.put(
+                container=self._container,
+                table_path=self._path,
+                key=f"key-{idx}",
+                attributes={
+                    "attr": idx,
+                },
+            )
+
+        received_items = self._client.kv.new_cursor(
+            container=self._container, table_path=self._path, limit=30, prefetch=True
+        ).all()
+
+        self.assertEqual(len(received_items), 30)
+
+        # abandon a cursor with a prefetched page, its connection should return to the pool
+        with self._client.kv.new_cursor(container=self._container, table_path=self._path, prefetch=True) as cursor:
+            self.assertIsNotNone(cursor.next_item())
+
+        received_items = self._client.kv.new_cursor(container=self._container, table_path=self._path).all()
+
+        self.assertEqual(len(received_items), 100)
+
+    def test_columns(self):
+        for idx in range(10):
+            attributes = {"int": idx, "float": idx / 2, "str": f"value-{idx}", "big": 10**20 + idx}
+
+            # one item without the int attribute
+            if idx == 3:
+                del attributes["int"]
+
+            self._client.kv.put(
+                container=self._container, table_path=self._path, key=f"key-{idx}", attributes=attributes
+            )
+
+        columns = self._client.kv.new_cursor(
+            container=self._container, table_path=self._path, attribute_names=["int", "float", "str"]
+        ).to_columns()
+
+        self.assertEqual(10, len(columns["str"]))
+        self.assertEqual(1, columns["int"].count(None))
+        self.assertEqual(sorted(idx / 2 for idx in range(10)), sorted(columns["float"]))
+
+        data_frame = self._client.kv.new_cursor(
+            container=self._container, table_path=self._path, attribute_names=["int", "float", "str"]
+        ).to_pandas()
+
+        self.assertEqual(10, len(data_frame))
+        self.assertEqual("float64", data_frame["int"].dtype)
+        self.assertEqual(1, data_frame["int"].isna().sum())
+        self.assertEqual(sum(idx / 2 for idx in range(10)), data_frame["float"].sum())
+
+        # integers beyond int64 don't fit a numeric column, and are kept exactly
+        data_frame = self._client.kv.new_cursor(
+            container=self._container, table_path=self._path, attribute_names=["big"]
+        ).to_pandas()
+
+        self.assertEqual(object, data_frame["big"].dtype)
+        self.assertEqual(sorted(10**20 + idx for idx in range(10)), sorted(data_frame["big"]))
+
+    def test_parallel_cursor(self):
+        for idx in range(100):
+            self._client.kv.put(
+                container=self._container,
+                table_path=self._path,
+                key=f"key-{idx}",
+                attributes={
+                    "attr": idx,
+                },
+            )
+
+        # read all segments in parallel, items arrive in no particular order
+        received_items = self._client.kv.new_parallel_cursor(
+            container=self._container, table_path=self._path, total_segments=4
+        ).all()
+
+        self.assertEqual(list(range(100)), sorted(item["attr"] for item in received_items))
+
+        # limit is enforced across all segments
+        with self._client.kv.new_parallel_cursor(
+            container=self._container, table_path=self._path, total_segments=4, limit=30
+        ) as items_cursor:
+            received_items = list(items_cursor)
+
+        self.assertEqual(len(received_items), 30)
+
+    def test_cache(self):
+        self._client.kv.cache = v3io.dataplane.kv_cache.Cache(max_items=2)
+
+        for idx in range(3):
+            self._client.kv.put(
+                container=self._container, table_path=self._path, key=f"key-{idx}", attributes={"attr": idx}
+            )
+
+        # the second read is served from the cache
+        for _ in range(2):
+            response = self._client.kv.get(container=self._container, table_path=self._path, key="key-0")
+            self.assertEqual(0, response.output.item["attr"])
+
+        self.assertEqual((1, 1), (self._client.kv.cache.hits, self._client.kv.cache.misses))
+
+        # writing the item invalidates it
+        self._client.kv.update(container=self._container, table_path=self._path, key="key-0", attributes={"attr": 10})
+        response = self._client.kv.get(container=self._container, table_path=self._path, key="key-0")
+        self.assertEqual(10, response.output.item["attr"])
+        self.assertEqual(2, self._client.kv.cache.misses)
+
+        # reading more items than max_items evicts the least recently used
+        for idx in range(1, 3):
+            self._client.kv.get(container=self._container, table_path=self._path, key=f"key-{idx}")
+
+        self.assertEqual(2, len(self._client.kv.cache))
+        self.assertEqual(1, self._client.kv.cache.evictions)
+
+        self._client.kv.delete(container=self._container, table_path=self._path, key="key-2")
+        response = self._client.kv.get(
+            container=self._container,
+            table_path=self._path,
+            key="key-2",
+            raise_for_status=v3io.dataplane.RaiseForStatus.never,
+        )
+        self.assertEqual(404, response.status_code)
+
+    def test_table(self):
+        table = self._client.kv.table(container=self._container, table_path=self._path)
+
+        for idx in range(3):
+            table.put(f"key {idx}", {"attr": idx, "name": f"name-{idx}"})
+
+        table.update("key 0", expression="SET attr = attr + 10")
+        table.update("key 1", attributes={"name": "renamed"})
+
+        response = table.get("key 0", attribute_names=["attr"])
+        self.assertEqual({"attr": 10}, response.output.item)
+
+        # the table handle and the kv calls address the same items
+        response = self._client.kv.get(container=self._container, table_path=self._path, key="key 1")
+        self.assertEqual((1, "renamed"), (response.output.item["attr"], response.output.item["name"]))
+
+        table.delete("key 2")
+        response = table.get("key 2", raise_for_status=v3io.dataplane.RaiseForStatus.never)
+        self.assertEqual(404, response.status_code)
+
+        # reads through a table handle go through the kv cache
+        self._client.kv.cache = v3io.dataplane.kv_cache.Cache()
+        table.get("key 0")
+        table.put("key 0", {"attr": 20})
+        self.assertEqual(20, table.get("key 0").output.item["attr"])
+        self.assertEqual(0, self._client.kv.cache.hits)
+
+    def test_get_many(self):
+        self._client.kv.put_many(
+            container=self._container,
+            table_path=self._path,
+            items={f"key-{idx}": {"attr": idx, "other": "x"} for idx in range(10)},
+        )
+
+        keys = ["key-5", "key-0", "missing", "key-9", "key-0"]
+        items = self._client.kv.get_many(
+            container=self._container, table_path=self._path, keys=keys, attribute_names=["attr"]
+        )
+
+        self.assertEqual([{"attr": 5}, {"attr": 0}, None, {"attr": 9}, {"attr": 0}], items)
+
+        # items are read from the table even if the model has a cache
+        self._client.kv.cache = v3io.dataplane.kv_cache.Cache()
+        items = self._client.kv.get_many(container=self._container, table_path=self._path, keys=keys)
+
+        self.assertEqual([5, 0, None, 9, 0], [item["attr"] if item else None for item in items])
+        self.assertEqual(
+            (0, 0, 0), (self._client.kv.cache.hits, self._client.kv.cache.misses, len(self._client.kv.cache))
+        )
+
+    def test_request_many(self):
+        self._client.kv.put_many(
+            container=self._container, table_path=self._path, items={f"key-{idx}": {"attr": idx} for idx in range(4)}
+        )
+
+        # every item is updated with a condition of its own, which only the even items pass
+        requests = [
+            (f"key-{idx}", {"expression": "SET attr = attr + 10", "condition": f"attr == {idx - idx % 2}"})
+            for idx in range(4)
+        ]
+
+        responses = self._client.kv.request_many("update", self._container, self._path, requests)
+        self.assertEqual([200, 400, 200, 400], [response.status_code for _, response in responses])
+
+        items = self._client.kv.get_many(self._container, self._path, [f"key-{idx}" for idx in range(4)])
+        self.assertEqual([10, 1, 12, 3], [item["attr"] for item in items])
+
+    def test_put_many(self):
+        failed_responses = self._client.kv.put_many(
+            container=self._container,
+            table_path=self._path,
+            items=((f"key-{idx}", {"attr": idx}) for idx in range(20)),
+        )
+
+        self.assertEqual({}, failed_responses)
+
+        # increment the even items
+        failed_responses = self._client.kv.update_many(
+            container=self._container,
+            table_path=self._path,
+            items={f"key-{idx}": None for idx in range(0, 20, 2)},
+            expression="SET attr = attr + 1",
+        )
+
+        self.assertEqual({}, failed_responses)
+
+        received_items = self._client.kv.new_cursor(container=self._container, table_path=self._path).all()
+        self.assertEqual(
+            sorted(idx + 1 if idx % 2 == 0 else idx for idx in range(20)),
+            sorted(item["attr"] for item in received_items),
+        )
+
+        # failures are reported per key
+        failed_responses = self._client.kv.put_many(
+            container=self._container,
+            table_path=self._path,
+            items={"key-1": {"attr": 0}, "key-2": {"attr": 0}},
+            condition="attr > 1",
+        )
+
+        self.assertEqual(["key-1"], list(failed_responses))
+        self.assertEqual(400, failed_responses["key-1"].status_code)
+
     def test_batch(self):
         items = {
             "bob": {"age": 42, "feature": "mustache"},
@@ -687,6 +1726,32 @@ class TestBatchRaiseForStatus(Test):
             else:
                 self.assertEqual(200, response.status_code)
 
+    def test_raise_imap(self):
+        def _object_path(idx):
+            return self._object_dir + "/object" + str(idx)
+
+        num_objects = 8
+
+        for object_idx in range(num_objects):
+            self._client.batch.object.put(self._container, _object_path(object_idx), body="object")
+
+        self._client.batch.wait()
+
+        # fail more times than there are connections. every failure must give its connections back
+        for _ in range(self._client._transport.max_connections + 1):
+            responses = self._client.batch.imap(
+                lambda idx: self._client.batch.object.get(self._container, _object_path(idx if idx != 1 else 10)),
+                range(num_objects),
+            )
+
+            self.assertRaises(Exception, list, responses)
+
+        responses = self._client.batch.imap(
+            lambda idx: self._client.batch.object.get(self._container, _object_path(idx)), range(num_objects)
+        )
+
+        self.assertEqual([200] * num_objects, [response.status_code for response in responses])
+
 
 class TestConnectonErrorRecovery(Test):
     def setUp(self):
@@ -760,6 +1825,66 @@ class TestConnectonErrorRecovery(Test):
         time.sleep(15)
 
 
+class TestResponseDecoding(unittest.TestCase):
+    def test_decode_by_content_type(self):
+        body = b'{"Item": {"a": {"N": "1"}}}'
+
+        # by content type, and by the first character of the body if it has none
+        for headers in [{"Content-Type": "application/json; charset=utf-8"}, {}, None]:
+            response = v3io.dataplane.response.Response(v3io.dataplane.output.GetItemOutput, 200, headers, body)
+            self.assertEqual(response.output.item, {"a": 1})
+
+        response = v3io.dataplane.response.Response(
+            v3io.dataplane.output.GetContainersOutput,
+            200,
+            None,
+            b"<ListAllMyBucketsResult><Buckets><Bucket><Name>bigdata</Name><CreationDate>2020</CreationDate>"
+            b"<Id>1</Id></Bucket></Buckets></ListAllMyBucketsResult>",
+        )
+        self.assertEqual(response.output.containers[0].name, "bigdata")
+
+        # plug in a decoder for another content type
+        v3io.dataplane.output.register_content_type_decoder("application/x-test", lambda body: {"Item": {}})
+
+        response = v3io.dataplane.response.Response(
+            v3io.dataplane.output.GetItemOutput, 200, {"Content-Type": "application/x-test"}, b"..."
+        )
+        self.assertEqual(response.output.item, {})
+
+    def test_json_codecs(self):
+        for codec_name in ["ujson", "orjson", "json"]:
+            codec = v3io.dataplane.json_codec.get_codec(codec_name)
+
+            # bodies are encoded to bytes, with bytes values encoded as strings
+            encoded = codec.dumps({"key": b"value", "number": 1})
+            self.assertIsInstance(encoded, bytes)
+            self.assertEqual(codec.loads(encoded), {"key": "value", "number": 1})
+
+            request = v3io.dataplane.request.Request(
+                "container",
+                None,
+                None,
+                v3io.dataplane.request.encode_get_item,
+                {"path": "/table/key", "attribute_names": ["a"]},
+                json_codec=codec,
+            )
+            self.assertEqual(codec.loads(request.body), {"AttributesToGet": "a"})
+
+            response = v3io.dataplane.response.Response(
+                v3io.dataplane.output.GetItemOutput, 200, None, b'{"Item": {"a": {"S": "b"}}}', codec
+            )
+            self.assertEqual(response.output.item, {"a": "b"})
+
+        with self.assertRaises(ValueError):
+            v3io.dataplane.json_codec.get_codec("no-such-codec")
+
+    def test_decode_listing_errors(self):
+        response = v3io.dataplane.response.Response(
+            v3io.dataplane.output.GetContainerContentsOutput, 404, None, b'{"ErrorCode": -2}'
+        )
+        self.assertEqual(response.output.error, {"ErrorCode": -2})
+
+
 class TestCustomTransport(unittest.TestCase):
     def test_verifier_transport(self):
         container_name = "some_container"
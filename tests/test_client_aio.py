@@ -13,14 +13,22 @@
 # limitations under the License.
 #
 import array
+import asyncio
 import datetime
+import io
+import json
 import os
+import tempfile
+import time
 import unittest
 
 import future.utils
 
 import v3io.aio.dataplane
+import v3io.aio.dataplane.single_flight
 import v3io.dataplane
+import v3io.dataplane.compression
+import v3io.dataplane.kv_cache
 
 
 class Test(unittest.IsolatedAsyncioTestCase):
@@ -98,6 +106,75 @@ class TestContainer(Test):
         # clean up
         await self._delete_dir(self._path)
 
+    async def test_iter_contents_and_walk_invalid_path(self):
+        # listings can't continue past a page that failed, whatever raise_for_status allows
+        with self.assertRaises(v3io.dataplane.response.HttpResponseError) as context:
+            async for _ in self._client.container.iter_contents(
+                container=self._container,
+                path="/no-such-path",
+                raise_for_status=v3io.aio.dataplane.RaiseForStatus.never,
+            ):
+                pass
+
+        self.assertEqual(404, context.exception.status_code)
+
+        with self.assertRaises(v3io.dataplane.response.HttpResponseError) as context:
+            async for _ in self._client.container.walk(
+                container=self._container,
+                path="/no-such-path",
+                raise_for_status=v3io.aio.dataplane.RaiseForStatus.never,
+            ):
+                pass
+
+        self.assertEqual(404, context.exception.status_code)
+
+    async def test_iter_contents_and_walk(self):
+        object_paths = set()
+
+        for dir_index in range(3):
+            for sub_dir_index in range(2):
+                for object_index in range(3):
+                    object_path = os.path.join(
+                        self._path, f"dir-{dir_index}", f"sub-{sub_dir_index}", f"obj-{object_index}"
+                    )
+                    object_paths.add(object_path.lstrip("/"))
+
+        for object_index in range(5):
+            object_paths.add(os.path.join(self._path, f"obj-{object_index}").lstrip("/"))
+
+        for object_path in object_paths:
+            await self._client.object.put(container=self._container, path=object_path, body="x")
+
+        # list a directory two entries at a time
+        entries = [
+            entry
+            async for entry in self._client.container.iter_contents(container=self._container, path=self._path, limit=2)
+        ]
+
+        self.assertEqual(
+            sorted(getattr(entry, "key", None) or entry.prefix for entry in entries),
+            sorted(
+                [f"{self._path.lstrip('/')}/obj-{index}" for index in range(5)]
+                + [f"{self._path.lstrip('/')}/dir-{index}/" for index in range(3)]
+            ),
+        )
+
+        # walk the tree
+        walked_object_paths = []
+        num_prefixes = 0
+
+        async for _, common_prefixes, contents in self._client.container.walk(
+            container=self._container, path=self._path, limit=2
+        ):
+            walked_object_paths.extend(content.key for content in contents)
+            num_prefixes += len(common_prefixes)
+
+        self.assertEqual(sorted(walked_object_paths), sorted(object_paths))
+        self.assertEqual(num_prefixes, 9)
+
+        # clean up
+        await self._delete_dir(self._path)
+
 
 class TestStream(Test):
     async def asyncSetUp(self):
@@ -195,6 +272,416 @@ class TestStream(Test):
 
         await self._client.stream.delete(container=self._container, stream_path=self._path)
 
+    async def test_consumer(self):
+        num_shards = 4
+        num_records = 40
+
+        await self._client.stream.create(container=self._container, stream_path=self._path, shard_count=num_shards)
+
+        records = [{"shard_id": idx % num_shards, "data": f"record #{idx}"} for idx in range(num_records)]
+        await self._client.stream.put_records(container=self._container, stream_path=self._path, records=records)
+
+        received_records = []
+
+        # read a few records per request, so that every shard is read in several requests
+        async with self._client.stream.new_consumer(
+            container=self._container, stream_path=self._path, limit=3, poll_interval=0.1
+        ) as consumer:
+            while len(received_records) < num_records:
+                record = await consumer.next_record(timeout=10)
+                self.assertIsNotNone(record)
+                received_records.append(record)
+
+            # no more records
+            self.assertIsNone(await consumer.next_record(timeout=0.5))
+
+            # closing the consumer wakes whoever waits for records
+            next_records = asyncio.ensure_future(consumer.next_records())
+            await asyncio.sleep(0.1)
+            await consumer.close()
+            self.assertIsNone(await asyncio.wait_for(next_records, 5))
+
+        # records of each shard arrive in order
+        for shard_id in range(num_shards):
+            self.assertEqual(
+                [record["data"] for record in records if record["shard_id"] == shard_id],
+                [record.data.decode("utf-8") for record in received_records if record.shard_id == shard_id],
+            )
+
+        await self._client.stream.delete(container=self._container, stream_path=self._path)
+
+    async def test_producer(self):
+        num_shards = 4
+        num_records = 2500
+
+        await self._client.stream.create(container=self._container, stream_path=self._path, shard_count=num_shards)
+
+        failures = []
+
+        async with self._client.stream.new_producer(
+            container=self._container,
+            max_retries=1,
+            on_failure=lambda stream_path, record, error: failures.append((record, error)),
+        ) as producer:
+            for idx in range(num_records):
+                await producer.put(self._path, {"shard_id": idx % num_shards, "data": f"record #{idx}"})
+
+            # a record to a shard that doesn't exist fails
+            await producer.put(self._path, {"shard_id": num_shards, "data": "invalid shard record"})
+
+        self.assertEqual(1, len(failures))
+        self.assertEqual("invalid shard record", failures[0][0]["data"])
+        self.assertIsNotNone(failures[0][1].error_code)
+
+        received_records = []
+
+        async with self._client.stream.new_consumer(container=self._container, stream_path=self._path) as consumer:
+            while len(received_records) < num_records:
+                record = await consumer.next_record(timeout=10)
+                self.assertIsNotNone(record)
+                received_records.append(record)
+
+        self.assertEqual(
+            sorted(f"record #{idx}" for idx in range(num_records)),
+            sorted(record.data.decode("utf-8") for record in received_records),
+        )
+
+        await self._client.stream.delete(container=self._container, stream_path=self._path)
+
+    async def test_router(self):
+        num_shards = 4
+        num_records = 500
+        partition_keys = [f"key-{idx}" for idx in range(10)]
+
+        await self._client.stream.create(container=self._container, stream_path=self._path, shard_count=num_shards)
+
+        router = self._client.stream.new_router(container=self._container)
+
+        async with self._client.stream.new_producer(
+            container=self._container, max_records=20, router=router
+        ) as producer:
+            for idx in range(num_records):
+                partition_key = partition_keys[idx % len(partition_keys)]
+                await producer.put(self._path, {"partition_key": partition_key, "data": str(idx)})
+
+        records_by_partition_key = {}
+
+        async with self._client.stream.new_consumer(container=self._container, stream_path=self._path) as consumer:
+            for _ in range(num_records):
+                record = await consumer.next_record(timeout=10)
+                self.assertIsNotNone(record)
+                records_by_partition_key.setdefault(record.partition_key, []).append(record)
+
+        self.assertEqual(sorted(partition_keys), sorted(records_by_partition_key))
+
+        for partition_key, records in records_by_partition_key.items():
+            expected_shard_id = await router.get_shard_id(self._path, partition_key)
+
+            # all records of a partition key are put to its shard, in order
+            self.assertEqual({expected_shard_id}, {record.shard_id for record in records})
+            indices = [int(record.data) for record in records]
+            self.assertEqual(sorted(indices), indices)
+
+        await self._client.stream.delete(container=self._container, stream_path=self._path)
+
+    async def test_checkpoint(self):
+        num_shards = 2
+        num_records_per_shard = 10
+        checkpoints_path = os.path.join(self._test_parent_dir, "v3io-py-test-checkpoints")
+
+        await self._delete_dir(checkpoints_path)
+        await self._client.stream.create(container=self._container, stream_path=self._path, shard_count=num_shards)
+
+        for shard_id in range(num_shards):
+            await self._client.stream.put_records(
+                container=self._container,
+                stream_path=self._path,
+                records=[
+                    {"shard_id": shard_id, "data": f"shard {shard_id} record {idx}"}
+                    for idx in range(num_records_per_shard)
+                ],
+            )
+
+        # process some records, checkpointing each
+        processed_records = []
+        checkpoint_store = self._client.stream.new_checkpoint_store(
+            container=self._container, table_path=checkpoints_path
+        )
+
+        async with self._client.stream.new_consumer(
+            container=self._container, stream_path=self._path, checkpoint_store=checkpoint_store
+        ) as consumer:
+            for _ in range(5):
+                record = await consumer.next_record(timeout=10)
+                processed_records.append(record.data)
+                await consumer.checkpoint(record)
+
+        # a stale checkpoint doesn't move the stored one backwards
+        await checkpoint_store.checkpoint(record.shard_id, record.sequence_number - 1)
+        await checkpoint_store.flush()
+
+        # a new consumer resumes after the checkpoints
+        checkpoint_store = self._client.stream.new_checkpoint_store(
+            container=self._container, table_path=checkpoints_path
+        )
+
+        async with self._client.stream.new_consumer(
+            container=self._container, stream_path=self._path, checkpoint_store=checkpoint_store
+        ) as consumer:
+            for _ in range(num_shards * num_records_per_shard - len(processed_records)):
+                record = await consumer.next_record(timeout=10)
+                processed_records.append(record.data)
+
+            self.assertIsNone(await consumer.next_record(timeout=0.5))
+
+        self.assertEqual(
+            sorted(
+                f"shard {shard_id} record {idx}".encode("utf-8")
+                for shard_id in range(num_shards)
+                for idx in range(num_records_per_shard)
+            ),
+            sorted(processed_records),
+        )
+
+        await self._client.stream.delete(container=self._container, stream_path=self._path)
+        await self._delete_dir(checkpoints_path)
+
+    async def test_checkpoint_aggregated(self):
+        num_records = 10
+        checkpoints_path = os.path.join(self._test_parent_dir, "v3io-py-test-checkpoints")
+
+        await self._delete_dir(checkpoints_path)
+        await self._client.stream.create(container=self._container, stream_path=self._path, shard_count=1)
+
+        # all the records are packed into the first record of the shard
+        async with self._client.stream.new_producer(container=self._container, aggregate=True) as producer:
+            for idx in range(num_records):
+                await producer.put(self._path, {"shard_id": 0, "data": str(idx)})
+
+        # process some of the records packed into it
+        checkpoint_store = self._client.stream.new_checkpoint_store(
+            container=self._container, table_path=checkpoints_path
+        )
+
+        async with self._client.stream.new_consumer(
+            container=self._container, stream_path=self._path, checkpoint_store=checkpoint_store
+        ) as consumer:
+            for _ in range(4):
+                await consumer.checkpoint(await consumer.next_record(timeout=10))
+
+        # a new consumer resumes from the first record, skipping the records processed
+        checkpoint_store = self._client.stream.new_checkpoint_store(
+            container=self._container, table_path=checkpoints_path
+        )
+
+        async with self._client.stream.new_consumer(
+            container=self._container, stream_path=self._path, checkpoint_store=checkpoint_store
+        ) as consumer:
+            received_records = [await consumer.next_record(timeout=10) for _ in range(num_records - 4)]
+            self.assertIsNone(await consumer.next_record(timeout=0.5))
+
+        self.assertEqual(
+            [str(idx).encode("utf-8") for idx in range(4, num_records)], [r.data for r in received_records]
+        )
+
+        await self._client.stream.delete(container=self._container, stream_path=self._path)
+        await self._delete_dir(checkpoints_path)
+
+    async def test_consumer_group(self):
+        num_shards = 4
+        leases_path = os.path.join(self._test_parent_dir, "v3io-py-test-leases")
+
+        await self._delete_dir(leases_path)
+        await self._client.stream.create(container=self._container, stream_path=self._path, shard_count=num_shards)
+
+        for shard_id in range(num_shards):
+            await self._client.stream.put_records(
+                container=self._container,
+                stream_path=self._path,
+                records=[{"shard_id": shard_id, "data": f"shard {shard_id}"}],
+            )
+
+        members = [
+            self._client.stream.new_consumer_group(
+                container=self._container,
+                stream_path=self._path,
+                lease_table_path=leases_path,
+                member_id=member_id,
+                lease_duration=1.5,
+                poll_interval=0.1,
+            )
+            for member_id in ("member-0", "member-1")
+        ]
+
+        # the first member takes all the leases
+        record = await members[0].next_record(timeout=5)
+        self.assertIsNotNone(record)
+        self.assertEqual(list(range(num_shards)), members[0].owned_shard_ids)
+
+        # the second member steals its share
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            for member in members:
+                await member.next_record(timeout=0.1)
+
+            if [len(member.owned_shard_ids) for member in members] == [2, 2]:
+                break
+
+        self.assertEqual([2, 2], [len(member.owned_shard_ids) for member in members])
+        self.assertEqual(list(range(num_shards)), sorted(members[0].owned_shard_ids + members[1].owned_shard_ids))
+
+        # once a member leaves, the others take its leases
+        await members[0].close()
+
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline and len(members[1].owned_shard_ids) < num_shards:
+            await members[1].next_record(timeout=0.1)
+
+        self.assertEqual(list(range(num_shards)), members[1].owned_shard_ids)
+
+        await members[1].close()
+        await self._client.stream.delete(container=self._container, stream_path=self._path)
+        await self._delete_dir(leases_path)
+
+    async def test_consumer_group_rebalance(self):
+        num_shards = 4
+        num_records_per_shard = 5
+        leases_path = os.path.join(self._test_parent_dir, "v3io-py-test-leases")
+
+        await self._delete_dir(leases_path)
+        await self._client.stream.create(container=self._container, stream_path=self._path, shard_count=num_shards)
+
+        for shard_id in range(num_shards):
+            await self._client.stream.put_records(
+                container=self._container,
+                stream_path=self._path,
+                records=[
+                    {"shard_id": shard_id, "data": f"shard {shard_id} record {idx}"}
+                    for idx in range(num_records_per_shard)
+                ],
+            )
+
+        members = [
+            self._client.stream.new_consumer_group(
+                container=self._container,
+                stream_path=self._path,
+                lease_table_path=leases_path,
+                member_id=member_id,
+                lease_duration=1.5,
+                poll_interval=0.1,
+            )
+            for member_id in ("member-0", "member-1")
+        ]
+
+        # the first member reads all the records
+        for _ in range(num_shards * num_records_per_shard):
+            self.assertIsNotNone(await members[0].next_record(timeout=5))
+
+        # the second member steals its share
+        received_records = []
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline and [len(member.owned_shard_ids) for member in members] != [2, 2]:
+            await members[1].next_record(timeout=0.1)
+            received_records.append(await members[0].next_record(timeout=0.1))
+
+        self.assertEqual([2, 2], [len(member.owned_shard_ids) for member in members])
+
+        # the first member continues reading the shards it kept from where it was, rather than from their beginning
+        new_records = [f"shard {shard_id} new record".encode("utf-8") for shard_id in members[0].owned_shard_ids]
+        await self._client.stream.put_records(
+            container=self._container,
+            stream_path=self._path,
+            records=[{"shard_id": shard_id, "data": "new record"} for shard_id in members[0].owned_shard_ids],
+        )
+
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and len([record for record in received_records if record]) < 2:
+            received_records.append(await members[0].next_record(timeout=0.1))
+
+        self.assertEqual(
+            sorted(new_records),
+            sorted(
+                f"shard {record.shard_id} {record.data.decode('utf-8')}".encode("utf-8")
+                for record in received_records
+                if record
+            ),
+        )
+
+        for member in members:
+            await member.close()
+
+        await self._client.stream.delete(container=self._container, stream_path=self._path)
+        await self._delete_dir(leases_path)
+
+    async def test_aggregation(self):
+        num_shards = 2
+        num_records = 1000
+
+        await self._client.stream.create(container=self._container, stream_path=self._path, shard_count=num_shards)
+
+        async with self._client.stream.new_producer(container=self._container, aggregate=True) as producer:
+            for idx in range(num_records):
+                await producer.put(
+                    self._path, {"shard_id": idx % num_shards, "partition_key": str(idx % 7), "data": str(idx)}
+                )
+
+        # the records are packed into a few stream records
+        location = (
+            await self._client.stream.seek(
+                container=self._container, stream_path=self._path, shard_id=0, seek_type="EARLIEST"
+            )
+        ).output.location
+        response = await self._client.stream.get_records(
+            container=self._container, stream_path=self._path, shard_id=0, location=location
+        )
+        self.assertLess(len(response.output.records), 10)
+
+        received_records = []
+
+        async with self._client.stream.new_consumer(container=self._container, stream_path=self._path) as consumer:
+            while len(received_records) < num_records:
+                record = await consumer.next_record(timeout=10)
+                self.assertIsNotNone(record)
+                self.assertIsNotNone(record.sub_sequence_number)
+                received_records.append(record)
+
+        received_records.sort(key=lambda record: int(record.data))
+
+        for idx, record in enumerate(received_records):
+            self.assertEqual(str(idx).encode("utf-8"), record.data)
+            self.assertEqual(str(idx % 7), record.partition_key)
+            self.assertEqual(idx % num_shards, record.shard_id)
+
+        await self._client.stream.delete(container=self._container, stream_path=self._path)
+
+    async def test_record_compression(self):
+        await self._client.stream.create(container=self._container, stream_path=self._path, shard_count=1)
+
+        records = [
+            {"shard_id": 0, "data": "compressible " * 100},
+            {"shard_id": 0, "data": b"compressible " * 100, "client_info": b"some client info"},
+        ]
+
+        await self._client.stream.put_records(
+            container=self._container, stream_path=self._path, records=records, compression="zlib"
+        )
+
+        response = await self._client.stream.seek(
+            container=self._container, stream_path=self._path, shard_id=0, seek_type="EARLIEST"
+        )
+
+        response = await self._client.stream.get_records(
+            container=self._container, stream_path=self._path, shard_id=0, location=response.output.location
+        )
+
+        self.assertEqual(2, len(response.output.records))
+        self.assertEqual(b"compressible " * 100, response.output.records[0].data)
+        self.assertIsNone(response.output.records[0].client_info)
+        self.assertEqual(b"compressible " * 100, response.output.records[1].data)
+        self.assertEqual(b"some client info", response.output.records[1].client_info)
+
+        await self._client.stream.delete(container=self._container, stream_path=self._path)
+
     async def _stream_exists(self):
         response = await self._client.stream.describe(
             container=self._container, stream_path=self._path, raise_for_status=v3io.aio.dataplane.RaiseForStatus.never
@@ -252,6 +739,31 @@ class TestObject(Test):
 
         self.assertEqual(404, response.status_code)
 
+    async def test_single_flight(self):
+        await self._client.object.put(container=self._container, path=self._object_path, body="contents")
+
+        self._client.object.single_flight = v3io.aio.dataplane.single_flight.SingleFlight()
+
+        # all gets are made while the first is in flight
+        responses = await asyncio.gather(
+            *[self._client.object.get(container=self._container, path=self._object_path) for _ in range(10)]
+        )
+
+        self.assertEqual(9, self._client.object.single_flight.num_shared)
+
+        for response in responses:
+            self.assertIs(responses[0], response)
+            self.assertEqual(b"contents", response.body)
+
+        # different arguments aren't shared
+        responses = await asyncio.gather(
+            self._client.object.get(container=self._container, path=self._object_path, offset=0, num_bytes=4),
+            self._client.object.get(container=self._container, path=self._object_path, offset=4),
+        )
+
+        self.assertEqual([b"cont", b"ents"], [response.body for response in responses])
+        self.assertEqual(9, self._client.object.single_flight.num_shared)
+
     async def test_append(self):
         contents = [
             "First part",
@@ -268,6 +780,119 @@ class TestObject(Test):
 
         self.assertEqual(response.body.decode("utf-8"), "".join(contents))
 
+    async def test_compression(self):
+        contents = [json.dumps({"key": "value", "index": idx}) * 20 for idx in range(3)]
+
+        # a compressed put followed by compressed appends
+        for content in contents:
+            await self._client.object.put(
+                container=self._container, path=self._object_path, body=content, append=True, compression="zlib"
+            )
+
+        response = await self._client.object.get(container=self._container, path=self._object_path, decompress=True)
+        self.assertEqual("".join(contents), response.body.decode("utf-8"))
+
+        # the stored object is compressed, and only decompressed on request
+        response = await self._client.object.get(container=self._container, path=self._object_path)
+        self.assertTrue(response.body.startswith(v3io.dataplane.compression.marker))
+        self.assertLess(len(response.body), len("".join(contents)))
+
+        # objects that only happen to start with the marker are returned as they are
+        contents = v3io.dataplane.compression.marker + b"\x04zlib not compressed"
+        await self._client.object.put(container=self._container, path=self._object_path, body=contents)
+
+        for decompress in (False, True):
+            response = await self._client.object.get(
+                container=self._container, path=self._object_path, decompress=decompress
+            )
+            self.assertEqual(contents, response.body)
+
+    async def test_download(self):
+        contents = os.urandom(100 * 1024 + 17)
+        await self._client.object.put(container=self._container, path=self._object_path, body=contents)
+
+        # into a buffer
+        buffer = bytearray(len(contents))
+        size = await self._client.object.download(
+            container=self._container, path=self._object_path, dest=buffer, part_size=7000
+        )
+        self.assertEqual(len(contents), size)
+        self.assertEqual(contents, buffer)
+
+        # into a file object
+        file_object = io.BytesIO()
+        await self._client.object.download(
+            container=self._container, path=self._object_path, dest=file_object, part_size=7000
+        )
+        self.assertEqual(contents, file_object.getvalue())
+
+        # into a file
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "object")
+            await self._client.object.download(
+                container=self._container, path=self._object_path, dest=file_path, part_size=7000
+            )
+
+            with open(file_path, "rb") as f:
+                self.assertEqual(contents, f.read())
+
+        # objects put with compression are downloaded as they are stored
+        await self._client.object.put(
+            container=self._container, path=self._object_path, body=b"compressible " * 100, compression="zlib"
+        )
+        response = await self._client.object.get(container=self._container, path=self._object_path)
+
+        file_object = io.BytesIO()
+        await self._client.object.download(container=self._container, path=self._object_path, dest=file_object)
+        self.assertEqual(response.body, file_object.getvalue())
+
+        # a missing object is raised even if its status is allowed
+        with self.assertRaises(v3io.dataplane.response.HttpResponseError) as context:
+            await self._client.object.download(
+                container=self._container,
+                path=self._object_path + "-missing",
+                dest=io.BytesIO(),
+                raise_for_status=v3io.aio.dataplane.RaiseForStatus.never,
+            )
+
+        self.assertEqual(404, context.exception.status_code)
+
+    async def test_upload(self):
+        contents = os.urandom(50 * 1024 + 3)
+        progress = []
+
+        # from a file object
+        size = await self._client.object.upload(
+            container=self._container,
+            path=self._object_path,
+            source=io.BytesIO(contents),
+            chunk_size=7000,
+            progress=progress.append,
+        )
+
+        self.assertEqual(len(contents), size)
+        self.assertEqual([min(idx * 7000, len(contents)) for idx in range(1, 9)], progress)
+        response = await self._client.object.get(container=self._container, path=self._object_path)
+        self.assertEqual(contents, response.body)
+
+        # from a file, overwriting the object
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "object")
+            with open(file_path, "wb") as f:
+                f.write(contents[:10000])
+
+            await self._client.object.upload(
+                container=self._container, path=self._object_path, source=file_path, chunk_size=7000
+            )
+
+        response = await self._client.object.get(container=self._container, path=self._object_path)
+        self.assertEqual(contents[:10000], response.body)
+
+        # an empty source creates an empty object
+        await self._client.object.upload(container=self._container, path=self._object_path, source=io.BytesIO())
+        response = await self._client.object.get(container=self._container, path=self._object_path)
+        self.assertEqual(b"", response.body)
+
     async def test_get_offset(self):
         await self._client.object.put(container=self._container, path=self._object_path, body="1234567890")
 
@@ -283,6 +908,55 @@ class TestObject(Test):
 
         self.assertEqual(response.body.decode("utf-8"), "567")
 
+    async def test_get_into(self):
+        await self._client.object.put(container=self._container, path=self._object_path, body="1234567890")
+
+        # read the whole object
+        buffer = bytearray(16)
+        response = await self._client.object.get_into(container=self._container, path=self._object_path, buffer=buffer)
+
+        self.assertEqual(bytes(response.body), b"1234567890")
+        self.assertEqual(buffer[:10], b"1234567890")
+
+        # read a range into a view of the buffer
+        response = await self._client.object.get_into(
+            container=self._container, path=self._object_path, buffer=memoryview(buffer)[10:], offset=4, num_bytes=3
+        )
+
+        self.assertEqual(bytes(response.body), b"567")
+        self.assertEqual(buffer, b"1234567890567\x00\x00\x00")
+
+        # the buffer must fit the data
+        with self.assertRaises(ValueError):
+            await self._client.object.get_into(container=self._container, path=self._object_path, buffer=bytearray(4))
+
+    async def test_get_stream(self):
+        contents = os.urandom(100 * 1024)
+        await self._client.object.put(container=self._container, path=self._object_path, body=contents)
+
+        # read the object in chunks
+        response = await self._client.object.get_stream(
+            container=self._container, path=self._object_path, chunk_size=4096
+        )
+
+        async with response.body as body:
+            chunks = [chunk async for chunk in body]
+
+        self.assertTrue(all(len(chunk) <= 4096 for chunk in chunks))
+        self.assertEqual(b"".join(chunks), contents)
+
+        # read a range, closing the stream before it's drained
+        response = await self._client.object.get_stream(
+            container=self._container, path=self._object_path, offset=10, num_bytes=1000
+        )
+
+        chunk = await response.body.read(100)
+        self.assertTrue(chunk and contents[10:110].startswith(chunk))
+        await response.body.close()
+
+        response = await self._client.object.get(container=self._container, path=self._object_path)
+        self.assertEqual(response.body, contents)
+
 
 # class TestSchema(Test):
 #     async def asyncSetUp(self):
@@ -527,6 +1201,200 @@ class TestKv(Test):
 
         self.assertEqual(len(received_items), 30)
 
+    async def test_prefetch(self):
+        for idx in range(100):
+            await self._client.kv.put(
+                container=self._container,
+                table_path=self._path,
+                key=f"key-{idx}",
+                attributes={
+                    "attr": idx,
+                },
+            )
+
+        received_items = await self._client.kv.new_cursor(
+            container=self._container, table_path=self._path, limit=30, prefetch=True
+        ).all()
+
+        self.assertEqual(len(received_items), 30)
+
+        # abandon a cursor with a prefetched page
+        async with self._client.kv.new_cursor(
+            container=self._container, table_path=self._path, prefetch=True
+        ) as cursor:
+            self.assertIsNotNone(await cursor.next_item())
+
+    async def test_parallel_cursor(self):
+        for idx in range(100):
+            await self._client.kv.put(
+                container=self._container,
+                table_path=self._path,
+                key=f"key-{idx}",
+                attributes={
+                    "attr": idx,
+                },
+            )
+
+        # read all segments in parallel, items arrive in no particular order
+        received_items = await self._client.kv.new_parallel_cursor(
+            container=self._container, table_path=self._path, total_segments=4
+        ).all()
+
+        self.assertEqual(list(range(100)), sorted(item["attr"] for item in received_items))
+
+        # limit is enforced across all segments
+        async with self._client.kv.new_parallel_cursor(
+            container=self._container, table_path=self._path, total_segments=4, limit=30
+        ) as items_cursor:
+            received_items = [item async for item in items_cursor]
+
+        self.assertEqual(len(received_items), 30)
+
+    async def test_cache(self):
+        self._client.kv.cache = v3io.dataplane.kv_cache.Cache(max_items=2)
+
+        for idx in range(3):
+            await self._client.kv.put(
+                container=self._container, table_path=self._path, key=f"key-{idx}", attributes={"attr": idx}
+            )
+
+        # the second read is served from the cache
+        for _ in range(2):
+            response = await self._client.kv.get(container=self._container, table_path=self._path, key="key-0")
+            self.assertEqual(0, response.output.item["attr"])
+
+        self.assertEqual((1, 1), (self._client.kv.cache.hits, self._client.kv.cache.misses))
+
+        # writing the item invalidates it
+        await self._client.kv.update(
+            container=self._container, table_path=self._path, key="key-0", attributes={"attr": 10}
+        )
+        response = await self._client.kv.get(container=self._container, table_path=self._path, key="key-0")
+        self.assertEqual(10, response.output.item["attr"])
+        self.assertEqual(2, self._client.kv.cache.misses)
+
+        # reading more items than max_items evicts the least recently used
+        for idx in range(1, 3):
+            await self._client.kv.get(container=self._container, table_path=self._path, key=f"key-{idx}")
+
+        self.assertEqual(2, len(self._client.kv.cache))
+        self.assertEqual(1, self._client.kv.cache.evictions)
+
+        await self._client.kv.delete(container=self._container, table_path=self._path, key="key-2")
+        response = await self._client.kv.get(
+            container=self._container,
+            table_path=self._path,
+            key="key-2",
+            raise_for_status=v3io.aio.dataplane.RaiseForStatus.never,
+        )
+        self.assertEqual(404, response.status_code)
+
+    async def test_table(self):
+        table = self._client.kv.table(container=self._container, table_path=self._path)
+
+        for idx in range(3):
+            await table.put(f"key {idx}", {"attr": idx, "name": f"name-{idx}"})
+
+        await table.update("key 0", expression="SET attr = attr + 10")
+        await table.update("key 1", attributes={"name": "renamed"})
+
+        response = await table.get("key 0", attribute_names=["attr"])
+        self.assertEqual({"attr": 10}, response.output.item)
+
+        # the table handle and the kv calls address the same items
+        response = await self._client.kv.get(container=self._container, table_path=self._path, key="key 1")
+        self.assertEqual((1, "renamed"), (response.output.item["attr"], response.output.item["name"]))
+
+        await table.delete("key 2")
+        response = await table.get("key 2", raise_for_status=v3io.aio.dataplane.RaiseForStatus.never)
+        self.assertEqual(404, response.status_code)
+
+        # reads through a table handle go through the kv cache
+        self._client.kv.cache = v3io.dataplane.kv_cache.Cache()
+        await table.get("key 0")
+        await table.put("key 0", {"attr": 20})
+        self.assertEqual(20, (await table.get("key 0")).output.item["attr"])
+        self.assertEqual(0, self._client.kv.cache.hits)
+
+    async def test_get_many(self):
+        await self._client.kv.put_many(
+            container=self._container,
+            table_path=self._path,
+            items={f"key-{idx}": {"attr": idx, "other": "x"} for idx in range(10)},
+        )
+
+        keys = ["key-5", "key-0", "missing", "key-9", "key-0"]
+        items = await self._client.kv.get_many(
+            container=self._container, table_path=self._path, keys=keys, attribute_names=["attr"]
+        )
+
+        self.assertEqual([{"attr": 5}, {"attr": 0}, None, {"attr": 9}, {"attr": 0}], items)
+
+        # items are read from the table even if the model has a cache
+        self._client.kv.cache = v3io.dataplane.kv_cache.Cache()
+        items = await self._client.kv.get_many(container=self._container, table_path=self._path, keys=keys)
+
+        self.assertEqual([5, 0, None, 9, 0], [item["attr"] if item else None for item in items])
+        self.assertEqual(
+            (0, 0, 0), (self._client.kv.cache.hits, self._client.kv.cache.misses, len(self._client.kv.cache))
+        )
+
+    async def test_request_many(self):
+        await self._client.kv.put_many(
+            container=self._container, table_path=self._path, items={f"key-{idx}": {"attr": idx} for idx in range(4)}
+        )
+
+        # every item is updated with a condition of its own, which only the even items pass
+        requests = [
+            (f"key-{idx}", {"expression": "SET attr = attr + 10", "condition": f"attr == {idx - idx % 2}"})
+            for idx in range(4)
+        ]
+
+        responses = self._client.kv.request_many("update", self._container, self._path, requests)
+        self.assertEqual(
+            [(f"key-{idx}", status_code) for idx, status_code in enumerate([200, 400, 200, 400])],
+            [(request[0], response.status_code) async for request, response in responses],
+        )
+
+        items = await self._client.kv.get_many(self._container, self._path, [f"key-{idx}" for idx in range(4)])
+        self.assertEqual([10, 1, 12, 3], [item["attr"] for item in items])
+
+    async def test_put_many(self):
+        failed_responses = await self._client.kv.put_many(
+            container=self._container,
+            table_path=self._path,
+            items=((f"key-{idx}", {"attr": idx}) for idx in range(20)),
+        )
+
+        self.assertEqual({}, failed_responses)
+
+        # increment the even items
+        failed_responses = await self._client.kv.update_many(
+            container=self._container,
+            table_path=self._path,
+            items={f"key-{idx}": None for idx in range(0, 20, 2)},
+            expression="SET attr = attr + 1",
+        )
+
+        self.assertEqual({}, failed_responses)
+
+        received_items = await self._client.kv.new_cursor(container=self._container, table_path=self._path).all()
+        self.assertEqual(
+            sorted(idx + 1 if idx % 2 == 0 else idx for idx in range(20)),
+            sorted(item["attr"] for item in received_items),
+        )
+
+        # failures are reported per key
+        failed_responses = await self._client.kv.put_many(
+            container=self._container,
+            table_path=self._path,
+            items={"key-1": {"attr": 0}, "key-2": {"attr": 0}},
+            condition="attr > 1",
+        )
+
+        self.assertEqual(["key-1"], list(failed_responses))
+        self.assertEqual(400, failed_responses["key-1"].status_code)
+
     async def _delete_items(self, path, items):
         # delete items
         for item_key, _ in future.utils.viewitems(items):
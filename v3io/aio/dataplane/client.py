@@ -20,6 +20,7 @@ import ujson
 import v3io.aio.dataplane.transport.aiohttp
 import v3io.common.helpers
 import v3io.dataplane.batch
+import v3io.dataplane.json_codec
 import v3io.dataplane.kv_cursor
 import v3io.dataplane.output
 import v3io.dataplane.request
@@ -40,6 +41,7 @@ class Client(object):
         logger_verbosity=None,
         transport_verbosity="info",
         retry_intervals=None,
+        json_codec=None,
     ):
         """Creates a v3io client, used to access v3io
 
@@ -66,6 +68,9 @@ class Client(object):
             'logger_verbosity' must be set to DEBUG
         retry_intervals (Optional) : tuple of float
             Tuple of intervals to use for exponential backoff in case of retries
+        json_codec (Optional) : str / Codec
+            The codec with which to encode and decode JSON bodies (see v3io.dataplane.json_codec) - ujson, orjson, json
+            or a `Codec` object. Defaults to orjson if it is installed, and ujson otherwise
 
         Return Value
         ----------
@@ -83,6 +88,8 @@ class Client(object):
             self._logger, endpoint, max_connections, timeout, transport_verbosity, retry_intervals
         )
 
+        self._transport.json_codec = v3io.dataplane.json_codec.get_codec(json_codec)
+
         # create models
         self.kv, self.object, self.stream, self.container = self._create_models()
 
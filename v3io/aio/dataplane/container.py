@@ -12,10 +12,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import asyncio
+
+import v3io.dataplane.container
 import v3io.dataplane.kv_cursor
 import v3io.dataplane.model
 import v3io.dataplane.output
 import v3io.dataplane.request
+import v3io.dataplane.transport
 
 
 class Model(v3io.dataplane.model.Model):
@@ -70,3 +74,158 @@ class Model(v3io.dataplane.model.Model):
             locals(),
             v3io.dataplane.output.GetContainerContentsOutput,
         )
+
+    async def iter_contents(
+        self,
+        container,
+        path,
+        access_key=None,
+        raise_for_status=None,
+        get_all_attributes=None,
+        directories_only=None,
+        limit=None,
+    ):
+        """Lists the contents of a path, following the NextMarker of every page to request the next page only once the
+        entries of the previous one were consumed. Pages are parsed as they arrive, so their first entries are
+        yielded before their last ones are received. A page that fails is raised as `HttpResponseError` even if
+        raise_for_status allows its status, since the listing can't continue past it.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        path (Required) : str
+            The path within the container
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        get_all_attributes (Optional) : bool
+            False (default) - retrieves basic attributes
+            True - retrieves all attributes of the underlying objects
+        directories_only (Optional) : bool
+            False (default) - retrieves objects (contents) and directories (common prefixes)
+            True - retrieves only directories (common prefixes)
+        limit (Optional) : int
+            Number of objects/directories to receive per page. default: 1000
+
+        Return Value
+        ----------
+        An async generator of the `ContainerContent` and `ContainerCommonPrefix` entries of every page, in the order
+        of the listing.
+        """
+        marker = None
+
+        while True:
+            response = await self._transport.request(
+                container,
+                access_key or self._access_key,
+                raise_for_status,
+                v3io.dataplane.request.encode_get_container_contents,
+                {
+                    "path": path,
+                    "get_all_attributes": get_all_attributes,
+                    "directories_only": directories_only,
+                    "limit": limit,
+                    "marker": marker,
+                },
+                stream_body=True,
+            )
+
+            response.raise_for_status(v3io.dataplane.transport.RaiseForStatus.always)
+
+            parser = v3io.dataplane.output.ContainerContentsParser()
+
+            async with response.body as body:
+                async for chunk in body:
+                    for entry in parser.feed(chunk):
+                        yield entry
+
+            for entry in parser.close():
+                yield entry
+
+            marker = v3io.dataplane.container.get_next_marker(parser.output)
+            if marker is None:
+                return
+
+    async def walk(
+        self,
+        container,
+        path,
+        access_key=None,
+        raise_for_status=None,
+        get_all_attributes=None,
+        directories_only=None,
+        limit=None,
+    ):
+        """Walks the directory tree under a path, listing directories concurrently over max_connections requests.
+        Directories are listed depth first, descending into the directories of a page before listing the next page of
+        its directory, so the frontier of pages yet to be listed holds at most the directories of one page per level
+        of the tree and per connection. A page that fails is raised as `HttpResponseError` even if raise_for_status
+        allows its status.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        path (Required) : str
+            The path within the container
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        get_all_attributes (Optional) : bool
+            False (default) - retrieves basic attributes
+            True - retrieves all attributes of the underlying objects
+        directories_only (Optional) : bool
+            False (default) - retrieves objects (contents) and directories (common prefixes)
+            True - retrieves only directories (common prefixes)
+        limit (Optional) : int
+            Number of objects/directories to receive per page. default: 1000
+
+        Return Value
+        ----------
+        An async generator of (path, common prefixes, contents) tuples - one per page listed, in the order in which
+        the pages arrive. Directories with several pages of entries appear in several tuples.
+        """
+        frontier = v3io.dataplane.container.Frontier(path)
+
+        # listing task -> the path of the page it lists
+        inflight_pages = {}
+
+        try:
+            while True:
+                for page in frontier:
+                    task = asyncio.ensure_future(
+                        self.list(
+                            container,
+                            page[0],
+                            access_key,
+                            v3io.dataplane.transport.RaiseForStatus.never,
+                            get_all_attributes=get_all_attributes,
+                            directories_only=directories_only,
+                            limit=limit,
+                            marker=page[1],
+                        )
+                    )
+
+                    inflight_pages[task] = page[0]
+
+                    if len(inflight_pages) >= self._transport.max_connections:
+                        break
+
+                if not inflight_pages:
+                    return
+
+                done, _ = await asyncio.wait(inflight_pages, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    page_path = inflight_pages.pop(task)
+                    response = task.result()
+
+                    # the pages under a page that failed can't be listed
+                    response.raise_for_status(v3io.dataplane.transport.RaiseForStatus.always)
+                    output = response.output
+
+                    frontier.add_page(page_path, output)
+
+                    yield page_path, output.common_prefixes, output.contents
+        finally:
+            for task in inflight_pages:
+                task.cancel()
@@ -12,6 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import asyncio
+
+import v3io.dataplane.kv_columnar
+
+
 class Cursor(object):
     def __init__(
         self,
@@ -30,15 +35,17 @@ class Cursor(object):
         total_segments=None,
         sort_key_range_start=None,
         sort_key_range_end=None,
+        prefetch=False,
     ):
         self._context = context
         self._container_name = container_name
         self._access_key = access_key
         self._current_response = None
-        self._current_items = None
+        self._current_typed_items = None
         self._current_item = None
         self._current_item_index = 0
         self._total_items_read = 0
+        self._prefetched_response = None
 
         # get items params
         self.raise_for_status = raise_for_status
@@ -53,33 +60,160 @@ class Cursor(object):
         self.total_segments = total_segments
         self.sort_key_range_start = sort_key_range_start
         self.sort_key_range_end = sort_key_range_end
+        self.prefetch = prefetch
 
     async def next_item(self):
-        calculated_limit = self.limit
-
         # check if we already reached the limit we were asked for
-        if self.limit is not None:
-            # if we already passed the limit, stop here
-            if self._total_items_read >= self.limit:
-                return None
-
-            # don't ask for more items than we'll read
-            calculated_limit -= self._total_items_read
+        if self.limit is not None and self._total_items_read >= self.limit:
+            return None
 
-        if self._current_item_index < len(self._current_items or []):
-            self._current_item = self._current_items[self._current_item_index]
+        if self._current_item_index < len(self._current_typed_items or []):
+            self._current_item = self._current_response.output.items[self._current_item_index]
             self._current_item_index += 1
             self._total_items_read += 1
 
             return self._current_item
 
-        if self._current_response and (self._current_response.output.last or len(self._current_items) == 0):
+        # get the next batch, if there is one
+        if not await self._read_next_page():
+            return None
+
+        # and recurse into next now that we repopulated response
+        return await self.next_item()
+
+    async def next_page(self):
+        """Returns the items of the current page which were not yet read, reading the next page if all of them were.
+        Returns None once there are no more items to read"""
+        page_range = await self._read_page_range()
+        if page_range is None:
+            return None
+
+        return self._current_response.output.items[page_range]
+
+    async def to_columns(self):
+        """Reads all the remaining items, returning a dict of attribute name to a list of its values (None for items
+        which don't have the attribute). Values are decoded per attribute, without creating a dict per item"""
+        return (await self._read_columns()).to_lists()
+
+    async def to_numpy(self):
+        """Reads all the remaining items, returning a dict of attribute name to a numpy array of its values.
+        Requires numpy. See `v3io.dataplane.kv_columnar.Columns.to_numpy`"""
+        return (await self._read_columns()).to_numpy()
+
+    async def to_pandas(self):
+        """Reads all the remaining items, returning a pandas DataFrame with a column per attribute. Requires pandas"""
+        return (await self._read_columns()).to_pandas()
+
+    async def all(self):
+        items = []
+
+        while True:
+            item = await self.next_item()
+
+            if item is None:
+                break
+
+            items.append(item)
+
+        return items
+
+    async def close(self):
+        """Cancels the request of a prefetched page. Should be called if prefetch is enabled and the cursor is
+        abandoned before all items were read"""
+        if self._prefetched_response is None:
+            return
+
+        prefetched_response, self._prefetched_response = self._prefetched_response, None
+        prefetched_response.cancel()
+
+        await asyncio.gather(prefetched_response, return_exceptions=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def _read_columns(self):
+        columns = v3io.dataplane.kv_columnar.Columns()
+
+        while True:
+            page_range = await self._read_page_range()
+            if page_range is None:
+                return columns
+
+            columns.add_typed_items(self._current_typed_items[page_range])
+
+    async def _read_page_range(self):
+        # check if we already reached the limit we were asked for
+        if self.limit is not None and self._total_items_read >= self.limit:
             return None
 
+        # if we still have unread items in memory (from the previous scan), return them all
+        if self._current_item_index < len(self._current_typed_items or []):
+            end_index = len(self._current_typed_items)
+
+            # don't return more items than we were asked for
+            if self.limit is not None:
+                end_index = min(end_index, self._current_item_index + self.limit - self._total_items_read)
+
+            page_range = slice(self._current_item_index, end_index)
+            self._total_items_read += end_index - self._current_item_index
+            self._current_item_index = end_index
+
+            return page_range
+
+        # get the next batch, if there is one
+        if not await self._read_next_page():
+            return None
+
+        return await self._read_page_range()
+
+    async def _read_next_page(self):
+        if self._current_response and (self._current_response.output.last or len(self._current_typed_items) == 0):
+            return False
+
+        # if the request for this page was already sent, just wait for its response. otherwise do the request now
+        if self._prefetched_response is not None:
+            prefetched_response, self._prefetched_response = self._prefetched_response, None
+            self._current_response = await prefetched_response
+        else:
+            self._current_response = await self._scan(self._total_items_read)
+
+        # raise if there was an issue
+        self._current_response.raise_for_status(self.raise_for_status)
+
+        # set items. they are decoded only if read through next_item() / next_page()
+        self._current_typed_items = self._current_response.output.typed_items
+        self._current_item_index = 0
+
+        # send the request for the next page right away, so that it is read while the items of this page are consumed
+        if self.prefetch:
+            self._prefetch_next_page()
+
+        return True
+
+    def _prefetch_next_page(self):
+        if self._current_response.output.last or len(self._current_typed_items) == 0:
+            return
+
+        # the items of the current page count as read, since they will be by the time the next page is needed
+        total_items_read = self._total_items_read + len(self._current_typed_items)
+        if self.limit is not None and total_items_read >= self.limit:
+            return
+
+        self._prefetched_response = asyncio.ensure_future(self._scan(total_items_read))
+
+    def _scan(self, total_items_read):
+        calculated_limit = self.limit
+
+        # don't ask for more items than we'll read
+        if self.limit is not None:
+            calculated_limit -= total_items_read
+
         self.marker = self._current_response.output.next_marker if self._current_response else None
 
-        # get the next batch
-        self._current_response = await self._context.kv.scan(
+        return self._context.kv.scan(
             self._container_name,
             self.table_path,
             self.table_name,
@@ -96,15 +230,78 @@ class Cursor(object):
             self.sort_key_range_end,
         )
 
-        # raise if there was an issue
-        self._current_response.raise_for_status(self.raise_for_status)
 
-        # set items
-        self._current_items = self._current_response.output.items
+class ParallelCursor(object):
+    """Scans a table by reading each of its segments through a separate cursor, in parallel. Items of the different
+    segments are interleaved in the order in which their pages arrive"""
+
+    _segment_done = object()
+
+    def __init__(
+        self,
+        context,
+        container_name,
+        access_key,
+        table_path,
+        table_name,
+        total_segments,
+        raise_for_status=None,
+        attribute_names="*",
+        filter_expression=None,
+        sharding_key=None,
+        limit=None,
+        sort_key_range_start=None,
+        sort_key_range_end=None,
+        max_workers=None,
+        prefetch=False,
+    ):
+        self._context = context
+        self._container_name = container_name
+        self._access_key = access_key
+        self._current_items = []
         self._current_item_index = 0
+        self._total_items_read = 0
+        self._tasks = None
+        self._pages = None
+        self._num_running_segments = 0
+        self._closed = False
 
-        # and recurse into next now that we repopulated response
-        return await self.next_item()
+        # get items params
+        self.raise_for_status = raise_for_status
+        self.table_path = table_path
+        self.table_name = table_name
+        self.total_segments = total_segments
+        self.attribute_names = attribute_names
+        self.filter_expression = filter_expression
+        self.sharding_key = sharding_key
+        self.limit = limit
+        self.sort_key_range_start = sort_key_range_start
+        self.sort_key_range_end = sort_key_range_end
+        self.prefetch = prefetch
+
+        # there's no point in having more workers than segments or connections
+        self.max_workers = min(total_segments, max_workers or context._transport.max_connections)
+
+    async def next_item(self):
+        # check if we already reached the limit we were asked for
+        if self.limit is not None and self._total_items_read >= self.limit:
+            await self.close()
+            return None
+
+        # read pages until we get one with items or all segments are done
+        while self._current_item_index >= len(self._current_items):
+            items = await self._next_page()
+            if items is None:
+                return None
+
+            self._current_items = items
+            self._current_item_index = 0
+
+        item = self._current_items[self._current_item_index]
+        self._current_item_index += 1
+        self._total_items_read += 1
+
+        return item
 
     async def all(self):
         items = []
@@ -118,3 +315,101 @@ class Cursor(object):
             items.append(item)
 
         return items
+
+    async def close(self):
+        """Stops reading segments. Must be called if the cursor is abandoned before all items were read"""
+        if self._closed:
+            return
+
+        self._closed = True
+
+        if self._tasks:
+            for task in self._tasks:
+                task.cancel()
+
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        item = await self.next_item()
+
+        if item is None:
+            raise StopAsyncIteration
+
+        return item
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def _next_page(self):
+        if self._closed:
+            return None
+
+        # start reading all segments when the first page is requested
+        if self._tasks is None:
+            self._start()
+
+        while self._num_running_segments:
+            page = await self._pages.get()
+
+            if page is self._segment_done:
+                self._num_running_segments -= 1
+            elif isinstance(page, BaseException):
+                await self.close()
+                raise page
+            else:
+                return page
+
+        await self.close()
+
+        return None
+
+    def _start(self):
+        # hold up to two pages per worker, so that a slow consumer doesn't cause the entire table to be read to memory
+        self._pages = asyncio.Queue(maxsize=self.max_workers * 2)
+        self._num_running_segments = self.total_segments
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        self._tasks = [
+            asyncio.ensure_future(self._read_segment(segment, semaphore)) for segment in range(self.total_segments)
+        ]
+
+    async def _read_segment(self, segment, semaphore):
+        try:
+            async with semaphore:
+                cursor = Cursor(
+                    self._context,
+                    self._container_name,
+                    self._access_key,
+                    self.table_path,
+                    self.table_name,
+                    self.raise_for_status,
+                    self.attribute_names,
+                    self.filter_expression,
+                    None,
+                    self.sharding_key,
+                    self.limit,
+                    segment,
+                    self.total_segments,
+                    self.sort_key_range_start,
+                    self.sort_key_range_end,
+                    self.prefetch,
+                )
+
+                async with cursor:
+                    while True:
+                        items = await cursor.next_page()
+                        if items is None:
+                            break
+
+                        await self._pages.put(items)
+
+        except Exception as e:
+            await self._pages.put(e)
+
+        await self._pages.put(self._segment_done)
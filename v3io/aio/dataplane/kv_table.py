@@ -0,0 +1,108 @@
+# Copyright 2019 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import v3io.dataplane.output
+import v3io.dataplane.request
+
+
+class Table(object):
+    """A handle to the items of a KV table, bound to a container and an access key. Requests are created from a
+    `TableRequestTemplate`, so each call only encodes the key and the body of its item. Calls behave like the kv calls
+    of the same names"""
+
+    def __init__(self, context, container_name, access_key, table_path, raise_for_status=None):
+        self._context = context
+        self._transport = context._transport
+        self._template = v3io.dataplane.request.TableRequestTemplate(container_name, access_key, table_path)
+
+        self.container_name = container_name
+        self.table_path = table_path
+        self.raise_for_status = raise_for_status
+
+    async def put(self, key, attributes, condition=None, raise_for_status=None):
+        """Creates or overwrites an item (see kv.put)"""
+        try:
+            return await self._send(
+                self._template.new_put_item_request(
+                    key, attributes, condition, raise_for_status or self.raise_for_status, self._transport.json_codec
+                )
+            )
+        finally:
+            self._context.kv._invalidate_cached_item(self.container_name, self.table_path, key)
+
+    async def update(
+        self,
+        key,
+        attributes=None,
+        expression=None,
+        condition=None,
+        update_mode=None,
+        alternate_expression=None,
+        raise_for_status=None,
+    ):
+        """Updates the attributes of an item (see kv.update)"""
+        try:
+            return await self._send(
+                self._template.new_update_item_request(
+                    key,
+                    attributes,
+                    expression,
+                    condition,
+                    update_mode,
+                    alternate_expression,
+                    raise_for_status or self.raise_for_status,
+                    self._transport.json_codec,
+                )
+            )
+        finally:
+            self._context.kv._invalidate_cached_item(self.container_name, self.table_path, key)
+
+    async def get(self, key, attribute_names="*", raise_for_status=None):
+        """Retrieves the attributes of an item (see kv.get). Reads go through the cache and single flight of the kv
+        model, if it has them"""
+        raise_for_status = raise_for_status or self.raise_for_status
+
+        if self._context.kv.cache is not None or self._context.kv.single_flight is not None:
+            return await self._context.kv.get(
+                self.container_name,
+                self.table_path,
+                key,
+                self._template.access_key,
+                raise_for_status,
+                attribute_names,
+            )
+
+        return await self._send(
+            self._template.new_get_item_request(
+                key,
+                attribute_names,
+                raise_for_status,
+                v3io.dataplane.output.GetItemOutput,
+                self._transport.json_codec,
+            )
+        )
+
+    async def delete(self, key, raise_for_status=None):
+        """Deletes an item (see kv.delete)"""
+        try:
+            return await self._send(
+                self._template.new_delete_item_request(
+                    key, raise_for_status or self.raise_for_status, self._transport.json_codec
+                )
+            )
+        finally:
+            self._context.kv._invalidate_cached_item(self.container_name, self.table_path, key)
+
+    async def _send(self, request):
+        return await self._transport.send_request(request)
@@ -12,10 +12,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import asyncio
+import functools
+
+import v3io.dataplane.compression
 import v3io.dataplane.kv_cursor
 import v3io.dataplane.model
+import v3io.dataplane.object
 import v3io.dataplane.output
 import v3io.dataplane.request
+import v3io.dataplane.response
+import v3io.dataplane.single_flight
 
 
 class Model(v3io.dataplane.model.Model):
@@ -24,6 +31,9 @@ class Model(v3io.dataplane.model.Model):
         self._access_key = client._access_key
         self._transport = client._transport
 
+        # an optional v3io.aio.dataplane.single_flight.SingleFlight through which identical gets share requests
+        self.single_flight = None
+
     async def head(self, container, path, access_key=None, raise_for_status=None):
         """Retrieves system attributes of object from a container.
 
@@ -48,7 +58,9 @@ class Model(v3io.dataplane.model.Model):
             locals(),
         )
 
-    async def get(self, container, path, access_key=None, raise_for_status=None, offset=None, num_bytes=None):
+    async def get(
+        self, container, path, access_key=None, raise_for_status=None, offset=None, num_bytes=None, decompress=False
+    ):
         """Retrieves an object from a container.
 
         Parameters
@@ -63,20 +75,181 @@ class Model(v3io.dataplane.model.Model):
             A numeric offset into the object (in bytes). Defaults to 0
         num_bytes (Optional) : int
             Number of bytes to return. By default equal to len(object)-offset
+        decompress (Optional) : bool
+            Whether to decompress objects put with compression. Only objects read whole are decompressed, and bodies
+            that don't decode as compressed are returned as they are. Defaults to False
 
         Return Value
         ----------
         A `Response` object, whose `body` is populated with the body of the object.
         """
-        return await self._transport.request(
+        access_key = access_key or self._access_key
+
+        if self.single_flight is None:
+            return await self._get(container, path, access_key, raise_for_status, offset, num_bytes, decompress)
+
+        call_key = v3io.dataplane.single_flight.get_call_key(
+            "object.get", container, path, access_key, raise_for_status, offset, num_bytes, decompress
+        )
+
+        return await self.single_flight.do(
+            call_key,
+            functools.partial(self._get, container, path, access_key, raise_for_status, offset, num_bytes, decompress),
+        )
+
+    async def get_into(
+        self, container, path, buffer, access_key=None, raise_for_status=None, offset=None, num_bytes=None
+    ):
+        """Reads an object (or a range of it) into a caller-supplied buffer. The body is read into the buffer as it
+        arrives, so reading many large objects doesn't allocate a new body per read. Objects put
+        with compression are not decompressed.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        path (Required) : str
+            The path of the object
+        buffer (Required) : buffer
+            A writable buffer (e.g. a bytearray, memoryview or mmap) at least as large as the data read
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        offset (Optional) : int
+            A numeric offset into the object (in bytes). Defaults to 0
+        num_bytes (Optional) : int
+            Number of bytes to read. By default equal to len(object)-offset
+
+        Return Value
+        ----------
+        A `Response` object, whose `body` is a memoryview of the part of the buffer holding the data read.
+        """
+        response = await self._transport.request(
             container,
             access_key or self._access_key,
             raise_for_status,
             v3io.dataplane.request.encode_get_object,
-            locals(),
+            {"path": path, "offset": offset, "num_bytes": num_bytes},
+            body_buffer=buffer,
         )
 
-    async def put(self, container, path, access_key=None, raise_for_status=None, body=None, append=None):
+        return v3io.dataplane.object.fill_buffer(buffer, response)
+
+    async def get_stream(
+        self,
+        container,
+        path,
+        access_key=None,
+        raise_for_status=None,
+        offset=None,
+        num_bytes=None,
+        chunk_size=v3io.dataplane.response.default_chunk_size,
+    ):
+        """Retrieves an object (or a range of it) as a stream, read as it arrives rather than held in memory whole.
+        The connection the object is read from is held until the stream is drained or closed. Objects put with
+        compression are not decompressed.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        path (Required) : str
+            The path of the object
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        offset (Optional) : int
+            A numeric offset into the object (in bytes). Defaults to 0
+        num_bytes (Optional) : int
+            Number of bytes to return. By default equal to len(object)-offset
+        chunk_size (Optional) : int
+            The maximum number of bytes in the chunks yielded when iterating the stream
+
+        Return Value
+        ----------
+        A `Response` object, whose `body` is a BodyStream (an async iterator) yielding the chunks of the object - to
+        be used as an async context manager, or otherwise drained or closed.
+        """
+        response = await self._transport.request(
+            container,
+            access_key or self._access_key,
+            raise_for_status,
+            v3io.dataplane.request.encode_get_object,
+            {"path": path, "offset": offset, "num_bytes": num_bytes},
+            stream_body=True,
+        )
+
+        if 200 <= response.status_code < 300:
+            response.body.chunk_size = chunk_size
+
+        return response
+
+    async def download(
+        self,
+        container,
+        path,
+        dest,
+        access_key=None,
+        raise_for_status=None,
+        part_size=v3io.dataplane.object.default_part_size,
+    ):
+        """Downloads an object in parts of part_size bytes, fetched in parallel over all the connections of the
+        client. Each part is written at its offset in the destination as it arrives, so large objects are neither
+        held in memory nor fetched over a single connection.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        path (Required) : str
+            The path of the object
+        dest (Required) : str / file / buffer
+            Where to write the object - a file path (created or truncated), a binary file object open for writing
+            or a writable buffer (e.g. a bytearray) at least as large as the object
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        part_size (Optional) : int
+            The number of bytes to fetch per request
+
+        The object is downloaded as it is stored - objects put with compression are not decompressed. Failures are
+        raised as `HttpResponseError` even if raise_for_status allows them, since the object can't be written
+        without its parts.
+
+        Return Value
+        ----------
+        The size of the object.
+        """
+        access_key = access_key or self._access_key
+
+        size = v3io.dataplane.object.get_object_size(await self.head(container, path, access_key, raise_for_status))
+        part_ranges = iter(v3io.dataplane.object.get_part_ranges(size, part_size))
+        loop = asyncio.get_running_loop()
+
+        with v3io.dataplane.object.open_download_destination(dest, size) as write:
+
+            async def _download_parts():
+                for part_range in part_ranges:
+                    response = await self._get(
+                        container, path, access_key, raise_for_status, part_range[0], part_range[1], False
+                    )
+
+                    # parts are written to files in the default executor, so as not to block the event loop
+                    await loop.run_in_executor(None, write, part_range, response)
+
+            workers = [asyncio.ensure_future(_download_parts()) for _ in range(self._transport.max_connections)]
+
+            try:
+                await asyncio.gather(*workers)
+            except BaseException:
+                for worker in workers:
+                    worker.cancel()
+
+                await asyncio.gather(*workers, return_exceptions=True)
+                raise
+
+        return size
+
+    async def put(
+        self, container, path, access_key=None, raise_for_status=None, body=None, append=None, compression=None
+    ):
         """Adds a new object to a container, or appends data to an existing object. The option to append data is
         extension to the S3 PUT Object capabilities
 
@@ -92,6 +265,9 @@ class Model(v3io.dataplane.model.Model):
             The contents of the object
         append (Optional) : bool
             If True, the put appends the data to the end of the object. Defaults to False
+        compression (Optional) : str
+            The codec with which to compress the body (see v3io.dataplane.compression) - zlib, lz4 or zstd. The
+            codec is recorded in the object, which `get` decompresses when reading it whole with decompress=True
 
         Return Value
         ----------
@@ -105,6 +281,65 @@ class Model(v3io.dataplane.model.Model):
             locals(),
         )
 
+    async def upload(
+        self,
+        container,
+        path,
+        source,
+        access_key=None,
+        raise_for_status=None,
+        chunk_size=v3io.dataplane.object.default_part_size,
+        progress=None,
+    ):
+        """Uploads an object from a file, reading and putting it chunk_size bytes at a time - the first chunk
+        creates (or overwrites) the object and the others are appended to it. Only a single chunk is held in memory,
+        regardless of the size of the file. The object is partial until the upload completes.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        path (Required) : str
+            The path of the object
+        source (Required) : str / file
+            A file path or a binary file object open for reading, read from its current position to its end
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        chunk_size (Optional) : int
+            The number of bytes to put per request
+        progress (Optional) : callable
+            Called with the number of bytes uploaded so far after each chunk is put
+
+        Return Value
+        ----------
+        The number of bytes uploaded.
+        """
+        num_bytes_uploaded = 0
+        loop = asyncio.get_running_loop()
+        chunks = v3io.dataplane.object.read_chunks(source, chunk_size)
+
+        try:
+            while True:
+                # chunks are read from the source in the default executor, so as not to block the event loop
+                chunk = await loop.run_in_executor(None, next, chunks, None)
+                if chunk is None:
+                    break
+
+                await self.put(container, path, access_key, raise_for_status, body=chunk, append=num_bytes_uploaded > 0)
+
+                num_bytes_uploaded += len(chunk)
+
+                if progress is not None:
+                    progress(num_bytes_uploaded)
+        finally:
+            chunks.close()
+
+        # an empty source creates an empty object
+        if not num_bytes_uploaded:
+            await self.put(container, path, access_key, raise_for_status, body=b"")
+
+        return num_bytes_uploaded
+
     async def delete(self, container, path, access_key=None, raise_for_status=None):
         """Deletes an object from a container.
 
@@ -128,3 +363,18 @@ class Model(v3io.dataplane.model.Model):
             v3io.dataplane.request.encode_delete_object,
             locals(),
         )
+
+    async def _get(self, container, path, access_key, raise_for_status, offset, num_bytes, decompress):
+        response = await self._transport.request(
+            container,
+            access_key,
+            raise_for_status,
+            v3io.dataplane.request.encode_get_object,
+            {"path": path, "offset": offset, "num_bytes": num_bytes},
+        )
+
+        # compressed objects can only be decompressed when read whole
+        if decompress and not offset and not num_bytes:
+            response.body = v3io.dataplane.compression.decode_object_body(response.body)
+
+        return response
@@ -0,0 +1,53 @@
+# Copyright 2019 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import asyncio
+import functools
+
+
+class SingleFlight(object):
+    def __init__(self):
+        """Shares a single in-flight call among coroutines that make the same call at the same time. To coalesce
+        identical reads, assign it to the `single_flight` attribute of the client's kv and/or object models (e.g.
+        client.kv.single_flight = SingleFlight()). kv.get and object.get calls with the same arguments that are made
+        while such a call is in flight wait for it and receive its response (or exception) rather than sending a
+        request of their own. The shared response must not be modified.
+
+        Return Value
+        ----------
+        A `SingleFlight` object
+        """
+        self.num_shared = 0
+        self._calls = {}
+
+    async def do(self, key, function):
+        """Awaits function(), unless a call with the same key is in flight - in which case its result is returned.
+        Cancelling one of the callers doesn't cancel the call for the others"""
+        call = self._calls.get(key)
+
+        if call is None:
+            call = self._calls[key] = asyncio.ensure_future(function())
+            call.add_done_callback(functools.partial(self._remove_call, key))
+        else:
+            self.num_shared += 1
+
+        return await asyncio.shield(call)
+
+    def _remove_call(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+        # if all the callers were cancelled, nobody will retrieve the exception
+        if not call.cancelled():
+            call.exception()
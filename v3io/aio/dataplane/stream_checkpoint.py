@@ -0,0 +1,119 @@
+# Copyright 2019 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import time
+
+import v3io.dataplane.stream_checkpoint
+
+
+class CheckpointStore(object):
+    """Stores the sequence number (and sub-sequence number, for records unpacked from an aggregated record) of the last
+    record processed in every shard of a stream, as an item per shard in a KV table. Checkpoints are kept in memory
+    and written at most once every interval seconds, all shards at once, so that checkpointing every record costs no
+    requests. Writes are conditioned on the stored checkpoint being lower, so checkpoints never move backwards"""
+
+    def __init__(self, context, container_name, access_key, table_path, interval=5.0):
+        self._context = context
+        self._container_name = container_name
+        self._access_key = access_key
+
+        # shard id -> the (sequence number, sub-sequence number) not written yet
+        self._pending_checkpoints = {}
+        self._last_flush_time = time.monotonic()
+
+        self.table_path = table_path
+        self.interval = interval
+
+    async def checkpoint(self, shard_id, sequence_number, sub_sequence_number=0):
+        """Records that the records of the shard up to and including sequence_number were processed - of the record
+        at sequence_number, if it's aggregated, the ones up to and including sub_sequence_number. Writes the
+        checkpoints of all shards if interval seconds passed since they were last written"""
+        checkpoint = (sequence_number, sub_sequence_number)
+
+        if checkpoint <= self._pending_checkpoints.get(shard_id, v3io.dataplane.stream_checkpoint.no_checkpoint):
+            return
+
+        self._pending_checkpoints[shard_id] = checkpoint
+
+        if time.monotonic() - self._last_flush_time >= self.interval:
+            await self.flush()
+
+    async def flush(self):
+        """Writes the checkpoints recorded since the last write"""
+        checkpoints = self._pending_checkpoints
+        self._pending_checkpoints = {}
+        self._last_flush_time = time.monotonic()
+
+        if not checkpoints:
+            return
+
+        requests = [
+            (str(shard_id), v3io.dataplane.stream_checkpoint.encode_checkpoint_update(*checkpoint))
+            for shard_id, checkpoint in checkpoints.items()
+        ]
+
+        failed_responses = {}
+
+        async for (key, _), response in self._context.kv.request_many(
+            "update", self._container_name, self.table_path, requests, self._access_key
+        ):
+            if response.status_code != 200:
+                failed_responses[int(key)] = response
+
+        if failed_responses:
+            await self._handle_failed_writes(checkpoints, failed_responses)
+
+    async def load(self, shard_ids):
+        """Returns a dict of shard id -> the stored (sequence number, sub-sequence number) of the shard, for the shards
+        that have one"""
+        items = await self._context.kv.get_many(
+            self._container_name,
+            self.table_path,
+            [str(shard_id) for shard_id in shard_ids],
+            self._access_key,
+            attribute_names=["sequence_number", "sub_sequence_number"],
+        )
+
+        return v3io.dataplane.stream_checkpoint.decode_checkpoints(shard_ids, items)
+
+    async def close(self):
+        """Writes the checkpoints recorded since the last write"""
+        await self.flush()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def _handle_failed_writes(self, checkpoints, failed_responses):
+        # a write fails its condition if a checkpoint at least as recent is stored (e.g. by another consumer)
+        stored_checkpoints = await self.load(list(failed_responses))
+
+        no_checkpoint = v3io.dataplane.stream_checkpoint.no_checkpoint
+        failed_shard_ids = [
+            shard_id
+            for shard_id in failed_responses
+            if stored_checkpoints.get(shard_id, no_checkpoint) < checkpoints[shard_id]
+        ]
+
+        if not failed_shard_ids:
+            return
+
+        # keep the checkpoints so that the next flush retries them
+        for shard_id in failed_shard_ids:
+            if checkpoints[shard_id] > self._pending_checkpoints.get(shard_id, no_checkpoint):
+                self._pending_checkpoints[shard_id] = checkpoints[shard_id]
+
+        failed_responses[failed_shard_ids[0]].raise_for_status()
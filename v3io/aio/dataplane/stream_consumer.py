@@ -0,0 +1,316 @@
+# Copyright 2019 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import asyncio
+import time
+
+import v3io.dataplane.stream_aggregation
+
+
+class Consumer(object):
+    """Consumes the records of the shards of a stream. Every shard is polled by a task of its own, which requests the
+    next records of the shard as soon as it hands over the current ones, so that shards are read while the
+    application processes records. Records of the different shards are interleaved in the order in which they arrive,
+    each tagged with the ID of its shard. Aggregated records (see v3io.dataplane.stream_aggregation) are unpacked.
+
+    If a checkpoint store is passed, shards that have a checkpoint are read from the record following it, and
+    `checkpoint` stores the progress of the consumer. Records processed after the last stored checkpoint are read
+    again when the consumer restarts, so each record is processed at least once"""
+
+    _closed_marker = object()
+
+    def __init__(
+        self,
+        context,
+        container_name,
+        access_key,
+        stream_path,
+        shard_ids=None,
+        seek_type="EARLIEST",
+        raise_for_status=None,
+        starting_sequence_numbers=None,
+        timestamp_sec=None,
+        timestamp_nsec=None,
+        limit=None,
+        poll_interval=1.0,
+        prefetch=1,
+        checkpoint_store=None,
+    ):
+        if prefetch < 1:
+            raise ValueError(f"prefetch must be at least 1, got {prefetch}")
+
+        self._context = context
+        self._container_name = container_name
+        self._access_key = access_key
+        self._current_records = []
+        self._current_record_index = 0
+        self._pages = None
+
+        # shard id -> the ShardReader of the shard
+        self._shard_readers = None
+
+        # shard id -> the (sequence number, sub-sequence number) of the last record processed before the shard was read
+        self._checkpoints = {}
+        self._closed = False
+
+        self.stream_path = stream_path
+        self.shard_ids = shard_ids
+        self.seek_type = seek_type
+        self.raise_for_status = raise_for_status
+        self.starting_sequence_numbers = starting_sequence_numbers or {}
+        self.timestamp_sec = timestamp_sec
+        self.timestamp_nsec = timestamp_nsec
+        self.limit = limit
+        self.poll_interval = poll_interval
+        self.prefetch = prefetch
+        self.checkpoint_store = checkpoint_store
+
+    async def next_record(self, timeout=None):
+        """Returns the next record (`GetRecordsResult`) of any shard, or None if no record arrived within timeout
+        seconds or the consumer was closed"""
+        while self._current_record_index >= len(self._current_records):
+            records = await self.next_records(timeout)
+            if records is None:
+                return None
+
+            self._current_records = records
+            self._current_record_index = 0
+
+        record = self._current_records[self._current_record_index]
+        self._current_record_index += 1
+
+        return record
+
+    async def next_records(self, timeout=None):
+        """Returns the next non-empty list of records read from a shard, or None if no records arrived within timeout
+        seconds or the consumer was closed. Records returned by `next_record` that weren't consumed are dropped"""
+        self._current_records = []
+        self._current_record_index = 0
+
+        if self._closed:
+            return None
+
+        # start polling all shards when the first records are requested
+        if self._shard_readers is None:
+            await self._start()
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        while True:
+            try:
+                page = await asyncio.wait_for(
+                    self._pages.get(), max(deadline - time.monotonic(), 0) if deadline is not None else None
+                )
+            except asyncio.TimeoutError:
+                return None
+
+            if page is self._closed_marker:
+                return None
+
+            if isinstance(page, BaseException):
+                await self.close()
+                raise page
+
+            shard_id, shard_reader, records = page
+
+            # drop the records of shards that stopped being read since they were handed over
+            if self._shard_readers.get(shard_id) is not shard_reader:
+                continue
+
+            # allow the shard to read ahead while these records are processed
+            shard_reader.credits.release()
+
+            return records
+
+    async def checkpoint(self, record):
+        """Records that the record, and all records that preceded it in its shard, were processed. Checkpoints are
+        written to the checkpoint store periodically and when the consumer is closed"""
+        if self.checkpoint_store is None:
+            raise RuntimeError("Cannot checkpoint records of a consumer without a checkpoint store")
+
+        await self.checkpoint_store.checkpoint(
+            record.shard_id, *v3io.dataplane.stream_aggregation.get_checkpoint(record)
+        )
+
+    async def set_shard_ids(self, shard_ids):
+        """Changes the shards the consumer reads. Shards that are no longer read stop being polled, and records they
+        handed over that weren't returned yet are dropped. New shards are read from their checkpoint, or according
+        to seek_type. Shards read both before and after the change continue from where they were"""
+        shard_ids = list(shard_ids)
+
+        if self._shard_readers is None:
+            self.shard_ids = shard_ids
+            return
+
+        stopped_tasks = []
+
+        for shard_id in set(self.shard_ids) - set(shard_ids):
+            shard_reader = self._shard_readers.pop(shard_id)
+            shard_reader.task.cancel()
+            stopped_tasks.append(shard_reader.task)
+
+        await asyncio.gather(*stopped_tasks, return_exceptions=True)
+
+        await self._start_shards([shard_id for shard_id in shard_ids if shard_id not in self._shard_readers])
+        self.shard_ids = shard_ids
+
+    async def close(self):
+        """Stops polling the shards. Must be called when done consuming"""
+        if self._closed:
+            return
+
+        self._closed = True
+
+        if self._shard_readers is not None:
+            # wakes next_records if it is waiting for records
+            self._pages.put_nowait(self._closed_marker)
+
+        if self._shard_readers:
+            tasks = [shard_reader.task for shard_reader in self._shard_readers.values()]
+
+            for task in tasks:
+                task.cancel()
+
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if self.checkpoint_store is not None:
+            await self.checkpoint_store.flush()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        record = await self.next_record()
+
+        if record is None:
+            raise StopAsyncIteration
+
+        return record
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def _start(self):
+        if self.shard_ids is None:
+            response = await self._context.stream.describe(
+                self._container_name, self.stream_path, self._access_key, self.raise_for_status
+            )
+
+            self.shard_ids = list(range(response.output.shard_count))
+
+        self._pages = asyncio.Queue()
+        self._shard_readers = {}
+        await self._start_shards(self.shard_ids)
+
+    async def _start_shards(self, shard_ids):
+        if not shard_ids:
+            return
+
+        if self.checkpoint_store is not None:
+            self._checkpoints.update(await self.checkpoint_store.load(shard_ids))
+
+        for shard_id in shard_ids:
+            # every shard may hand over up to prefetch lists of records that weren't consumed yet
+            shard_reader = ShardReader(asyncio.Semaphore(self.prefetch))
+            shard_reader.task = asyncio.ensure_future(self._read_shard(shard_id, shard_reader))
+
+            self._shard_readers[shard_id] = shard_reader
+
+    async def _read_shard(self, shard_id, shard_reader):
+        try:
+            location = await self._seek(shard_id)
+            checkpoint = self._checkpoints.get(shard_id)
+
+            while True:
+                response = await self._context.stream.get_records(
+                    self._container_name,
+                    self.stream_path,
+                    shard_id,
+                    location,
+                    self._access_key,
+                    self.raise_for_status,
+                    limit=self.limit,
+                )
+
+                location = response.output.next_location
+
+                if not response.output.records:
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+
+                records = v3io.dataplane.stream_aggregation.deaggregate(response.output.records)
+
+                # seeking to the checkpoint returns the record that was (at least partly) processed. skip the records
+                # unpacked from it that were
+                if checkpoint is not None:
+                    records = [
+                        record
+                        for record in records
+                        if v3io.dataplane.stream_aggregation.is_after_checkpoint(record, checkpoint)
+                    ]
+                    checkpoint = None
+
+                    if not records:
+                        continue
+
+                for record in records:
+                    record.shard_id = shard_id
+
+                # wait for the consumer to take the records this shard read ahead
+                await shard_reader.credits.acquire()
+
+                self._pages.put_nowait((shard_id, shard_reader, records))
+
+        except Exception as e:
+            self._pages.put_nowait(e)
+
+    async def _seek(self, shard_id):
+        seek_type = self.seek_type
+        starting_sequence_number = None
+
+        if shard_id in self._checkpoints:
+            seek_type = "SEQUENCE"
+            starting_sequence_number = self._checkpoints[shard_id][0]
+
+        elif seek_type == "SEQUENCE":
+            starting_sequence_number = self.starting_sequence_numbers.get(shard_id)
+
+            # shards without a sequence number are read from their beginning
+            if starting_sequence_number is None:
+                seek_type = "EARLIEST"
+
+        response = await self._context.stream.seek(
+            self._container_name,
+            self.stream_path,
+            shard_id,
+            seek_type,
+            self._access_key,
+            self.raise_for_status,
+            starting_sequence_number=starting_sequence_number,
+            timestamp_sec=self.timestamp_sec,
+            timestamp_nsec=self.timestamp_nsec,
+        )
+
+        return response.output.location
+
+
+class ShardReader(object):
+    """The task reading a shard of a consumer and the credits of the pages it may hand over"""
+
+    def __init__(self, credits):
+        self.task = None
+        self.credits = credits
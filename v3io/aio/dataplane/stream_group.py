@@ -0,0 +1,316 @@
+# Copyright 2019 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import asyncio
+import time
+
+import v3io.aio.dataplane.stream_consumer
+import v3io.dataplane.stream_aggregation
+import v3io.dataplane.stream_group
+
+
+class ConsumerGroup(object):
+    """Consumes the shards of a stream together with the other members of a consumer group - in this process or in
+    others. Every shard is consumed by the member holding its lease, an item (named by the shard ID) in a KV table.
+    Members renew their leases periodically, take leases that expired and steal leases from members holding more than
+    their share, all through conditional updates, so that the shards are spread evenly across the live members"""
+
+    def __init__(
+        self,
+        context,
+        container_name,
+        access_key,
+        stream_path,
+        lease_table_path,
+        member_id=None,
+        lease_duration=10.0,
+        checkpoint_store=None,
+        seek_type="EARLIEST",
+        raise_for_status=None,
+        limit=None,
+        poll_interval=1.0,
+        prefetch=1,
+    ):
+        if prefetch < 1:
+            raise ValueError(f"prefetch must be at least 1, got {prefetch}")
+
+        self._context = context
+        self._container_name = container_name
+        self._access_key = access_key
+        self._current_records = []
+        self._current_record_index = 0
+        self._consumer = None
+        self._balancer = None
+        self._has_owned_leases = None
+        self._closed = False
+
+        # shard id -> the counter of the lease held by this member
+        self._owned_leases = {}
+
+        # when the owned leases were last renewed
+        self._leases_renewed_at = None
+
+        self.stream_path = stream_path
+        self.lease_table_path = lease_table_path
+        self.member_id = member_id or v3io.dataplane.stream_group.get_member_id()
+        self.lease_duration = lease_duration
+        self.checkpoint_store = checkpoint_store
+        self.seek_type = seek_type
+        self.raise_for_status = raise_for_status
+        self.limit = limit
+        self.poll_interval = poll_interval
+        self.prefetch = prefetch
+        self.shard_ids = None
+        self._leases = v3io.dataplane.stream_group.Leases(self.member_id, lease_duration)
+
+    @property
+    def owned_shard_ids(self):
+        """The IDs of the shards whose leases this member holds"""
+        self._expire_owned_leases()
+
+        return sorted(self._owned_leases)
+
+    async def next_record(self, timeout=None):
+        """Returns the next record (`GetRecordsResult`) of any shard this member holds, or None if no record arrived
+        within timeout seconds or the group was closed"""
+        while self._current_record_index >= len(self._current_records):
+            records = await self.next_records(timeout)
+            if records is None:
+                return None
+
+            self._current_records = records
+            self._current_record_index = 0
+
+        record = self._current_records[self._current_record_index]
+        self._current_record_index += 1
+
+        return record
+
+    async def next_records(self, timeout=None):
+        """Returns the next non-empty list of records read from a shard this member holds, or None if no records
+        arrived within timeout seconds or the group was closed"""
+        self._current_records = []
+        self._current_record_index = 0
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        while True:
+            consumer = await self._get_consumer(deadline)
+            if consumer is None:
+                return None
+
+            # wake up periodically to follow changes in the leases this member holds, and before they expire
+            wait_timeout = min(self._get_balance_interval(), self._get_lease_time_left())
+            if deadline is not None:
+                wait_timeout = max(min(wait_timeout, deadline - time.monotonic()), 0)
+
+            try:
+                records = await consumer.next_records(wait_timeout)
+
+            # the consumer closes itself when a shard fails. release the leases so that other members take the shards
+            except Exception:
+                await self.close()
+                raise
+
+            if records is not None:
+                return records
+
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+
+    async def checkpoint(self, record):
+        """Records that the record, and all records that preceded it in its shard, were processed"""
+        if self.checkpoint_store is None:
+            raise RuntimeError("Cannot checkpoint records of a consumer group without a checkpoint store")
+
+        await self.checkpoint_store.checkpoint(
+            record.shard_id, *v3io.dataplane.stream_aggregation.get_checkpoint(record)
+        )
+
+    async def close(self):
+        """Stops consuming and releases the leases of this member, so that other members can take them at once"""
+        if self._closed:
+            return
+
+        self._closed = True
+
+        if self._balancer is not None:
+            self._balancer.cancel()
+            await asyncio.gather(self._balancer, return_exceptions=True)
+
+            # wake up waiters
+            self._has_owned_leases.set()
+
+        if self._consumer is not None:
+            await self._consumer.close()
+
+        if self.checkpoint_store is not None:
+            await self.checkpoint_store.flush()
+
+        owned_leases = self._owned_leases
+        self._owned_leases = {}
+
+        requests = [
+            (str(shard_id), v3io.dataplane.stream_group.encode_lease_release(self.member_id, counter))
+            for shard_id, counter in owned_leases.items()
+        ]
+
+        # leases that fail to be released expire
+        async for _ in self._context.kv.request_many(
+            "update", self._container_name, self.lease_table_path, requests, self._access_key
+        ):
+            pass
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        record = await self.next_record()
+
+        if record is None:
+            raise StopAsyncIteration
+
+        return record
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def _get_consumer(self, deadline):
+        if self._closed:
+            return None
+
+        if self._balancer is None:
+            await self._start()
+
+        self._expire_owned_leases()
+
+        # stop reading shards that other members may have taken while this member waits for leases
+        if not self._owned_leases and self._consumer is not None and self._consumer.shard_ids:
+            await self._consumer.set_shard_ids([])
+
+        # wait until this member holds a lease
+        while not self._owned_leases and not self._closed:
+            timeout = deadline - time.monotonic() if deadline is not None else None
+            if timeout is not None and timeout <= 0:
+                return None
+
+            try:
+                await asyncio.wait_for(self._has_owned_leases.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+
+        if self._closed:
+            return None
+
+        shard_ids = sorted(self._owned_leases)
+
+        # consume the shards this member holds now, without interrupting the shards it kept. Records read but not
+        # checkpointed are read again by the member that takes their shard
+        if self._consumer is None:
+            self._consumer = v3io.aio.dataplane.stream_consumer.Consumer(
+                self._context,
+                self._container_name,
+                self._access_key,
+                self.stream_path,
+                shard_ids,
+                self.seek_type,
+                self.raise_for_status,
+                limit=self.limit,
+                poll_interval=self.poll_interval,
+                prefetch=self.prefetch,
+                checkpoint_store=self.checkpoint_store,
+            )
+
+        elif self._consumer.shard_ids != shard_ids:
+            await self._consumer.set_shard_ids(shard_ids)
+
+        return self._consumer
+
+    async def _start(self):
+        response = await self._context.stream.describe(
+            self._container_name, self.stream_path, self._access_key, self.raise_for_status
+        )
+
+        self.shard_ids = list(range(response.output.shard_count))
+        self._has_owned_leases = asyncio.Event()
+
+        await self._balance()
+
+        self._balancer = asyncio.ensure_future(self._balance_periodically())
+
+    async def _balance_periodically(self):
+        while True:
+            await asyncio.sleep(self._get_balance_interval())
+
+            try:
+                await self._balance()
+            except Exception as e:
+                self._context._logger.warn_with("Failed to balance shard leases", error=str(e))
+
+    async def _balance(self):
+        # other members measure the expiry of a lease from when they observe its renewal, which is later than this
+        started_at = time.monotonic()
+
+        items = await self._context.kv.get_many(
+            self._container_name,
+            self.lease_table_path,
+            [str(shard_id) for shard_id in self.shard_ids],
+            self._access_key,
+            attribute_names=["owner", "lease_counter"],
+        )
+
+        self._leases.observe(self.shard_ids, items)
+
+        requests = []
+        next_counters = {}
+
+        for shard_id, counter in self._leases.get_owned_leases().items():
+            requests.append((str(shard_id), v3io.dataplane.stream_group.encode_lease_renewal(self.member_id, counter)))
+            next_counters[shard_id] = counter + 1
+
+        for shard_id, counter in self._leases.get_leases_to_take():
+            requests.append((str(shard_id), v3io.dataplane.stream_group.encode_lease_take(self.member_id, counter)))
+            next_counters[shard_id] = (counter or 0) + 1
+
+        owned_leases = {}
+
+        # leases whose update failed were taken by other members
+        async for (key, _), response in self._context.kv.request_many(
+            "update", self._container_name, self.lease_table_path, requests, self._access_key
+        ):
+            if response.status_code == 200:
+                owned_leases[int(key)] = next_counters[int(key)]
+
+        self._owned_leases = owned_leases
+        self._leases_renewed_at = started_at
+
+        if owned_leases:
+            self._has_owned_leases.set()
+        else:
+            self._has_owned_leases.clear()
+
+    def _expire_owned_leases(self):
+        # leases that failed to be renewed for lease_duration may have been taken by other members
+        if self._owned_leases and time.monotonic() - self._leases_renewed_at >= self.lease_duration:
+            self._owned_leases = {}
+            self._has_owned_leases.clear()
+
+    def _get_lease_time_left(self):
+        return max(self._leases_renewed_at + self.lease_duration - time.monotonic(), 0)
+
+    def _get_balance_interval(self):
+        return self.lease_duration / 3
@@ -0,0 +1,234 @@
+# Copyright 2019 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import asyncio
+import collections
+import functools
+
+import v3io.common.helpers
+import v3io.dataplane.stream_aggregation
+import v3io.dataplane.stream_producer
+
+
+class Producer(object):
+    """Buffers records per stream and sends each buffer through a single put_records request once it is full or its
+    oldest record has waited linger seconds. Requests are sent in the background, several at a time, and records
+    that the stream failed to put are retried.
+
+    If a router is passed, records are routed to shards on the client and buffered per shard, and the requests of
+    a shard are sent one at a time - so records with the same partition key are put in the order in which they
+    were passed to put. Records that failed are retried along with the records that followed them in their shard,
+    which are put again even if they succeeded. Without a router, the shard of a record is only known to the stream,
+    and retries may reorder the records of a partition key.
+
+    If aggregate is set, the records of a request are packed into aggregated records (see
+    v3io.dataplane.stream_aggregation), and buffers are sent by size only"""
+
+    def __init__(
+        self,
+        context,
+        container_name,
+        access_key,
+        max_records=v3io.dataplane.stream_producer.max_records_per_request,
+        max_bytes=4 * 1024 * 1024,
+        linger=0.05,
+        max_retries=3,
+        max_pending_requests=None,
+        on_failure=None,
+        router=None,
+        aggregate=False,
+        compression=None,
+    ):
+        self._context = context
+        self._container_name = container_name
+        self._access_key = access_key
+        self._buffers = {}
+        self._linger_timers = {}
+        self._pending_requests = set()
+
+        # (stream path, shard id) -> the records waiting for the request in flight to the shard to complete
+        self._shard_queues = {}
+        self._pending_request_slots = None
+        self._closed = False
+
+        self.max_records = min(max_records, v3io.dataplane.stream_producer.max_records_per_request)
+        self.max_bytes = max_bytes
+        self.linger = linger
+        self.max_retries = max_retries
+        self.max_pending_requests = max_pending_requests or context._transport.max_connections * 2
+        self.on_failure = on_failure
+        self.router = router
+        self.aggregate = aggregate
+        self.compression = compression
+
+    async def put(self, stream_path, record):
+        """Adds a record (see stream.put_records) to the buffer of the stream. Waits if max_pending_requests
+        requests are waiting to be sent"""
+        if self._closed:
+            raise RuntimeError("Cannot put records through a closed producer")
+
+        shard_id = None
+
+        if self.router is not None:
+            shard_id = await self.router.route(stream_path, record)
+
+            if shard_id is not None and record.get("shard_id") is None:
+                record = dict(record, shard_id=shard_id)
+
+        buffer_key = (stream_path, shard_id)
+
+        buffer = self._buffers.get(buffer_key)
+        if buffer is None:
+            buffer = self._buffers[buffer_key] = v3io.dataplane.stream_producer.Buffer()
+            self._linger_timers[buffer_key] = asyncio.get_running_loop().call_later(
+                self.linger, self._flush_lingering_buffer, buffer_key
+            )
+
+        buffer.add(record)
+
+        if self._is_full(buffer):
+            await self._send(buffer_key, self._pop_buffer(buffer_key).records)
+
+    async def flush(self):
+        """Sends all buffered records and waits for all requests to complete"""
+        # detach all buffers first, as their linger timers may fire while sending
+        buffers = [(buffer_key, self._pop_buffer(buffer_key)) for buffer_key in list(self._buffers)]
+
+        for buffer_key, buffer in buffers:
+            await self._send(buffer_key, buffer.records)
+
+        # pending sends may add requests while we wait
+        while self._pending_requests:
+            await asyncio.wait(list(self._pending_requests))
+
+    async def close(self):
+        """Flushes the buffered records and stops the producer"""
+        if self._closed:
+            return
+
+        self._closed = True
+
+        await self.flush()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def _is_full(self, buffer):
+        # aggregated records are sent by size, as many records are packed into each
+        return (not self.aggregate and len(buffer.records) >= self.max_records) or buffer.num_bytes >= self.max_bytes
+
+    def _pop_buffer(self, buffer_key):
+        self._linger_timers.pop(buffer_key).cancel()
+
+        return self._buffers.pop(buffer_key)
+
+    def _flush_lingering_buffer(self, buffer_key):
+        send = asyncio.ensure_future(self._send(buffer_key, self._pop_buffer(buffer_key).records))
+        self._pending_requests.add(send)
+        send.add_done_callback(self._pending_requests.discard)
+
+    async def _send(self, buffer_key, records):
+        if self._pending_request_slots is None:
+            self._pending_request_slots = asyncio.Semaphore(self.max_pending_requests)
+
+        # make the caller wait when too many requests wait to be sent
+        await self._pending_request_slots.acquire()
+
+        # send the requests of a shard one at a time, so that its records are put in order
+        if buffer_key[1] is not None:
+            shard_queue = self._shard_queues.get(buffer_key)
+            if shard_queue is not None:
+                shard_queue.append(records)
+                return
+
+            self._shard_queues[buffer_key] = collections.deque()
+
+        self._submit(buffer_key, records)
+
+    def _submit(self, buffer_key, records):
+        request = asyncio.ensure_future(self._put_records(buffer_key[0], records))
+        self._pending_requests.add(request)
+        request.add_done_callback(functools.partial(self._on_request_done, buffer_key))
+
+    def _on_request_done(self, buffer_key, request):
+        self._pending_requests.discard(request)
+        self._pending_request_slots.release()
+
+        shard_queue = self._shard_queues.get(buffer_key)
+        if shard_queue:
+            self._submit(buffer_key, shard_queue.popleft())
+        elif shard_queue is not None:
+            del self._shard_queues[buffer_key]
+
+    async def _put_records(self, stream_path, records):
+        if not self.aggregate:
+            await self._put_request(stream_path, records)
+            return
+
+        # records with many partition keys may be packed into more records than fit in a request
+        aggregated_records = v3io.dataplane.stream_aggregation.aggregate(records)
+
+        for index in range(0, len(aggregated_records), v3io.dataplane.stream_producer.max_records_per_request):
+            await self._put_request(
+                stream_path, aggregated_records[index : index + v3io.dataplane.stream_producer.max_records_per_request]
+            )
+
+    async def _put_request(self, stream_path, records):
+        for retry in range(self.max_retries + 1):
+            if retry:
+                await asyncio.sleep(v3io.common.helpers.get_retry_interval(retry))
+
+            try:
+                response = await self._context.stream.put_records(
+                    self._container_name, stream_path, records, self._access_key, compression=self.compression
+                )
+                output = response.output
+            except Exception as e:
+                failures = [(record, e) for record in records]
+                continue
+
+            if not output.failed_record_count:
+                return
+
+            failures = [(record, result) for record, result in zip(records, output.records) if result.error_code]
+            records = v3io.dataplane.stream_producer.get_records_to_retry(records, output.records)
+
+        for record, error in failures:
+            self._report_failure(stream_path, record, error)
+
+    def _report_failure(self, stream_path, record, error):
+        # report the records that were packed into a failed aggregated record
+        if self.aggregate:
+            for sub_record in v3io.dataplane.stream_aggregation.decode_aggregated_record_data(record["data"]):
+                if "shard_id" in record:
+                    sub_record["shard_id"] = record["shard_id"]
+
+                self._on_failure(stream_path, sub_record, error)
+
+            return
+
+        self._on_failure(stream_path, record, error)
+
+    def _on_failure(self, stream_path, record, error):
+        if self.on_failure is not None:
+            self.on_failure(stream_path, record, error)
+        else:
+            self._context._logger.warn_with(
+                "Failed to put record",
+                stream_path=stream_path,
+                error=v3io.dataplane.stream_producer.get_error_message(error),
+            )
@@ -28,6 +28,7 @@ class Transport(object):
         self._endpoint = self._get_endpoint(endpoint)
         self._timeout = timeout
         self.max_connections = max_connections or 8
+        self.json_codec = None
         self._connector = aiohttp.TCPConnector()
         self._client_session = aiohttp.ClientSession(connector=self._connector)
         # spend ~1 min in retries before raising the exception to the user
@@ -38,10 +39,28 @@ class Transport(object):
         await self._client_session.close()
         await self._connector.close()
 
-    async def request(self, container, access_key, raise_for_status, encoder, encoder_args, output=None):
+    async def request(
+        self,
+        container,
+        access_key,
+        raise_for_status,
+        encoder,
+        encoder_args,
+        output=None,
+        body_buffer=None,
+        stream_body=False,
+    ):
         # allocate a request
-        request = v3io.dataplane.request.Request(container, access_key, raise_for_status, encoder, encoder_args, output)
+        request = v3io.dataplane.request.Request(
+            container, access_key, raise_for_status, encoder, encoder_args, output, self.json_codec
+        )
+        request.body_buffer = body_buffer
+        request.stream_body = stream_body
 
+        return await self.send_request(request)
+
+    async def send_request(self, request):
+        """Sends a request created by the caller and returns its response"""
         path = request.encode_path()
 
         self.log("Tx", method=request.method, path=path, headers=request.headers, body=request.body)
@@ -51,23 +70,40 @@ class Transport(object):
         while True:
             try:
                 # call the encoder to get the response
-                async with self._client_session.request(
+                http_response = await self._client_session.request(
                     request.method, self._endpoint + "/" + path, headers=request.headers, data=request.body, ssl=False
-                ) as http_response:
+                )
+
+                contents = body_stream = None
+
+                try:
                     # get contents
-                    contents = await http_response.content.read()
+                    if request.stream_body and 200 <= http_response.status < 300:
+                        contents = body_stream = BodyStream(http_response)
+                    elif request.body_buffer is not None and 200 <= http_response.status < 300:
+                        contents = await self._read_body_into(http_response, request.body_buffer)
+                    else:
+                        contents = await http_response.content.read()
 
                     # create a response
                     response = v3io.dataplane.response.Response(
-                        output, http_response.status, http_response.headers, contents
+                        request.output, http_response.status, http_response.headers, contents, request.json_codec
                     )
 
                     # enforce raise for status
-                    response.raise_for_status(request.raise_for_status or raise_for_status)
+                    response.raise_for_status(request.raise_for_status)
 
                     self.log("Rx", status_code=response.status_code, headers=response.headers, body=contents)
 
+                    # streamed bodies release the connection once they're drained or closed
+                    body_stream = None
+
                     return response
+                finally:
+                    if body_stream is not None:
+                        body_stream._release(False)
+                    elif not isinstance(contents, BodyStream):
+                        http_response.release()
             except v3io.dataplane.response.HttpResponseError as response_error:
                 self._logger.warn_with("Response error: {}".format(str(response_error)))
                 raise response_error
@@ -78,6 +114,23 @@ class Transport(object):
 
             await asyncio.sleep(self.retry_intervals[client_os_error_retry_counter])
 
+    @staticmethod
+    async def _read_body_into(http_response, body_buffer):
+        body_view = memoryview(body_buffer).cast("B")
+        length = http_response.content_length
+
+        # bodies of unknown length or that don't fit are read as usual
+        if length is None or length > len(body_view):
+            return await http_response.content.read()
+
+        num_bytes_read = 0
+
+        async for chunk in http_response.content.iter_any():
+            body_view[num_bytes_read : num_bytes_read + len(chunk)] = chunk
+            num_bytes_read += len(chunk)
+
+        return body_view[:num_bytes_read]
+
     @staticmethod
     def _get_endpoint(endpoint):
         if endpoint is None:
@@ -105,3 +158,70 @@ class Transport(object):
 
     def _log_null(self, message, *args, **kw_args):
         pass
+
+
+class BodyStream(object):
+    """The body of a response, read as it arrives. Iterating the stream yields chunks of up to chunk_size bytes. The
+    connection the body is read from is released once the body is drained or the stream is closed, so streams must
+    be drained or closed (e.g. by using them as async context managers)"""
+
+    def __init__(self, http_response, chunk_size=v3io.dataplane.response.default_chunk_size):
+        self._http_response = http_response
+        self._released = False
+
+        self.chunk_size = chunk_size
+        self.closed = False
+
+    async def read(self, num_bytes=-1):
+        """Returns up to num_bytes bytes of the body (all the remaining bytes if num_bytes is negative), or an empty
+        bytes once the body is drained"""
+        if self.closed:
+            raise ValueError("Read from a closed body stream")
+
+        if self._released:
+            return b""
+
+        try:
+            data = await self._http_response.content.read(num_bytes)
+        except BaseException:
+            self._release(False)
+            raise
+
+        if num_bytes < 0 or (num_bytes and not data):
+            self._release(True)
+
+        return data
+
+    async def close(self):
+        """Releases the connection the body is read from. A body that wasn't drained is discarded along with its
+        connection"""
+        self._release(False)
+        self.closed = True
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        chunk = await self.read(self.chunk_size)
+
+        if not chunk:
+            raise StopAsyncIteration
+
+        return chunk
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def _release(self, drained):
+        if self._released:
+            return
+
+        self._released = True
+
+        if drained:
+            self._http_response.release()
+        else:
+            self._http_response.close()
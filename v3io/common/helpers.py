@@ -25,3 +25,8 @@ def url_join(base, *parts):
             result += part
 
     return result
+
+
+def get_retry_interval(retry):
+    """Returns the number of seconds to wait before the given retry (starting at 1), backing off exponentially"""
+    return min(0.1 * 2 ** (retry - 1), 5.0)
@@ -88,17 +88,96 @@ class Batch(object):
         self._encoded_requests.append(request)
 
     def wait(self, raise_for_status=None):
+        return self._wait_and_clean_up(self._wait, raise_for_status)
+
+    def wait_unordered(self, raise_for_status=None):
+        """Waits for the responses of all requests in the batch, reading them as they arrive rather than in the
+        order the requests were made. Every connection is refilled as soon as its response is read, so a slow
+        request doesn't hold back the others
+
+        Parameters
+        ----------
+        raise_for_status (optional): RaiseForStatus
+            Controls the raise for status behavior
+
+        Return Value
+        ----------
+        A list of (index, response) tuples in the order the responses arrived, where index is the position of the
+        request in the batch
+        """
+        return self._wait_and_clean_up(self._wait_unordered, raise_for_status)
+
+    def imap(self, function, iterable, raise_for_status=None):
+        """Calls function on each item of iterable, where function issues requests through the batch (e.g.
+        lambda item: batch.kv.put(...)), and yields the responses in the order of the requests. Items are pulled
+        from iterable only as connections free up, so no more than max_connections requests are held in memory
+        regardless of the number of items
+
+        Parameters
+        ----------
+        function (Required): callable
+            Called with each item. Issues zero or more requests through the batch
+        iterable (Required): iterable
+            The items to call function on. Can be a generator
+        raise_for_status (optional): RaiseForStatus
+            Controls the raise for status behavior
+
+        Return Value
+        ----------
+        A generator of responses
+        """
+        responses = self._iterate_responses(function, iterable, False, raise_for_status)
+
         try:
-            return self._wait(raise_for_status)
+            for _, response in responses:
+                yield response
+        finally:
+            responses.close()
+
+    def as_completed(self, function, iterable, raise_for_status=None):
+        """Like imap(), but yields the responses as they arrive. Every connection is refilled as soon as its
+        response is read, so a slow request doesn't hold back the others
+
+        Parameters
+        ----------
+        function (Required): callable
+            Called with each item. Issues zero or more requests through the batch
+        iterable (Required): iterable
+            The items to call function on. Can be a generator
+        raise_for_status (optional): RaiseForStatus
+            Controls the raise for status behavior
+
+        Return Value
+        ----------
+        A generator of (index, response) tuples, where index is the position of the request among all the requests
+        issued
+        """
+        return self._iterate_responses(function, iterable, True, raise_for_status)
+
+    def _wait_and_clean_up(self, wait_method, raise_for_status):
+        try:
+            return wait_method(raise_for_status)
 
         # if an exception is raised, clean up everything
         except Exception as e:
-            self._inflight_requests = []
-            self._encoded_requests = []
+            self._drain_inflight_requests()
             self._transport.restart()
 
             raise e
 
+    def _drain_inflight_requests(self):
+        # drop the requests we haven't sent and read the responses of the ones we did, so that their connections
+        # go back to the transport (httpclient only frees a connection once its response is read)
+        self._encoded_requests = []
+
+        while self._inflight_requests:
+            try:
+                self._transport.wait_response(
+                    self._inflight_requests.pop(0), v3io.dataplane.transport.RaiseForStatus.never
+                )
+            except Exception:
+                pass
+
     def _wait(self, raise_for_status=None):
         responses = []
 
@@ -130,3 +209,54 @@ class Batch(object):
                 self._inflight_requests.append(request)
 
         return responses
+
+    def _wait_unordered(self, raise_for_status=None):
+        return list(self._iterate_responses(None, [], True, raise_for_status))
+
+    def _iterate_responses(self, function, iterable, unordered, raise_for_status):
+        items = iter(iterable)
+        inflight_request_indices = []
+        next_request_index = 0
+
+        try:
+            while True:
+                # fill the connections, pulling more requests from the items only when there are none pending
+                while len(self._inflight_requests) < self._transport.max_connections:
+                    if not self._encoded_requests:
+                        item = next(items, _no_item)
+                        if item is _no_item:
+                            break
+
+                        # issues zero or more requests on the batch
+                        function(item)
+                        continue
+
+                    self._inflight_requests.append(self._transport.send_request(self._encoded_requests.pop(0)))
+                    inflight_request_indices.append(next_request_index)
+                    next_request_index += 1
+
+                if not self._inflight_requests:
+                    return
+
+                # get either the oldest inflight request or whichever has its response ready first
+                inflight_request_position = self._transport.wait_readable(self._inflight_requests) if unordered else 0
+                inflight_request = self._inflight_requests.pop(inflight_request_position)
+                inflight_request_index = inflight_request_indices.pop(inflight_request_position)
+
+                # the connection is refilled on the next iteration
+                yield inflight_request_index, self._transport.wait_response(inflight_request, raise_for_status)
+
+        # the caller stopped iterating. read the responses of the requests we sent so the connections can be reused
+        except GeneratorExit:
+            self._drain_inflight_requests()
+
+        # if an exception is raised, clean up everything
+        except Exception as e:
+            self._drain_inflight_requests()
+            self._transport.restart()
+
+            raise e
+
+
+# marks the end of the items passed to imap / as_completed
+_no_item = object()
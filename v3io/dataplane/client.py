@@ -20,6 +20,7 @@ import ujson
 
 import v3io.common.helpers
 import v3io.dataplane.batch
+import v3io.dataplane.json_codec
 import v3io.dataplane.kv_cursor
 import v3io.dataplane.output
 import v3io.dataplane.request
@@ -40,6 +41,7 @@ class Client(object):
         transport_kind="httpclient",
         logger_verbosity=None,
         transport_verbosity="info",
+        json_codec=None,
     ):
         """Creates a v3io client, used to access v3io
 
@@ -68,6 +70,9 @@ class Client(object):
             If set to 'DEBUG', transport will log lots of information at the cost of performance. It uses
             the "debug_with" logger interface, so wither a logger set to DEBUG level must be passed in 'logger' or
             'logger_verbosity' must be set to DEBUG
+        json_codec (Optional) : str / Codec
+            The codec with which to encode and decode JSON bodies (see v3io.dataplane.json_codec) - ujson, orjson, json
+            or a `Codec` object. Defaults to orjson if it is installed, and ujson otherwise
 
         Return Value
         ----------
@@ -88,6 +93,8 @@ class Client(object):
         else:
             self._transport = transport_kind
 
+        self._transport.json_codec = v3io.dataplane.json_codec.get_codec(json_codec)
+
         if self._transport.requires_access_key() and not self._access_key:
             raise ValueError(
                 "Access key must be provided in Client() arguments or in the " "V3IO_ACCESS_KEY environment variable"
@@ -0,0 +1,163 @@
+# Copyright 2019 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Compression of stream record data and object bodies. The codec is recorded along with the compressed bytes, so
+readers decompress transparently:
+
+- A compressed record's client info is prefixed with the marker, the length of the codec name and the codec name,
+  followed by the original client info (if any)
+- A compressed object body is made of frames, each holding the marker, the length of the codec name, the codec
+  name, the length of the compressed bytes (8 bytes, big endian) and the compressed bytes. Compressed appends add
+  frames, so objects must be read whole to be decompressed. Since any object may start with the marker, object
+  bodies are only decompressed when the reader asks for it
+
+zlib is always available. lz4 and zstd are available if the lz4 / zstandard packages are installed (pip install
+v3io[lz4] / v3io[zstd]), and other codecs can be added with `register_codec`.
+"""
+import struct
+import zlib
+
+marker = b"\x89V3Z"
+
+# codec name -> (compress, decompress)
+_codecs = {"zlib": (zlib.compress, zlib.decompress)}
+
+
+def register_codec(name, compress, decompress):
+    """Registers a codec, given functions that compress and decompress bytes"""
+    _codecs[name] = (compress, decompress)
+
+
+def compress(codec_name, data):
+    return _get_codec(codec_name)[0](_to_bytes(data))
+
+
+def decompress(codec_name, data):
+    return _get_codec(codec_name)[1](data)
+
+
+def encode_record(codec_name, record):
+    """Returns a copy of a record (see stream.put_records) with its data compressed and the codec recorded in its
+    client info"""
+    encoded_record = dict(record)
+    encoded_record["data"] = compress(codec_name, record["data"])
+    encoded_record["client_info"] = _encode_header(codec_name) + _to_bytes(record.get("client_info") or b"")
+
+    return encoded_record
+
+
+def decode_record(data, client_info):
+    """Returns the (data, client info) of a record as they were before the record was compressed. Records that aren't
+    compressed, including ones whose client info only happens to start with the marker, are returned as is"""
+    if client_info is None or not client_info.startswith(marker):
+        return data, client_info
+
+    try:
+        codec_name, offset = _decode_header(client_info, 0)
+
+        return decompress(codec_name, data), client_info[offset:] or None
+    except ImportError:
+        raise
+    except Exception:
+        return data, client_info
+
+
+def encode_object_body(codec_name, body):
+    """Returns an object body compressed into a single frame"""
+    compressed_body = compress(codec_name, body)
+
+    return _encode_header(codec_name) + struct.pack(">Q", len(compressed_body)) + compressed_body
+
+
+def decode_object_body(body):
+    """Returns an object body as it was before it was compressed. Bodies that aren't compressed, including ones that
+    only happen to start with the marker, are returned as is"""
+    if not isinstance(body, (bytes, bytearray)) or not body.startswith(marker):
+        return body
+
+    try:
+        return _decode_object_frames(body)
+    except ImportError:
+        raise
+    except Exception:
+        return body
+
+
+def _decode_object_frames(body):
+    decoded_body = bytearray()
+    offset = 0
+
+    while offset < len(body):
+        if not body.startswith(marker, offset):
+            raise ValueError(f"Compressed object body has uncompressed data at offset {offset}")
+
+        codec_name, offset = _decode_header(body, offset)
+        (compressed_length,) = struct.unpack_from(">Q", body, offset)
+        offset += 8
+
+        decoded_body += decompress(codec_name, body[offset : offset + compressed_length])
+        offset += compressed_length
+
+    return bytes(decoded_body)
+
+
+def _get_codec(name):
+    codec = _codecs.get(name)
+    if codec is not None:
+        return codec
+
+    if name == "lz4":
+        lz4_frame = _import_optional("lz4.frame", "lz4")
+        register_codec("lz4", lz4_frame.compress, lz4_frame.decompress)
+
+    elif name == "zstd":
+        zstandard = _import_optional("zstandard", "zstd")
+        register_codec(
+            "zstd",
+            lambda data: zstandard.ZstdCompressor().compress(data),
+            lambda data: zstandard.ZstdDecompressor().decompress(data),
+        )
+
+    else:
+        raise ValueError(f"Unknown compression codec: {name}")
+
+    return _codecs[name]
+
+
+def _encode_header(codec_name):
+    encoded_codec_name = codec_name.encode("utf-8")
+
+    return marker + bytes([len(encoded_codec_name)]) + encoded_codec_name
+
+
+def _decode_header(data, offset):
+    offset += len(marker)
+    codec_name_length = data[offset]
+    offset += 1
+
+    return bytes(data[offset : offset + codec_name_length]).decode("utf-8"), offset + codec_name_length
+
+
+def _to_bytes(value):
+    if isinstance(value, str):
+        return value.encode("utf-8")
+
+    return bytes(value)
+
+
+def _import_optional(module_name, extra_name):
+    try:
+        return __import__(module_name, fromlist=["_"])
+    except ImportError:
+        raise ImportError(f"{module_name} is required for {extra_name} compression (pip install v3io[{extra_name}])")
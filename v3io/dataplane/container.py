@@ -12,10 +12,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import io
+import itertools
+
 import v3io.dataplane.kv_cursor
 import v3io.dataplane.model
 import v3io.dataplane.output
 import v3io.dataplane.request
+import v3io.dataplane.response
+import v3io.dataplane.transport
 
 
 class Model(v3io.dataplane.model.Model):
@@ -72,3 +77,198 @@ class Model(v3io.dataplane.model.Model):
             locals(),
             v3io.dataplane.output.GetContainerContentsOutput,
         )
+
+    def iter_contents(
+        self,
+        container,
+        path,
+        access_key=None,
+        raise_for_status=None,
+        get_all_attributes=None,
+        directories_only=None,
+        limit=None,
+    ):
+        """Lists the contents of a path, following the NextMarker of every page to request the next page only once the
+        entries of the previous one were consumed. Pages are parsed as they arrive, so their first entries are
+        yielded before their last ones are received. A page that fails is raised as `HttpResponseError` even if
+        raise_for_status allows its status, since the listing can't continue past it.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        path (Required) : str
+            The path within the container
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        get_all_attributes (Optional) : bool
+            False (default) - retrieves basic attributes
+            True - retrieves all attributes of the underlying objects
+        directories_only (Optional) : bool
+            False (default) - retrieves objects (contents) and directories (common prefixes)
+            True - retrieves only directories (common prefixes)
+        limit (Optional) : int
+            Number of objects/directories to receive per page. default: 1000
+
+        Return Value
+        ----------
+        A generator of the `ContainerContent` and `ContainerCommonPrefix` entries of every page, in the order of the
+        listing.
+        """
+        marker = None
+
+        while True:
+            request = self._transport.request(
+                container,
+                access_key or self._access_key,
+                raise_for_status,
+                v3io.dataplane.transport.Actions.encode_only,
+                v3io.dataplane.request.encode_get_container_contents,
+                {
+                    "path": path,
+                    "get_all_attributes": get_all_attributes,
+                    "directories_only": directories_only,
+                    "limit": limit,
+                    "marker": marker,
+                },
+            )
+
+            request.stream_body = True
+
+            response = self._transport.wait_response(self._transport.send_request(request))
+            response.raise_for_status(v3io.dataplane.transport.RaiseForStatus.always)
+
+            # transports that don't stream bodies return them whole
+            body = response.body
+            if not isinstance(body, v3io.dataplane.response.BodyStream):
+                body = v3io.dataplane.response.BodyStream(io.BytesIO(body))
+
+            with body:
+                output = yield from parse_contents(body)
+
+            marker = get_next_marker(output)
+            if marker is None:
+                return
+
+    def walk(
+        self,
+        container,
+        path,
+        access_key=None,
+        raise_for_status=None,
+        get_all_attributes=None,
+        directories_only=None,
+        limit=None,
+    ):
+        """Walks the directory tree under a path, listing directories concurrently over all the connections of the
+        client. Directories are listed depth first, descending into the directories of a page before listing the next
+        page of its directory, so the frontier of pages yet to be listed holds at most the directories of one page
+        per level of the tree and per connection. A page that fails is raised as `HttpResponseError` even if
+        raise_for_status allows its status.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        path (Required) : str
+            The path within the container
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        get_all_attributes (Optional) : bool
+            False (default) - retrieves basic attributes
+            True - retrieves all attributes of the underlying objects
+        directories_only (Optional) : bool
+            False (default) - retrieves objects (contents) and directories (common prefixes)
+            True - retrieves only directories (common prefixes)
+        limit (Optional) : int
+            Number of objects/directories to receive per page. default: 1000
+
+        Return Value
+        ----------
+        A generator of (path, common prefixes, contents) tuples - one per page listed, in the order in which the pages
+        arrive. Directories with several pages of entries appear in several tuples.
+        """
+        frontier = Frontier(path)
+        batch = self._client.create_batch()
+
+        # request index -> the (path, marker) of the page it lists
+        listed_pages = {}
+        request_indices = itertools.count()
+
+        def _list_page(page):
+            listed_pages[next(request_indices)] = page
+
+            batch.container.list(
+                container,
+                page[0],
+                access_key,
+                get_all_attributes=get_all_attributes,
+                directories_only=directories_only,
+                limit=limit,
+                marker=page[1],
+            )
+
+        # failed pages are raised below, after the pages still in flight are read so that their connections are freed
+        responses = batch.as_completed(_list_page, frontier, v3io.dataplane.transport.RaiseForStatus.never)
+
+        try:
+            for index, response in responses:
+                page_path = listed_pages.pop(index)[0]
+
+                # the pages under a page that failed can't be listed
+                response.raise_for_status(v3io.dataplane.transport.RaiseForStatus.always)
+                output = response.output
+
+                frontier.add_page(page_path, output)
+
+                yield page_path, output.common_prefixes, output.contents
+        finally:
+            responses.close()
+
+
+def parse_contents(chunks):
+    """Yields the entries of a listing as its chunks are parsed, and returns its `GetContainerContentsOutput`"""
+    parser = v3io.dataplane.output.ContainerContentsParser()
+
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+
+    yield from parser.close()
+
+    return parser.output
+
+
+def get_next_marker(output):
+    """Returns the marker of the page following a page of contents (`GetContainerContentsOutput`), or None if it was
+    the last page"""
+    if (output.is_truncated or "").lower() != "true" or not output.next_marker:
+        return None
+
+    return output.next_marker
+
+
+class Frontier(object):
+    """The (path, marker) of the pages of a tree walk yet to be listed, last added first. An iterator that is
+    exhausted whenever no pages are left, and resumes once listed pages add more"""
+
+    def __init__(self, path):
+        self._pages = [(path, None)]
+
+    def add_page(self, path, output):
+        # descend into the directories of a page before listing the next page of its directory, so that the frontier
+        # holds the directories of a single page per level of the tree (rather than all those of wide directories)
+        next_marker = get_next_marker(output)
+        if next_marker is not None:
+            self._pages.append((path, next_marker))
+
+        for common_prefix in reversed(output.common_prefixes):
+            self._pages.append((common_prefix.prefix, None))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self._pages:
+            raise StopIteration
+
+        return self._pages.pop()
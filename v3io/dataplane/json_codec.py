@@ -0,0 +1,108 @@
+# Copyright 2019 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""JSON codecs, which encode request bodies and decode response bodies. A client uses the codec passed to it, or
+orjson if it is installed (pip install v3io[orjson]) and ujson otherwise. Other codecs can be used by passing an
+instance of a `Codec` subclass.
+"""
+import json
+
+import ujson
+
+
+class Codec(object):
+    """Encodes values to JSON bytes, and decodes JSON bytes or str"""
+
+    name = None
+
+    def dumps(self, value):
+        raise NotImplementedError()
+
+    def loads(self, data):
+        raise NotImplementedError()
+
+
+class UjsonCodec(Codec):
+    name = "ujson"
+
+    def dumps(self, value):
+        return ujson.dumps(value, reject_bytes=False).encode("utf-8")
+
+    def loads(self, data):
+        return ujson.loads(data)
+
+
+class OrjsonCodec(Codec):
+    name = "orjson"
+
+    def __init__(self):
+        try:
+            import orjson
+        except ImportError:
+            raise ImportError("orjson is required for the orjson codec (pip install v3io[orjson])")
+
+        self._orjson = orjson
+        self._dumps_option = orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, value):
+        return self._orjson.dumps(value, default=_encode_default, option=self._dumps_option)
+
+    def loads(self, data):
+        return self._orjson.loads(data)
+
+
+class JsonCodec(Codec):
+    name = "json"
+
+    def dumps(self, value):
+        return json.dumps(value, default=_encode_default, separators=(",", ":")).encode("utf-8")
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+def get_codec(codec=None):
+    """Returns a codec, given itself or its name (ujson, orjson or json). Defaults to orjson if it is installed, and
+    ujson otherwise"""
+    global _default_codec
+
+    if isinstance(codec, Codec):
+        return codec
+
+    if codec is not None:
+        codec_cls = _codec_classes.get(codec)
+        if codec_cls is None:
+            raise ValueError(f"Unknown JSON codec: {codec}")
+
+        return codec_cls()
+
+    if _default_codec is None:
+        try:
+            _default_codec = OrjsonCodec()
+        except ImportError:
+            _default_codec = UjsonCodec()
+
+    return _default_codec
+
+
+def _encode_default(value):
+    # like ujson, encode bytes as strings
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value).decode("utf-8")
+
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+_codec_classes = {codec_cls.name: codec_cls for codec_cls in [UjsonCodec, OrjsonCodec, JsonCodec]}
+_default_codec = None
@@ -12,12 +12,23 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import collections
+import functools
 import os
+import time
 
+import v3io.common.helpers
 import v3io.dataplane.kv_cursor
+import v3io.dataplane.kv_table
 import v3io.dataplane.model
 import v3io.dataplane.output
 import v3io.dataplane.request
+import v3io.dataplane.response
+import v3io.dataplane.single_flight
+import v3io.dataplane.transport
+
+# statuses on which put_many / update_many may retry an item - the service is temporarily unavailable or overloaded
+default_retry_status_codes = (429, 502, 503, 504)
 
 
 class Model(v3io.dataplane.model.Model):
@@ -26,6 +37,12 @@ class Model(v3io.dataplane.model.Model):
         self._access_key = client._access_key
         self._transport = client._transport
 
+        # an optional v3io.dataplane.kv_cache.Cache through which get reads items
+        self.cache = None
+
+        # an optional v3io.dataplane.single_flight.SingleFlight through which identical gets share requests
+        self.single_flight = None
+
     def new_cursor(
         self,
         container,
@@ -42,7 +59,27 @@ class Model(v3io.dataplane.model.Model):
         total_segments=None,
         sort_key_range_start=None,
         sort_key_range_end=None,
+        prefetch=False,
     ):
+        """Creates a cursor which reads the items of a table page by page, through a sequence of scan requests.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        table_path (Required) : str
+            The full path of the table
+        prefetch (Optional) : bool
+            If True, the request for the next page is sent as soon as the current page arrives, so that the next page
+            is read while the items of the current page are consumed. Since a page can only be requested with the
+            marker returned with the previous page, at most one page is read ahead
+
+        See `scan` for the rest of the parameters.
+
+        Return Value
+        ----------
+        A `Cursor` object. If prefetch is enabled and not all of its items are read, `close()` must be called on it.
+        """
         return v3io.dataplane.kv_cursor.Cursor(
             self._client,
             container,
@@ -59,6 +96,91 @@ class Model(v3io.dataplane.model.Model):
             total_segments,
             sort_key_range_start,
             sort_key_range_end,
+            prefetch,
+        )
+
+    def new_parallel_cursor(
+        self,
+        container,
+        table_path,
+        table_name=None,
+        access_key=None,
+        raise_for_status=None,
+        attribute_names="*",
+        filter_expression=None,
+        sharding_key=None,
+        limit=None,
+        total_segments=None,
+        sort_key_range_start=None,
+        sort_key_range_end=None,
+        max_workers=None,
+        prefetch=False,
+    ):
+        """Creates a cursor which divides the table into segments and reads all of them in parallel, each through
+        its own sequence of scan requests. Items are returned in the order in which their pages arrive, so there is
+        no ordering between items of different segments.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        table_path (Required) : str
+            The full path of the table
+        total_segments (Optional) : int
+            The number of segments into which to divide the table scan - 1 to 1024. Defaults to the number of
+            connections of the client
+        max_workers (Optional) : int
+            The maximum number of segments read at the same time. Defaults to the number of connections of the
+            client
+        prefetch (Optional) : bool
+            If True, each segment cursor requests its next page as soon as the current one arrives. See `new_cursor`
+
+        See `scan` for the rest of the parameters.
+
+        Return Value
+        ----------
+        A `ParallelCursor` object. If not all of its items are read, `close()` must be called on it.
+        """
+        return v3io.dataplane.kv_cursor.ParallelCursor(
+            self._client,
+            container,
+            access_key or self._access_key,
+            table_path,
+            table_name,
+            total_segments or self._transport.max_connections,
+            raise_for_status,
+            attribute_names,
+            filter_expression,
+            sharding_key,
+            limit,
+            sort_key_range_start,
+            sort_key_range_end,
+            max_workers,
+            prefetch,
+        )
+
+    def table(self, container, table_path, access_key=None, raise_for_status=None):
+        """Creates a handle to the items of a table, for callers that make many calls to the same table. The path of
+        the table and the headers of every function are encoded once, when the handle is created, so each call on
+        the handle only encodes its key and body.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        table_path (Required) : str
+            The full path of the table
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        raise_for_status (Optional) : RaiseForStatus
+            The default raise for status behavior of the calls on the handle
+
+        Return Value
+        ----------
+        A `Table` object, with put, update, get and delete calls.
+        """
+        return v3io.dataplane.kv_table.Table(
+            self._client, container, access_key or self._access_key, table_path, raise_for_status
         )
 
     def put(
@@ -111,13 +233,66 @@ class Model(v3io.dataplane.model.Model):
         A `Response` object.
         """
 
-        return self._transport.request(
+        try:
+            return self._transport.request(
+                container,
+                access_key or self._access_key,
+                raise_for_status,
+                transport_actions,
+                v3io.dataplane.request.encode_put_item,
+                locals(),
+            )
+        finally:
+            self._invalidate_cached_item(container, table_path, key)
+
+    def put_many(
+        self,
+        container,
+        table_path,
+        items,
+        access_key=None,
+        raise_for_status=None,
+        condition=None,
+        num_retries=0,
+        retry_status_codes=default_retry_status_codes,
+    ):
+        """Puts multiple items, sending the requests in parallel over all the connections of the client. Items are
+        read from `items` only as connections free up, so it can be a generator of any length.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        table_path (Required) : str
+            The full path of the table
+        items (Required) : dict or iterable
+            A dict of item key to attributes, or an iterable of (key, attributes) tuples. See `put`
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        raise_for_status (Optional) : RaiseForStatus
+            Determines which statuses are failures. Failed items are reported rather than raised
+        condition (Optional) : str
+            A Boolean condition expression that defines a conditional logic for executing each put-item operation.
+        num_retries (Optional) : int
+            The number of times to retry an item that failed with one of `retry_status_codes`. Retries are sent
+            after all other items, with exponential backoff between rounds
+        retry_status_codes (Optional) : iterable of int
+            The statuses on which an item is retried
+
+        Return Value
+        ----------
+        A dict of item key to the `Response` of each item that failed. Empty if all items were put.
+        """
+        return self._write_many(
+            "put",
             container,
-            access_key or self._access_key,
+            table_path,
+            items,
+            access_key,
             raise_for_status,
-            transport_actions,
-            v3io.dataplane.request.encode_put_item,
-            locals(),
+            num_retries,
+            retry_status_codes,
+            {"condition": condition},
         )
 
     def update(
@@ -176,13 +351,75 @@ class Model(v3io.dataplane.model.Model):
         ----------
         A `Responses` object.
         """
-        return self._transport.request(
+        try:
+            return self._transport.request(
+                container,
+                access_key or self._access_key,
+                raise_for_status,
+                transport_actions,
+                v3io.dataplane.request.encode_update_item,
+                locals(),
+            )
+        finally:
+            self._invalidate_cached_item(container, table_path, key)
+
+    def update_many(
+        self,
+        container,
+        table_path,
+        items,
+        access_key=None,
+        raise_for_status=None,
+        expression=None,
+        condition=None,
+        update_mode=None,
+        alternate_expression=None,
+        num_retries=0,
+        retry_status_codes=default_retry_status_codes,
+    ):
+        """Updates multiple items, sending the requests in parallel over all the connections of the client. Items
+        are read from `items` only as connections free up, so it can be a generator of any length.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        table_path (Required) : str
+            The full path of the table
+        items (Required) : dict or iterable
+            A dict of item key to attributes, or an iterable of (key, attributes) tuples. Attributes may be None
+            when updating through an expression. See `update`
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        raise_for_status (Optional) : RaiseForStatus
+            Determines which statuses are failures. Failed items are reported rather than raised
+        num_retries (Optional) : int
+            The number of times to retry an item that failed with one of `retry_status_codes`. Retries are sent
+            after all other items, with exponential backoff between rounds
+        retry_status_codes (Optional) : iterable of int
+            The statuses on which an item is retried
+
+        See `update` for the rest of the parameters, which apply to all items.
+
+        Return Value
+        ----------
+        A dict of item key to the `Response` of each item that failed. Empty if all items were updated.
+        """
+        return self._write_many(
+            "update",
             container,
-            access_key or self._access_key,
+            table_path,
+            items,
+            access_key,
             raise_for_status,
-            transport_actions,
-            v3io.dataplane.request.encode_update_item,
-            locals(),
+            num_retries,
+            retry_status_codes,
+            {
+                "expression": expression,
+                "condition": condition,
+                "update_mode": update_mode,
+                "alternate_expression": alternate_expression,
+            },
         )
 
     def get(
@@ -216,6 +453,12 @@ class Model(v3io.dataplane.model.Model):
         ----------
         A `Response` object, whose `output` is `GetItemOutput`.
         """
+        # requests made through a batch aren't cached or shared
+        if transport_actions is None and (self.cache is not None or self.single_flight is not None):
+            return self._read_item(
+                container, table_path, key, access_key or self._access_key, raise_for_status, attribute_names
+            )
+
         return self._transport.request(
             container,
             access_key or self._access_key,
@@ -226,6 +469,79 @@ class Model(v3io.dataplane.model.Model):
             v3io.dataplane.output.GetItemOutput,
         )
 
+    def get_many(self, container, table_path, keys, access_key=None, attribute_names="*"):
+        """Retrieves the requested attributes of multiple table items, sending the requests in parallel over all the
+        connections of the client.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        table_path (Required) : str
+            The full path of the table
+        keys (Required) : iterable of str
+            The item key names
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        attribute_names (Optional) : []str or '*'
+            A list of attribute names to get, or '*' which will retreive all attributes
+
+        Each distinct key is requested once, however many times it appears in keys. Items are always read from the
+        table, bypassing the cache and single flight of the model, so that callers which poll items (e.g. stream
+        leases and checkpoints) see their current attributes.
+
+        Return Value
+        ----------
+        A list with an entry per key, in the order of the keys. Each entry is the item's attributes (dict), None if
+        the item doesn't exist or the `HttpResponseError` with which getting it failed.
+        """
+        keys = list(keys)
+        requests = ((key, {"attribute_names": attribute_names}) for key in dict.fromkeys(keys))
+
+        items = {
+            key: decode_get_many_response(response)
+            for (key, _), response in self.request_many("get", container, table_path, requests, access_key)
+        }
+
+        return [items[key] for key in keys]
+
+    def request_many(self, model_call, container, table_path, requests, access_key=None):
+        """Sends a request per item through one of the model's item calls, in parallel over all the connections of
+        the client. Unlike `put_many` and `update_many`, the arguments of the call may differ per item (e.g. a
+        different condition per item), and the responses are handed over as they are. Requests are read from
+        `requests` only as connections free up, so it can be a generator of any length.
+
+        Parameters
+        ----------
+        model_call (Required) : str
+            The name of the call through which every request is sent - put, update, get or delete
+        container (Required) : str
+            The container on which to operate.
+        table_path (Required) : str
+            The full path of the table
+        requests (Required) : iterable
+            An iterable of (key, kw_args) tuples, where kw_args is a dict of the arguments passed to the call for
+            the item in addition to the container, table path, key and access key
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+
+        Gets bypass the cache and single flight of the model. Writes invalidate the items they write in the cache.
+
+        Return Value
+        ----------
+        A generator of (request, response) tuples, in the order of the requests. Responses aren't raised for status.
+        """
+        batch = self._client.create_batch()
+        inflight_requests = collections.deque()
+
+        def _send_request(request):
+            key, kw_args = request
+            inflight_requests.append(request)
+            getattr(batch.kv, model_call)(container, table_path, key, access_key=access_key, **kw_args)
+
+        for response in batch.imap(_send_request, requests, v3io.dataplane.transport.RaiseForStatus.never):
+            yield inflight_requests.popleft(), response
+
     def scan(
         self,
         container,
@@ -333,9 +649,12 @@ class Model(v3io.dataplane.model.Model):
         ----------
         A `Response` object.
         """
-        return self._client.delete_object(
-            container, os.path.join(table_path, key), access_key, raise_for_status, transport_actions
-        )
+        try:
+            return self._client.delete_object(
+                container, os.path.join(table_path, key), access_key, raise_for_status, transport_actions
+            )
+        finally:
+            self._invalidate_cached_item(container, table_path, key)
 
     def create_schema(
         self,
@@ -398,3 +717,105 @@ class Model(v3io.dataplane.model.Model):
             v3io.dataplane.request.encode_put_object,
             put_object_args,
         )
+
+    def _read_item(self, container, table_path, key, access_key, raise_for_status, attribute_names):
+        response = load = None
+
+        if self.cache is not None:
+            response, load = self.cache.lookup(container, table_path, key, attribute_names, access_key)
+            if load is None:
+                return response
+
+        try:
+            response = self._request_item(container, table_path, key, access_key, raise_for_status, attribute_names)
+        finally:
+            if load is not None:
+                self.cache.store(container, table_path, key, attribute_names, access_key, load, response)
+
+        return response
+
+    def _request_item(self, container, table_path, key, access_key, raise_for_status, attribute_names):
+        request_item = functools.partial(
+            self._transport.request,
+            container,
+            access_key,
+            raise_for_status,
+            None,
+            v3io.dataplane.request.encode_get_item,
+            {"table_path": table_path, "key": key, "attribute_names": attribute_names},
+            v3io.dataplane.output.GetItemOutput,
+        )
+
+        if self.single_flight is None:
+            return request_item()
+
+        call_key = v3io.dataplane.single_flight.get_call_key(
+            "kv.get", container, table_path.strip("/"), key, access_key, raise_for_status, attribute_names
+        )
+
+        return self.single_flight.do(call_key, request_item)
+
+    def _invalidate_cached_item(self, container, table_path, key):
+        if self.cache is not None:
+            self.cache.invalidate(container, table_path, key)
+
+    def _write_many(
+        self,
+        model_call,
+        container,
+        table_path,
+        items,
+        access_key,
+        raise_for_status,
+        num_retries,
+        retry_status_codes,
+        kw_args,
+    ):
+        if isinstance(items, dict):
+            items = items.items()
+
+        requests = ((key, dict(kw_args, attributes=attributes)) for key, attributes in items)
+        failed_responses = {}
+
+        for retry in range(num_retries + 1):
+            if retry:
+                time.sleep(v3io.common.helpers.get_retry_interval(retry))
+
+            retry_requests = []
+
+            for request, response in self.request_many(model_call, container, table_path, requests, access_key):
+                key = request[0]
+
+                # the batch invalidated the item when it created the request. invalidate it again now that the write
+                # is done, in case it was read in between
+                self._invalidate_cached_item(container, table_path, key)
+
+                try:
+                    response.raise_for_status(raise_for_status)
+                except v3io.dataplane.response.HttpResponseError:
+                    failed_responses[key] = response
+
+                    if response.status_code in retry_status_codes:
+                        retry_requests.append(request)
+                else:
+                    failed_responses.pop(key, None)
+
+            if not retry_requests:
+                break
+
+            requests = retry_requests
+
+        return failed_responses
+
+
+def decode_get_many_response(response):
+    """Returns the entry of get_many for the response of a single item get"""
+    if response.status_code == 404:
+        return None
+
+    try:
+        response.raise_for_status()
+    except v3io.dataplane.response.HttpResponseError as response_error:
+        return response_error
+
+    return response.output.item
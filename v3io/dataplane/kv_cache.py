@@ -0,0 +1,173 @@
+# Copyright 2019 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import collections
+import threading
+import time
+
+
+class Cache(object):
+    def __init__(self, max_items=None, max_bytes=None, ttl=None):
+        """Creates a read-through cache for kv.get responses. To use it, assign it to the `cache` attribute of the
+        client's kv model (e.g. client.kv.cache = Cache(max_items=10000, ttl=5)). A cache may be shared by several
+        clients, sync or aio.
+
+        Responses are cached per item and per the attribute names and access key with which they were read. Only
+        successful responses are cached, and they're returned as is - they must not be modified. An item is
+        invalidated when it is put, updated or deleted through a kv model using the cache. Items written through a
+        batch are invalidated when the request is created, and writes by other clients are seen only once the item
+        expires.
+
+        Parameters
+        ----------
+        max_items (Optional) : int
+            The maximum number of items to hold. The least recently used items are evicted first
+        max_bytes (Optional) : int
+            The maximum total size of the cached response bodies
+        ttl (Optional) : float
+            The number of seconds after which a cached response expires. If not passed, responses expire only
+            when evicted or invalidated
+
+        Return Value
+        ----------
+        A `Cache` object
+        """
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.num_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # item id -> {(attribute names, access key) -> _Entry}, least recently used first
+        self._items = collections.OrderedDict()
+
+        # item id -> the loads of the item that are in progress, so that invalidations can discard their responses
+        self._loads = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def lookup(self, container, table_path, key, attribute_names, access_key):
+        """Returns a (response, load) tuple. On a hit, response is the cached response. On a miss, it is None and
+        the caller should read the item and pass the response along with load to `store`"""
+        item_id = self._get_item_id(container, table_path, key)
+        read_id = self._get_read_id(attribute_names, access_key)
+
+        with self._lock:
+            entry = self._items.get(item_id, {}).get(read_id)
+
+            if entry is not None and (entry.expires_at is None or entry.expires_at > time.monotonic()):
+                self._items.move_to_end(item_id)
+                self.hits += 1
+
+                return entry.response, None
+
+            self.misses += 1
+
+            load = _Load()
+            self._loads.setdefault(item_id, []).append(load)
+
+            return None, load
+
+    def store(self, container, table_path, key, attribute_names, access_key, load, response):
+        """Caches the response of a load started by `lookup`, unless the item was invalidated in the meantime or the
+        response isn't successful. Must be called for every load, even if reading the item failed (with a response
+        of None)"""
+        item_id = self._get_item_id(container, table_path, key)
+        read_id = self._get_read_id(attribute_names, access_key)
+
+        with self._lock:
+            loads = self._loads[item_id]
+            loads.remove(load)
+            if not loads:
+                del self._loads[item_id]
+
+            if load.invalidated or response is None or response.status_code != 200:
+                return
+
+            entry = _Entry(response, time.monotonic() + self.ttl if self.ttl is not None else None)
+            read_entries = self._items.setdefault(item_id, {})
+            previous_entry = read_entries.get(read_id)
+
+            if previous_entry is not None:
+                self.num_bytes -= previous_entry.size
+
+            read_entries[read_id] = entry
+            self._items.move_to_end(item_id)
+            self.num_bytes += entry.size
+
+            self._evict()
+
+    def invalidate(self, container, table_path, key):
+        """Removes the item from the cache, and discards the responses of loads of it that are in progress"""
+        item_id = self._get_item_id(container, table_path, key)
+
+        with self._lock:
+            self._remove_item(item_id)
+
+            for load in self._loads.get(item_id, []):
+                load.invalidated = True
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.num_bytes = 0
+
+            for loads in self._loads.values():
+                for load in loads:
+                    load.invalidated = True
+
+    def _evict(self):
+        while self._items and (
+            (self.max_items is not None and len(self._items) > self.max_items)
+            or (self.max_bytes is not None and self.num_bytes > self.max_bytes)
+        ):
+            self._remove_item(next(iter(self._items)))
+            self.evictions += 1
+
+    def _remove_item(self, item_id):
+        read_entries = self._items.pop(item_id, None)
+
+        if read_entries is not None:
+            self.num_bytes -= sum(entry.size for entry in read_entries.values())
+
+    @staticmethod
+    def _get_item_id(container, table_path, key):
+        return container, table_path.strip("/"), key
+
+    @staticmethod
+    def _get_read_id(attribute_names, access_key):
+        if not isinstance(attribute_names, str):
+            attribute_names = tuple(attribute_names)
+
+        return attribute_names, access_key
+
+
+class _Entry(object):
+    __slots__ = ("response", "expires_at", "size")
+
+    def __init__(self, response, expires_at):
+        self.response = response
+        self.expires_at = expires_at
+        self.size = len(response.body or b"")
+
+
+class _Load(object):
+    __slots__ = ("invalidated",)
+
+    def __init__(self):
+        self.invalidated = False
@@ -0,0 +1,182 @@
+# Copyright 2019 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import v3io.dataplane.output
+
+# a column whose values are of more than one type. its values are decoded one by one as they're added
+MIXED_TYPE = None
+
+
+class Columns(object):
+    """Accumulates typed items (as returned by GetItems) into one list of raw values per attribute, without creating
+    an object per item. Values are decoded per column when the columns are converted"""
+
+    def __init__(self):
+        self.num_rows = 0
+        self._values = {}
+        self._types = {}
+
+    def add_typed_items(self, typed_items):
+        values = self._values
+        types = self._types
+
+        for typed_item in typed_items:
+            for attribute_name, typed_attribute_value in typed_item.items():
+                for attribute_type, attribute_value in typed_attribute_value.items():
+                    column = values.get(attribute_name)
+
+                    # first time we see this attribute - all previous rows don't have it
+                    if column is None:
+                        column = values[attribute_name] = [None] * self.num_rows
+                        types[attribute_name] = attribute_type
+
+                    # fill the rows that didn't have this attribute
+                    elif len(column) < self.num_rows:
+                        column.extend([None] * (self.num_rows - len(column)))
+
+                    if types[attribute_name] != attribute_type:
+                        attribute_value = self._add_mixed_type_value(attribute_name, attribute_type, attribute_value)
+
+                    column.append(attribute_value)
+
+            self.num_rows += 1
+
+    def to_lists(self):
+        """Returns a dict of attribute name to a list of its decoded values, None where an item had no value"""
+        columns = {}
+
+        for attribute_name, attribute_type in self._types.items():
+            values = self._get_padded_values(attribute_name)
+
+            if attribute_type is not MIXED_TYPE:
+                values = [
+                    v3io.dataplane.output.decode_typed_value(attribute_type, value) if value is not None else None
+                    for value in values
+                ]
+
+            columns[attribute_name] = values
+
+        return columns
+
+    def to_numpy(self):
+        """Returns a dict of attribute name to a numpy array of its values. Numbers are converted to int64 arrays
+        (or float64, if they contain fractions or missing values, and object arrays of python numbers if they contain
+        integers beyond int64), timestamps to datetime64[ns] arrays (in UTC) and
+        everything else to object arrays. Missing values are NaN, NaT or None respectively"""
+        numpy = _import_optional("numpy")
+        columns = {}
+
+        for attribute_name, attribute_type in self._types.items():
+            values = self._get_padded_values(attribute_name)
+
+            if attribute_type == "N":
+                columns[attribute_name] = self._numbers_to_numpy(numpy, values)
+            elif attribute_type == "TS":
+                columns[attribute_name] = self._timestamps_to_numpy(numpy, values)
+            elif attribute_type == "BOOL" and None not in values:
+                columns[attribute_name] = numpy.array(values, dtype=bool)
+            else:
+                if attribute_type not in ["S", "BOOL", MIXED_TYPE]:
+                    values = [
+                        v3io.dataplane.output.decode_typed_value(attribute_type, value) if value is not None else None
+                        for value in values
+                    ]
+
+                # don't let numpy create multi-dimensional arrays from list values
+                column = numpy.empty(len(values), dtype=object)
+                column[:] = values
+
+                columns[attribute_name] = column
+
+        return columns
+
+    def to_pandas(self):
+        """Returns a pandas DataFrame with a column per attribute. Timestamp columns are UTC aware"""
+        pandas = _import_optional("pandas")
+
+        data_frame = pandas.DataFrame(self.to_numpy())
+
+        for attribute_name, attribute_type in self._types.items():
+            if attribute_type == "TS":
+                data_frame[attribute_name] = data_frame[attribute_name].dt.tz_localize("UTC")
+
+        return data_frame
+
+    def _add_mixed_type_value(self, attribute_name, attribute_type, attribute_value):
+        column = self._values[attribute_name]
+
+        # the column values were not decoded until now, decode them all
+        if self._types[attribute_name] is not MIXED_TYPE:
+            column_type = self._types[attribute_name]
+            column[:] = [
+                v3io.dataplane.output.decode_typed_value(column_type, value) if value is not None else None
+                for value in column
+            ]
+
+            self._types[attribute_name] = MIXED_TYPE
+
+        return v3io.dataplane.output.decode_typed_value(attribute_type, attribute_value)
+
+    def _get_padded_values(self, attribute_name):
+        values = self._values[attribute_name]
+
+        # fill the trailing rows that didn't have this attribute
+        if len(values) < self.num_rows:
+            values.extend([None] * (self.num_rows - len(values)))
+
+        return values
+
+    @staticmethod
+    def _numbers_to_numpy(numpy, values):
+        if None in values:
+            return numpy.array(["nan" if value is None else value for value in values]).astype(numpy.float64)
+
+        # numbers are normally received as strings. let numpy parse them all at once
+        column = numpy.array(values)
+        if column.dtype.kind in "if":
+            return column
+
+        try:
+            return column.astype(numpy.int64)
+        except ValueError:
+            return column.astype(numpy.float64)
+        except OverflowError:
+            pass
+
+        # integers beyond int64 are kept as python numbers, rather than losing their precision to float64
+        column = numpy.empty(len(values), dtype=object)
+        column[:] = [v3io.dataplane.output.decode_typed_value("N", value) for value in values]
+
+        return column
+
+    @staticmethod
+    def _timestamps_to_numpy(numpy, values):
+        nanoseconds = numpy.empty(len(values), dtype=numpy.int64)
+
+        for index, value in enumerate(values):
+            if value is None:
+                nanoseconds[index] = numpy.iinfo(numpy.int64).min
+            else:
+                seconds_str, nanoseconds_str = value.split(":")
+                nanoseconds[index] = int(seconds_str) * 1000000000 + int(nanoseconds_str)
+
+        # the minimal int64 value is NaT
+        return nanoseconds.view("datetime64[ns]")
+
+
+def _import_optional(module_name):
+    try:
+        return __import__(module_name)
+    except ImportError:
+        raise ImportError(f"{module_name} is required for columnar output (pip install v3io[{module_name}])")
@@ -12,6 +12,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import concurrent.futures
+import queue
+
+import v3io.dataplane.kv_columnar
+import v3io.dataplane.response
+import v3io.dataplane.transport
+
+
 class Cursor(object):
     def __init__(
         self,
@@ -30,15 +38,17 @@ class Cursor(object):
         total_segments=None,
         sort_key_range_start=None,
         sort_key_range_end=None,
+        prefetch=False,
     ):
         self._context = context
         self._container_name = container_name
         self._access_key = access_key
         self._current_response = None
-        self._current_items = None
+        self._current_typed_items = None
         self._current_item = None
         self._current_item_index = 0
         self._total_items_read = 0
+        self._inflight_request = None
 
         # get items params
         self.raise_for_status = raise_for_status
@@ -53,41 +63,171 @@ class Cursor(object):
         self.total_segments = total_segments
         self.sort_key_range_start = sort_key_range_start
         self.sort_key_range_end = sort_key_range_end
+        self.prefetch = prefetch
 
     def next_item(self):
-        calculated_limit = self.limit
-
         # check if we already reached the limit we were asked for
-        if self.limit is not None:
-            # if we already passed the limit, stop here
-            if self._total_items_read >= self.limit:
-                return None
-
-            # don't ask for more items than we'll read
-            calculated_limit -= self._total_items_read
+        if self.limit is not None and self._total_items_read >= self.limit:
+            return None
 
         # if we already have the item in memory (from the previous scan), return it
-        if self._current_item_index < len(self._current_items or []):
-            self._current_item = self._current_items[self._current_item_index]
+        if self._current_item_index < len(self._current_typed_items or []):
+            self._current_item = self._current_response.output.items[self._current_item_index]
             self._current_item_index += 1
             self._total_items_read += 1
 
             return self._current_item
 
-        # if we had a response which was signaled as last, or we didn't get a responsereturn none
-        if self._current_response and (self._current_response.output.last or len(self._current_items) == 0):
+        # get the next batch, if there is one
+        if not self._read_next_page():
             return None
 
+        # and recurse into next now that we repopulated response
+        return self.next_item()
+
+    def next_page(self):
+        """Returns the items of the current page which were not yet read, reading the next page if all of them were.
+        Returns None once there are no more items to read"""
+        page_range = self._read_page_range()
+        if page_range is None:
+            return None
+
+        return self._current_response.output.items[page_range]
+
+    def to_columns(self):
+        """Reads all the remaining items, returning a dict of attribute name to a list of its values (None for items
+        which don't have the attribute). Values are decoded per attribute, without creating a dict per item"""
+        return self._read_columns().to_lists()
+
+    def to_numpy(self):
+        """Reads all the remaining items, returning a dict of attribute name to a numpy array of its values.
+        Requires numpy. See `v3io.dataplane.kv_columnar.Columns.to_numpy`"""
+        return self._read_columns().to_numpy()
+
+    def to_pandas(self):
+        """Reads all the remaining items, returning a pandas DataFrame with a column per attribute. Requires pandas"""
+        return self._read_columns().to_pandas()
+
+    def all(self):
+        items = []
+
+        while True:
+            item = self.next_item()
+
+            if item is None:
+                break
+
+            items.append(item)
+
+        return items
+
+    def close(self):
+        """Releases the connection held by the request of a prefetched page. Must be called if prefetch is enabled and
+        the cursor is abandoned before all items were read"""
+        if self._inflight_request is None:
+            return
+
+        inflight_request, self._inflight_request = self._inflight_request, None
+
+        # read the response so that the connection is returned to the pool, no one is interested in it
+        try:
+            self._context._transport.wait_response(inflight_request, v3io.dataplane.transport.RaiseForStatus.never)
+        except v3io.dataplane.response.HttpResponseError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _read_columns(self):
+        columns = v3io.dataplane.kv_columnar.Columns()
+
+        while True:
+            page_range = self._read_page_range()
+            if page_range is None:
+                return columns
+
+            columns.add_typed_items(self._current_typed_items[page_range])
+
+    def _read_page_range(self):
+        # check if we already reached the limit we were asked for
+        if self.limit is not None and self._total_items_read >= self.limit:
+            return None
+
+        # if we still have unread items in memory (from the previous scan), return them all
+        if self._current_item_index < len(self._current_typed_items or []):
+            end_index = len(self._current_typed_items)
+
+            # don't return more items than we were asked for
+            if self.limit is not None:
+                end_index = min(end_index, self._current_item_index + self.limit - self._total_items_read)
+
+            page_range = slice(self._current_item_index, end_index)
+            self._total_items_read += end_index - self._current_item_index
+            self._current_item_index = end_index
+
+            return page_range
+
+        # get the next batch, if there is one
+        if not self._read_next_page():
+            return None
+
+        return self._read_page_range()
+
+    def _read_next_page(self):
+        # if we had a response which was signaled as last, or we didn't get a response return false
+        if self._current_response and (self._current_response.output.last or len(self._current_typed_items) == 0):
+            return False
+
+        # if the request for this page was already sent, just wait for its response. otherwise do the request now
+        if self._inflight_request is not None:
+            inflight_request, self._inflight_request = self._inflight_request, None
+            self._current_response = self._context._transport.wait_response(inflight_request, self.raise_for_status)
+        else:
+            self._current_response = self._scan(None, self._total_items_read)
+
+        # raise if there was an issue
+        self._current_response.raise_for_status(self.raise_for_status)
+
+        # set items. they are decoded only if read through next_item() / next_page()
+        self._current_typed_items = self._current_response.output.typed_items
+        self._current_item_index = 0
+
+        # send the request for the next page right away, so that it is read while the items of this page are consumed
+        if self.prefetch:
+            self._prefetch_next_page()
+
+        return True
+
+    def _prefetch_next_page(self):
+        if self._current_response.output.last or len(self._current_typed_items) == 0:
+            return
+
+        # the items of the current page count as read, since they will be by the time the next page is needed
+        total_items_read = self._total_items_read + len(self._current_typed_items)
+        if self.limit is not None and total_items_read >= self.limit:
+            return
+
+        self._inflight_request = self._scan(v3io.dataplane.transport.Actions.encode_and_send, total_items_read)
+
+    def _scan(self, transport_actions, total_items_read):
+        calculated_limit = self.limit
+
+        # don't ask for more items than we'll read
+        if self.limit is not None:
+            calculated_limit -= total_items_read
+
         self.marker = self._current_response.output.next_marker if self._current_response else None
 
-        # get the next batch
-        self._current_response = self._context.kv.scan(
+        return self._context.kv.scan(
             self._container_name,
             self.table_path,
             self.table_name,
             self._access_key,
             self.raise_for_status,
-            None,
+            transport_actions,
             self.attribute_names,
             self.filter_expression,
             self.marker,
@@ -99,15 +239,78 @@ class Cursor(object):
             self.sort_key_range_end,
         )
 
-        # raise if there was an issue
-        self._current_response.raise_for_status(self.raise_for_status)
 
-        # set items
-        self._current_items = self._current_response.output.items
+class ParallelCursor(object):
+    """Scans a table by reading each of its segments through a separate cursor, in parallel. Items of the different
+    segments are interleaved in the order in which their pages arrive"""
+
+    _segment_done = object()
+
+    def __init__(
+        self,
+        context,
+        container_name,
+        access_key,
+        table_path,
+        table_name,
+        total_segments,
+        raise_for_status=None,
+        attribute_names="*",
+        filter_expression=None,
+        sharding_key=None,
+        limit=None,
+        sort_key_range_start=None,
+        sort_key_range_end=None,
+        max_workers=None,
+        prefetch=False,
+    ):
+        self._context = context
+        self._container_name = container_name
+        self._access_key = access_key
+        self._current_items = []
         self._current_item_index = 0
+        self._total_items_read = 0
+        self._executor = None
+        self._pages = None
+        self._num_running_segments = 0
+        self._closed = False
 
-        # and recurse into next now that we repopulated response
-        return self.next_item()
+        # get items params
+        self.raise_for_status = raise_for_status
+        self.table_path = table_path
+        self.table_name = table_name
+        self.total_segments = total_segments
+        self.attribute_names = attribute_names
+        self.filter_expression = filter_expression
+        self.sharding_key = sharding_key
+        self.limit = limit
+        self.sort_key_range_start = sort_key_range_start
+        self.sort_key_range_end = sort_key_range_end
+        self.prefetch = prefetch
+
+        # there's no point in having more workers than segments or connections
+        self.max_workers = min(total_segments, max_workers or context._transport.max_connections or 1)
+
+    def next_item(self):
+        # check if we already reached the limit we were asked for
+        if self.limit is not None and self._total_items_read >= self.limit:
+            self.close()
+            return None
+
+        # read pages until we get one with items or all segments are done
+        while self._current_item_index >= len(self._current_items):
+            items = self._next_page()
+            if items is None:
+                return None
+
+            self._current_items = items
+            self._current_item_index = 0
+
+        item = self._current_items[self._current_item_index]
+        self._current_item_index += 1
+        self._total_items_read += 1
+
+        return item
 
     def all(self):
         items = []
@@ -121,3 +324,103 @@ class Cursor(object):
             items.append(item)
 
         return items
+
+    def close(self):
+        """Stops reading segments. Must be called if the cursor is abandoned before all items were read"""
+        if self._closed:
+            return
+
+        self._closed = True
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    def __iter__(self):
+        while True:
+            item = self.next_item()
+
+            if item is None:
+                return
+
+            yield item
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _next_page(self):
+        if self._closed:
+            return None
+
+        # start reading all segments when the first page is requested
+        if self._executor is None:
+            self._start()
+
+        while self._num_running_segments:
+            page = self._pages.get()
+
+            if page is self._segment_done:
+                self._num_running_segments -= 1
+            elif isinstance(page, BaseException):
+                self.close()
+                raise page
+            else:
+                return page
+
+        self.close()
+
+        return None
+
+    def _start(self):
+        # hold up to two pages per worker, so that a slow consumer doesn't cause the entire table to be read to memory
+        self._pages = queue.Queue(maxsize=self.max_workers * 2)
+        self._num_running_segments = self.total_segments
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers)
+
+        for segment in range(self.total_segments):
+            self._executor.submit(self._read_segment, segment)
+
+    def _read_segment(self, segment):
+        try:
+            cursor = Cursor(
+                self._context,
+                self._container_name,
+                self._access_key,
+                self.table_path,
+                self.table_name,
+                self.raise_for_status,
+                self.attribute_names,
+                self.filter_expression,
+                None,
+                self.sharding_key,
+                self.limit,
+                segment,
+                self.total_segments,
+                self.sort_key_range_start,
+                self.sort_key_range_end,
+                self.prefetch,
+            )
+
+            with cursor:
+                while not self._closed:
+                    items = cursor.next_page()
+                    if items is None:
+                        break
+
+                    self._put_page(items)
+
+        except BaseException as e:
+            self._put_page(e)
+
+        self._put_page(self._segment_done)
+
+    def _put_page(self, page):
+        # the consumer may stop reading at any time, so never block indefinitely on a full queue
+        while not self._closed:
+            try:
+                self._pages.put(page, timeout=0.1)
+                return
+            except queue.Full:
+                pass
@@ -12,10 +12,23 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import contextlib
+import functools
+import io
+import os
+import threading
+
+import v3io.dataplane.compression
 import v3io.dataplane.kv_cursor
 import v3io.dataplane.model
 import v3io.dataplane.output
 import v3io.dataplane.request
+import v3io.dataplane.response
+import v3io.dataplane.single_flight
+import v3io.dataplane.transport
+
+# the default size of the parts in which objects are downloaded
+default_part_size = 8 * 1024 * 1024
 
 
 class Model(v3io.dataplane.model.Model):
@@ -24,6 +37,9 @@ class Model(v3io.dataplane.model.Model):
         self._access_key = client._access_key
         self._transport = client._transport
 
+        # an optional v3io.dataplane.single_flight.SingleFlight through which identical gets share requests
+        self.single_flight = None
+
     def head(self, container, path, access_key=None, raise_for_status=None, transport_actions=None):
         """Retrieves system attributes of object from a container.
 
@@ -58,6 +74,7 @@ class Model(v3io.dataplane.model.Model):
         transport_actions=None,
         offset=None,
         num_bytes=None,
+        decompress=False,
     ):
         """Retrieves an object from a container.
 
@@ -73,12 +90,43 @@ class Model(v3io.dataplane.model.Model):
             A numeric offset into the object (in bytes). Defaults to 0
         num_bytes (Optional) : int
             Number of bytes to return. By default equal to len(object)-offset
+        decompress (Optional) : bool
+            Whether to decompress objects put with compression. Only objects read whole are decompressed, and bodies
+            that don't decode as compressed are returned as they are. Defaults to False
 
         Return Value
         ----------
         A `Response` object, whose `body` is populated with the body of the object.
         """
-        return self._transport.request(
+        # requests made through a batch aren't shared
+        if self.single_flight is not None and transport_actions is None:
+            call_key = v3io.dataplane.single_flight.get_call_key(
+                "object.get",
+                container,
+                path,
+                access_key or self._access_key,
+                raise_for_status,
+                offset,
+                num_bytes,
+                decompress,
+            )
+
+            return self.single_flight.do(
+                call_key,
+                functools.partial(
+                    self.get,
+                    container,
+                    path,
+                    access_key,
+                    raise_for_status,
+                    v3io.dataplane.transport.Actions.send_and_receive,
+                    offset,
+                    num_bytes,
+                    decompress,
+                ),
+            )
+
+        response = self._transport.request(
             container,
             access_key or self._access_key,
             raise_for_status,
@@ -87,8 +135,172 @@ class Model(v3io.dataplane.model.Model):
             locals(),
         )
 
+        # compressed objects can only be decompressed when read whole
+        if (
+            decompress
+            and not offset
+            and not num_bytes
+            and transport_actions in (None, v3io.dataplane.transport.Actions.send_and_receive)
+        ):
+            response.body = v3io.dataplane.compression.decode_object_body(response.body)
+
+        return response
+
+    def get_into(self, container, path, buffer, access_key=None, raise_for_status=None, offset=None, num_bytes=None):
+        """Reads an object (or a range of it) into a caller-supplied buffer. The httpclient transport reads the body
+        straight into the buffer, so reading many large objects doesn't allocate a new body per read. Objects put
+        with compression are not decompressed.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        path (Required) : str
+            The path of the object
+        buffer (Required) : buffer
+            A writable buffer (e.g. a bytearray, memoryview or mmap) at least as large as the data read
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        offset (Optional) : int
+            A numeric offset into the object (in bytes). Defaults to 0
+        num_bytes (Optional) : int
+            Number of bytes to read. By default equal to len(object)-offset
+
+        Return Value
+        ----------
+        A `Response` object, whose `body` is a memoryview of the part of the buffer holding the data read.
+        """
+        request = self._transport.request(
+            container,
+            access_key or self._access_key,
+            raise_for_status,
+            v3io.dataplane.transport.Actions.encode_only,
+            v3io.dataplane.request.encode_get_object,
+            locals(),
+        )
+
+        request.body_buffer = buffer
+
+        response = self._transport.wait_response(self._transport.send_request(request))
+
+        return fill_buffer(buffer, response)
+
+    def get_stream(
+        self,
+        container,
+        path,
+        access_key=None,
+        raise_for_status=None,
+        offset=None,
+        num_bytes=None,
+        chunk_size=v3io.dataplane.response.default_chunk_size,
+    ):
+        """Retrieves an object (or a range of it) as a stream, read as it arrives rather than held in memory whole.
+        The connection the object is read from is held until the stream is drained or closed. Objects put with
+        compression are not decompressed.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        path (Required) : str
+            The path of the object
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        offset (Optional) : int
+            A numeric offset into the object (in bytes). Defaults to 0
+        num_bytes (Optional) : int
+            Number of bytes to return. By default equal to len(object)-offset
+        chunk_size (Optional) : int
+            The maximum number of bytes in the chunks yielded when iterating the stream
+
+        Return Value
+        ----------
+        A `Response` object, whose `body` is a BodyStream yielding the chunks of the object - to be used as a
+        context manager, or otherwise drained or closed.
+        """
+        request = self._transport.request(
+            container,
+            access_key or self._access_key,
+            raise_for_status,
+            v3io.dataplane.transport.Actions.encode_only,
+            v3io.dataplane.request.encode_get_object,
+            locals(),
+        )
+
+        request.stream_body = True
+
+        response = self._transport.wait_response(self._transport.send_request(request))
+
+        # transports that don't stream bodies return them whole
+        if 200 <= response.status_code < 300 and not isinstance(response.body, v3io.dataplane.response.BodyStream):
+            response.body = v3io.dataplane.response.BodyStream(io.BytesIO(response.body))
+
+        if isinstance(response.body, v3io.dataplane.response.BodyStream):
+            response.body.chunk_size = chunk_size
+
+        return response
+
+    def download(self, container, path, dest, access_key=None, raise_for_status=None, part_size=default_part_size):
+        """Downloads an object in parts of part_size bytes, fetched in parallel over all the connections of the
+        client. Each part is written at its offset in the destination as it arrives, so large objects are neither
+        held in memory nor fetched over a single connection.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        path (Required) : str
+            The path of the object
+        dest (Required) : str / file / buffer
+            Where to write the object - a file path (created or truncated), a binary file object open for writing
+            or a writable buffer (e.g. a bytearray) at least as large as the object
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        part_size (Optional) : int
+            The number of bytes to fetch per request
+
+        The object is downloaded as it is stored - objects put with compression are not decompressed. Failures are
+        raised as `HttpResponseError` even if raise_for_status allows them, since the object can't be written
+        without its parts.
+
+        Return Value
+        ----------
+        The size of the object.
+        """
+        access_key = access_key or self._access_key
+
+        size = get_object_size(self.head(container, path, access_key, raise_for_status))
+        part_ranges = get_part_ranges(size, part_size)
+
+        batch = self._client.create_batch()
+
+        def _get_part(part_range):
+            batch.object.get(container, path, access_key, offset=part_range[0], num_bytes=part_range[1])
+
+        # failed parts are raised by write(), after the parts still in flight are read so that their connections
+        # are freed
+        responses = batch.as_completed(_get_part, part_ranges, v3io.dataplane.transport.RaiseForStatus.never)
+
+        with open_download_destination(dest, size) as write:
+            try:
+                for index, response in responses:
+                    write(part_ranges[index], response)
+            finally:
+                responses.close()
+
+        return size
+
     def put(
-        self, container, path, access_key=None, raise_for_status=None, transport_actions=None, body=None, append=None
+        self,
+        container,
+        path,
+        access_key=None,
+        raise_for_status=None,
+        transport_actions=None,
+        body=None,
+        append=None,
+        compression=None,
     ):
         """Adds a new object to a container, or appends data to an existing object. The option to append data is
         extension to the S3 PUT Object capabilities
@@ -105,6 +317,9 @@ class Model(v3io.dataplane.model.Model):
             The contents of the object
         append (Optional) : bool
             If True, the put appends the data to the end of the object. Defaults to False
+        compression (Optional) : str
+            The codec with which to compress the body (see v3io.dataplane.compression) - zlib, lz4 or zstd. The
+            codec is recorded in the object, which `get` decompresses when reading it whole with decompress=True
 
         Return Value
         ----------
@@ -119,6 +334,55 @@ class Model(v3io.dataplane.model.Model):
             locals(),
         )
 
+    def upload(
+        self,
+        container,
+        path,
+        source,
+        access_key=None,
+        raise_for_status=None,
+        chunk_size=default_part_size,
+        progress=None,
+    ):
+        """Uploads an object from a file, reading and putting it chunk_size bytes at a time - the first chunk
+        creates (or overwrites) the object and the others are appended to it. Only a single chunk is held in memory,
+        regardless of the size of the file. The object is partial until the upload completes.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        path (Required) : str
+            The path of the object
+        source (Required) : str / file
+            A file path or a binary file object open for reading, read from its current position to its end
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        chunk_size (Optional) : int
+            The number of bytes to put per request
+        progress (Optional) : callable
+            Called with the number of bytes uploaded so far after each chunk is put
+
+        Return Value
+        ----------
+        The number of bytes uploaded.
+        """
+        num_bytes_uploaded = 0
+
+        for chunk in read_chunks(source, chunk_size):
+            self.put(container, path, access_key, raise_for_status, body=chunk, append=num_bytes_uploaded > 0)
+
+            num_bytes_uploaded += len(chunk)
+
+            if progress is not None:
+                progress(num_bytes_uploaded)
+
+        # an empty source creates an empty object
+        if not num_bytes_uploaded:
+            self.put(container, path, access_key, raise_for_status, body=b"")
+
+        return num_bytes_uploaded
+
     def delete(self, container, path, access_key=None, raise_for_status=None, transport_actions=None):
         """Deletes an object from a container.
 
@@ -143,3 +407,146 @@ class Model(v3io.dataplane.model.Model):
             v3io.dataplane.request.encode_delete_object,
             locals(),
         )
+
+
+def read_chunks(source, chunk_size):
+    """Yields the chunks of source (see object.upload) as memoryviews of a single buffer, so every chunk is valid
+    only until the next one is read"""
+    if isinstance(source, (str, bytes, os.PathLike)):
+        with open(source, "rb") as source_file:
+            yield from read_chunks(source_file, chunk_size)
+
+        return
+
+    buffer = memoryview(bytearray(chunk_size))
+
+    while True:
+        num_bytes_read = _read_into(source, buffer)
+        if not num_bytes_read:
+            return
+
+        yield buffer[:num_bytes_read]
+
+        if num_bytes_read < chunk_size:
+            return
+
+
+def fill_buffer(buffer, response):
+    """Makes the body of a successful response a memoryview of buffer, copying the body into buffer unless the
+    transport read it there"""
+    if not 200 <= response.status_code < 300:
+        return response
+
+    buffer_view = memoryview(buffer).cast("B")
+    body = response.body
+
+    if not isinstance(body, memoryview) or body.obj is not buffer_view.obj:
+        if len(body) > len(buffer_view):
+            raise ValueError(f"Buffer holds {len(buffer_view)} bytes, the body has {len(body)}")
+
+        buffer_view[: len(body)] = body
+
+    response.body = buffer_view[: len(body)]
+
+    return response
+
+
+def get_object_size(head_response):
+    """Returns the size of an object given the response of its head, raising the response if it failed"""
+    head_response.raise_for_status(v3io.dataplane.transport.RaiseForStatus.always)
+
+    return int(head_response.headers["Content-Length"])
+
+
+def get_part_ranges(size, part_size):
+    """Returns the (offset, number of bytes) of the parts of an object"""
+    return [(offset, min(part_size, size - offset)) for offset in range(0, size, part_size)]
+
+
+@contextlib.contextmanager
+def open_download_destination(dest, size):
+    """Yields a function which writes the response of a ranged get to dest (see object.download), given the
+    (offset, number of bytes) of the range"""
+    if isinstance(dest, (str, bytes, os.PathLike)):
+        with open(dest, "wb") as dest_file:
+            dest_file.truncate(size)
+            yield _get_file_writer(dest_file)
+
+    elif hasattr(dest, "write"):
+        dest.flush()
+        yield _get_file_writer(dest)
+
+    else:
+        dest_view = memoryview(dest).cast("B")
+        if len(dest_view) < size:
+            raise ValueError(f"Destination buffer holds {len(dest_view)} bytes, the object has {size}")
+
+        def _write(part_range, response):
+            offset, num_bytes = _check_part(part_range, response)
+            dest_view[offset : offset + num_bytes] = response.body
+
+        yield _write
+
+
+def _get_file_writer(dest_file):
+    try:
+        fd = dest_file.fileno()
+    except (AttributeError, OSError):
+        fd = None
+
+    # write parts at their offset without moving the file position where possible
+    if fd is not None and hasattr(os, "pwrite"):
+
+        def _pwrite(part_range, response):
+            offset, num_bytes = _check_part(part_range, response)
+            body = memoryview(response.body)
+
+            while body:
+                num_written = os.pwrite(fd, body, offset)
+                body = body[num_written:]
+                offset += num_written
+
+        return _pwrite
+
+    lock = threading.Lock()
+
+    def _seek_and_write(part_range, response):
+        offset, num_bytes = _check_part(part_range, response)
+
+        with lock:
+            dest_file.seek(offset)
+            dest_file.write(response.body)
+
+    return _seek_and_write
+
+
+def _check_part(part_range, response):
+    offset, num_bytes = part_range
+
+    response.raise_for_status(v3io.dataplane.transport.RaiseForStatus.always)
+
+    # the object may have been truncated since its size was read
+    if len(response.body) != num_bytes:
+        raise RuntimeError(f"Expected {num_bytes} bytes at offset {offset} of the object, got {len(response.body)}")
+
+    return part_range
+
+
+def _read_into(source, buffer):
+    num_bytes_read = 0
+
+    # reads may return fewer bytes than requested before the end of the source (e.g. from pipes)
+    while num_bytes_read < len(buffer):
+        if hasattr(source, "readinto"):
+            num_bytes = source.readinto(buffer[num_bytes_read:])
+        else:
+            data = source.read(len(buffer) - num_bytes_read)
+            num_bytes = len(data)
+            buffer[num_bytes_read : num_bytes_read + num_bytes] = data
+
+        if not num_bytes:
+            break
+
+        num_bytes_read += num_bytes
+
+    return num_bytes_read
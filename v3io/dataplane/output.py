@@ -13,45 +13,51 @@
 # limitations under the License.
 #
 import base64
+import xml.etree.ElementTree
 
 import future.utils
 
+import v3io.dataplane.compression
+import v3io.dataplane.json_codec
 import v3io.dataplane.kv_array
 import v3io.dataplane.kv_timestamp
 
 
+def decode_typed_value(attribute_type, attribute_value):
+    if attribute_type == "N":
+        try:
+            return int(attribute_value)
+        except ValueError:
+            return float(attribute_value)
+
+    if attribute_type == "B":
+        decoded_attribute = base64.b64decode(attribute_value)
+
+        # try to decode as an array
+        try:
+            return v3io.dataplane.kv_array.decode(decoded_attribute)
+        except BaseException:
+            return decoded_attribute
+
+    if attribute_type == "S":
+        if type(attribute_value) in [float, int]:
+            return str(attribute_value)
+
+        return attribute_value
+
+    if attribute_type == "TS":
+        return v3io.dataplane.kv_timestamp.decode(attribute_value)
+
+    return attribute_value
+
+
 class Output(object):
     def _decode_typed_attributes(self, typed_attributes):
         decoded_attributes = {}
 
         for attribute_key, typed_attribute_value in future.utils.viewitems(typed_attributes):
             for attribute_type, attribute_value in future.utils.viewitems(typed_attribute_value):
-                if attribute_type == "N":
-                    try:
-                        decoded_attribute = int(attribute_value)
-                    except ValueError:
-                        decoded_attribute = float(attribute_value)
-                elif attribute_type == "B":
-                    decoded_attribute = base64.b64decode(attribute_value)
-
-                    # try to decode as an array
-                    try:
-                        decoded_attribute = v3io.dataplane.kv_array.decode(decoded_attribute)
-                    except BaseException:
-                        pass
-
-                elif attribute_type == "S":
-                    if type(attribute_value) in [float, int]:
-                        decoded_attribute = str(attribute_value)
-                    else:
-                        decoded_attribute = attribute_value
-
-                elif attribute_type == "TS":
-                    decoded_attribute = v3io.dataplane.kv_timestamp.decode(attribute_value)
-                else:
-                    decoded_attribute = attribute_value
-
-                decoded_attributes[attribute_key] = decoded_attribute
+                decoded_attributes[attribute_key] = decode_typed_value(attribute_type, attribute_value)
 
         return decoded_attributes
 
@@ -88,49 +94,54 @@ class GetContainersOutput(Output):
 
 
 class ContainerContent(object):
+    # tag -> (attribute name, kind)
+    fields = {
+        "Key": ("key", str),
+        "Size": ("size", int),
+        "LastSequenceID": ("last_sequence_id", int),
+        "LastModified": ("last_modified", str),
+        "Mode": ("mode", str),
+        "AccessTime": ("access_time", str),
+        "CreatingTime": ("creating_time", str),
+        "GID": ("gid", str),
+        "UID": ("uid", str),
+        "InodeNumber": ("inode_number", int),
+    }
+
+    # listings hold many entries, so they don't get a __dict__
+    __slots__ = ["error"] + [attribute_name for attribute_name, _ in fields.values()]
+
     def __init__(self, child):
         # got an error code
         if isinstance(child, dict):
             self.error = child
             return
 
-        for child_key, attribute_name, kind in [
-            ("Key", "key", str),
-            ("Size", "size", int),
-            ("LastSequenceID", "last_sequence_id", int),
-            ("LastModified", "last_modified", str),
-            ("Mode", "mode", str),
-            ("AccessTime", "access_time", str),
-            ("CreatingTime", "creating_time", str),
-            ("GID", "gid", str),
-            ("UID", "uid", str),
-            ("InodeNumber", "inode_number", int),
-        ]:
-            child_value = child.find(child_key)
-            if child_value is not None:
-                setattr(self, attribute_name, kind(child_value.text))
+        _decode_fields(self, child, self.fields)
 
 
 class ContainerCommonPrefix(object):
+    # tag -> (attribute name, kind)
+    fields = {
+        "Prefix": ("prefix", str),
+        "LastModified": ("last_modified", str),
+        "AccessTime": ("access_time", str),
+        "CreatingTime": ("creating_time", str),
+        "Mode": ("mode", str),
+        "GID": ("gid", str),
+        "UID": ("uid", str),
+        "InodeNumber": ("inode_number", int),
+    }
+
+    __slots__ = ["error"] + [attribute_name for attribute_name, _ in fields.values()]
+
     def __init__(self, child):
         # got an error code
         if isinstance(child, dict):
             self.error = child
             return
 
-        for child_key, attribute_name, kind in [
-            ("Prefix", "prefix", str),
-            ("LastModified", "last_modified", str),
-            ("AccessTime", "access_time", str),
-            ("CreatingTime", "creating_time", str),
-            ("Mode", "mode", str),
-            ("GID", "gid", str),
-            ("UID", "uid", str),
-            ("InodeNumber", "inode_number", int),
-        ]:
-            child_value = child.find(child_key)
-            if child_value is not None:
-                setattr(self, attribute_name, kind(child_value.text))
+        _decode_fields(self, child, self.fields)
 
 
 class GetContainerContentsOutput(Output):
@@ -140,23 +151,114 @@ class GetContainerContentsOutput(Output):
             self.error = root
             return
 
-        self.name = root.find("Name").text
-        self.next_marker = root.find("NextMarker").text
-        self.max_keys = root.find("MaxKeys").text
-        self.is_truncated = root.find("IsTruncated").text
+        self.name = None
+        self.next_marker = None
+        self.max_keys = None
+        self.is_truncated = None
         self.contents = []
         self.common_prefixes = []
 
-        contents_children = root.findall("Contents")
-        common_prefixes_children = root.findall("CommonPrefixes")
+        if root is not None:
+            for child in root:
+                self.add_child(child)
+
+    @classmethod
+    def from_body(cls, body):
+        """Parses the body of a listing without building its whole element tree"""
+        # errors are encoded as json
+        if body[:64].lstrip()[:1] in (b"{", "{"):
+            return cls(_decode_json(body))
+
+        parser = ContainerContentsParser()
+        parser.feed(body)
+        parser.close()
+
+        return parser.output
+
+    def add_child(self, child):
+        """Adds a child element of the listing's root. Returns the entry it holds (`ContainerContent` or
+        `ContainerCommonPrefix`), or None if it holds a field of the listing"""
+        if child.tag == "Contents":
+            entry = ContainerContent(child)
+            self.contents.append(entry)
+
+            return entry
+
+        if child.tag == "CommonPrefixes":
+            entry = ContainerCommonPrefix(child)
+            self.common_prefixes.append(entry)
+
+            return entry
+
+        attribute_name = _container_contents_fields.get(child.tag)
+        if attribute_name is not None:
+            setattr(self, attribute_name, child.text)
+
+        return None
 
-        if contents_children is not None:
-            for content_child in contents_children:
-                self.contents.append(ContainerContent(content_child))
 
-        if common_prefixes_children is not None:
-            for common_prefix_child in common_prefixes_children:
-                self.common_prefixes.append(ContainerCommonPrefix(common_prefix_child))
+class ContainerContentsParser(object):
+    """Parses the body of a listing as it arrives, fed in chunks. Entries are built as soon as their element ends and
+    their elements are then discarded, so the parser holds a single entry's elements at a time"""
+
+    def __init__(self):
+        self._pull_parser = xml.etree.ElementTree.XMLPullParser(events=("start", "end"))
+        self._root = None
+        self._depth = 0
+
+        self.output = GetContainerContentsOutput(None)
+
+    def feed(self, data):
+        """Parses a chunk of the body. Returns the entries (`ContainerContent` and `ContainerCommonPrefix`) that
+        ended in it, in the order of the listing"""
+        self._pull_parser.feed(data)
+
+        return self._read_entries()
+
+    def close(self):
+        """Ends the body. Returns the entries that ended since the last chunk was fed"""
+        self._pull_parser.close()
+
+        return self._read_entries()
+
+    def _read_entries(self):
+        entries = []
+
+        for event, element in self._pull_parser.read_events():
+            if event == "start":
+                if self._root is None:
+                    self._root = element
+
+                self._depth += 1
+                continue
+
+            self._depth -= 1
+
+            # a child of the root ended
+            if self._depth == 1:
+                entry = self.output.add_child(element)
+                if entry is not None:
+                    entries.append(entry)
+
+                self._root.remove(element)
+
+        return entries
+
+
+# tag -> attribute name
+_container_contents_fields = {
+    "Name": "name",
+    "NextMarker": "next_marker",
+    "MaxKeys": "max_keys",
+    "IsTruncated": "is_truncated",
+}
+
+
+def _decode_fields(entry, element, fields):
+    for child in element:
+        field = fields.get(child.tag)
+        if field is not None:
+            setattr(entry, field[0], field[1](child.text))
 
 
 #
@@ -173,10 +275,17 @@ class GetItemsOutput(Output):
     def __init__(self, decoded_body):
         self.last = decoded_body.get("LastItemIncluded") == "TRUE"
         self.next_marker = decoded_body.get("NextMarker")
-        self.items = []
 
-        for item in decoded_body.get("Items", []):
-            self.items.append(self._decode_typed_attributes(item))
+        # items are decoded only when accessed, since columnar readers of the page only need the typed items
+        self.typed_items = decoded_body.get("Items", [])
+        self._items = None
+
+    @property
+    def items(self):
+        if self._items is None:
+            self._items = [self._decode_typed_attributes(item) for item in self.typed_items]
+
+        return self._items
 
 
 #
@@ -217,9 +326,49 @@ class GetRecordsResult(Output):
         self.arrival_time_sec = decoded_body.get("ArrivalTimeSec")
         self.arrival_time_nsec = decoded_body.get("ArrivalTimeNSec")
         self.sequence_number = decoded_body.get("SequenceNumber")
-        self.client_info = self._from_base64(decoded_body.get("ClientInfo"))
         self.partition_key = decoded_body.get("PartitionKey")
-        self.data = self._from_base64(decoded_body.get("Data"))
+
+        # records put with compression are decompressed when their data or client info is first read, so that a
+        # record which can't be decompressed (e.g. its codec isn't installed) doesn't fail the records around it
+        self._data = self._from_base64(decoded_body.get("Data"))
+        self._client_info = self._from_base64(decoded_body.get("ClientInfo"))
+        self._decoded = False
+
+        # set by consumers that read several shards
+        self.shard_id = None
+
+        # set for records unpacked from an aggregated record (see v3io.dataplane.stream_aggregation)
+        self.sub_sequence_number = None
+        self.num_sub_records = None
+
+    @property
+    def data(self):
+        self._decode()
+
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        self._decode()
+        self._data = data
+
+    @property
+    def client_info(self):
+        self._decode()
+
+        return self._client_info
+
+    @client_info.setter
+    def client_info(self, client_info):
+        self._decode()
+        self._client_info = client_info
+
+    def _decode(self):
+        if self._decoded:
+            return
+
+        self._data, self._client_info = v3io.dataplane.compression.decode_record(self._data, self._client_info)
+        self._decoded = True
 
     @staticmethod
     def _from_base64(value):
@@ -238,3 +387,71 @@ class GetRecordsOutput(Output):
 
         for record in decoded_body.get("Records"):
             self.records.append(GetRecordsResult(record))
+
+
+#
+# Decoding
+#
+
+
+def register_output_decoder(output, decoder):
+    """Registers a function which decodes response bodies straight into an output class, instead of decoding them by
+    their content type and constructing the output from the result"""
+    _output_decoders[output] = decoder
+
+
+def register_content_type_decoder(content_type, decoder):
+    """Registers a function which decodes response bodies of a content type (e.g. application/json) into what output
+    classes are constructed from"""
+    _content_type_decoders[content_type.lower()] = decoder
+
+
+def decode_output(output, body, headers, json_codec=None):
+    """Decodes a response body into an output class, with the decoder registered for the class if there is one"""
+    output_decoder = _output_decoders.get(output)
+    if output_decoder is not None:
+        return output_decoder(body)
+
+    return output(decode_body(body, headers, json_codec))
+
+
+def decode_body(body, headers, json_codec=None):
+    """Decodes a response body by its content type. Bodies of unregistered content types are decoded as XML if they
+    start with an element, and as JSON otherwise. JSON is decoded with json_codec, if passed"""
+    content_type = _get_content_type(headers)
+
+    if content_type not in _content_type_decoders:
+        content_type = "application/xml" if body[:64].lstrip()[:1] in (b"<", "<") else "application/json"
+
+    if content_type == "application/json" and json_codec is not None:
+        return json_codec.loads(body)
+
+    return _content_type_decoders[content_type](body)
+
+
+def _decode_json(body):
+    return v3io.dataplane.json_codec.get_codec().loads(body)
+
+
+def _get_content_type(headers):
+    if not headers:
+        return None
+
+    content_type = headers.get("Content-Type")
+    if content_type is None:
+        return None
+
+    # drop parameters (e.g. charset)
+    return content_type.split(";", 1)[0].strip().lower()
+
+
+# output class -> decoder
+_output_decoders = {}
+
+# content type -> decoder
+_content_type_decoders = {}
+
+register_content_type_decoder("application/json", _decode_json)
+register_content_type_decoder("application/xml", xml.etree.ElementTree.fromstring)
+register_content_type_decoder("text/xml", xml.etree.ElementTree.fromstring)
+register_output_decoder(GetContainerContentsOutput, GetContainerContentsOutput.from_body)
@@ -24,9 +24,9 @@ try:
 except BaseException:
     from urllib import urlencode, quote
 
-import ujson
-
 import v3io.common.helpers
+import v3io.dataplane.compression
+import v3io.dataplane.json_codec
 import v3io.dataplane.kv_array
 import v3io.dataplane.kv_timestamp
 
@@ -36,25 +36,113 @@ import v3io.dataplane.kv_timestamp
 
 
 class Request(object):
-    def __init__(self, container, access_key, raise_for_status, encoder, encoder_args, output=None):
+    def __init__(self, container, access_key, raise_for_status, encoder, encoder_args, output=None, json_codec=None):
         self.container = container
         self.access_key = access_key
         self.raise_for_status = raise_for_status
         self.encoder = encoder
         self.encoder_args = encoder_args
         self.output = output
+        self.json_codec = json_codec or v3io.dataplane.json_codec.get_codec()
 
         # get request params with the encoder
         self.method, self.path, self.query, self.headers, self.body = encoder(container, access_key, encoder_args)
 
+        # set if the path was quoted in advance (e.g. by a TableRequestTemplate)
+        self.quoted_path = None
+
+        # encoders leave json bodies as dicts
+        if isinstance(self.body, dict):
+            self.body = self.json_codec.dumps(self.body)
+
+        # if set, a buffer into which the transport may read the body of a successful response
+        self.body_buffer = None
+
+        # if set, the transport returns the body of a successful response as a stream, read as it arrives
+        self.stream_body = False
+
         # used by the transport
         self.transport = lambda: None
 
     def encode_path(self):
+        quoted_path = self.quoted_path if self.quoted_path is not None else quote(self.path)
+
         if self.query is None:
-            return quote(self.path)
+            return quoted_path
+
+        return quoted_path + "?" + urlencode(self.query, quote_via=quote)
+
+
+class TableRequestTemplate(object):
+    """Creates the requests of the items of a KV table. What is the same for every item - the path of the table,
+    quoted, and the headers of every function, with the session key - is built once rather than per request"""
+
+    def __init__(self, container_name, access_key, table_path):
+        self.container_name = container_name
+        self.access_key = access_key
+        self.table_path = table_path
+        self.path_prefix = v3io.common.helpers.url_join(container_name, os.path.join(table_path, ""))
+        self.quoted_path_prefix = quote(self.path_prefix)
+
+        # function name -> headers
+        self._headers = {None: {"X-v3io-session-key": access_key} if access_key else None}
+
+        for function_name in ["PutItem", "UpdateItem", "GetItem"]:
+            self._headers[function_name] = {"X-v3io-function": function_name, "Content-Type": "application/json"}
+
+            if access_key:
+                self._headers[function_name]["X-v3io-session-key"] = access_key
+
+    def new_put_item_request(self, key, attributes, condition=None, raise_for_status=None, json_codec=None):
+        body = _encode_put_item_body(attributes, condition)
+
+        return self._new_request("PUT", "PutItem", key, body, raise_for_status, None, json_codec)
+
+    def new_update_item_request(
+        self,
+        key,
+        attributes=None,
+        expression=None,
+        condition=None,
+        update_mode=None,
+        alternate_expression=None,
+        raise_for_status=None,
+        json_codec=None,
+    ):
+        http_method, function_name, body = _encode_update_item_body(
+            attributes, expression, condition, update_mode, alternate_expression
+        )
+
+        return self._new_request(http_method, function_name, key, body, raise_for_status, None, json_codec)
+
+    def new_get_item_request(self, key, attribute_names="*", raise_for_status=None, output=None, json_codec=None):
+        body = _encode_get_item_body(attribute_names)
+
+        return self._new_request("PUT", "GetItem", key, body, raise_for_status, output, json_codec)
+
+    def new_delete_item_request(self, key, raise_for_status=None, json_codec=None):
+        return self._new_request("DELETE", None, key, None, raise_for_status, None, json_codec)
 
-        return quote(self.path) + "?" + urlencode(self.query, quote_via=quote)
+    def _new_request(self, http_method, function_name, key, body, raise_for_status, output, json_codec):
+        request = Request(
+            self.container_name,
+            self.access_key,
+            raise_for_status,
+            self._encode,
+            (http_method, function_name, key, body),
+            output,
+            json_codec,
+        )
+
+        request.quoted_path = self.quoted_path_prefix + quote(key)
+
+        return request
+
+    def _encode(self, container_name, access_key, encoder_args):
+        http_method, function_name, key, body = encoder_args
+        headers = self._headers[function_name]
+
+        return http_method, self.path_prefix + key, None, dict(headers) if headers else None, body
 
 
 #
@@ -123,7 +211,12 @@ def encode_put_object(container_name, access_key, kwargs):
     if kwargs["append"]:
         headers = {"Range": "-1"}
 
-    return _encode("PUT", container_name, access_key, kwargs["path"], None, headers, kwargs["body"])
+    body = kwargs["body"]
+
+    if kwargs.get("compression") is not None:
+        body = v3io.dataplane.compression.encode_object_body(kwargs["compression"], body or b"")
+
+    return _encode("PUT", container_name, access_key, kwargs["path"], None, headers, body)
 
 
 def encode_delete_object(container_name, access_key, kwargs):
@@ -136,12 +229,6 @@ def encode_delete_object(container_name, access_key, kwargs):
 
 
 def encode_put_item(container_name, access_key, kwargs):
-    # add 'Item' to body
-    body = {"Item": _dict_to_typed_attributes(kwargs["attributes"])}
-
-    if kwargs["condition"] is not None:
-        body["ConditionExpression"] = kwargs["condition"]
-
     return _encode(
         "PUT",
         container_name,
@@ -149,33 +236,18 @@ def encode_put_item(container_name, access_key, kwargs):
         kwargs.get("path") or os.path.join(kwargs["table_path"], kwargs["key"]),
         None,
         {"X-v3io-function": "PutItem"},
-        body,
+        _encode_put_item_body(kwargs["attributes"], kwargs["condition"]),
     )
 
 
 def encode_update_item(container_name, access_key, kwargs):
-    body = {"UpdateMode": kwargs.get("update_mode") or "CreateOrReplaceAttributes"}
-
-    if kwargs["condition"] is not None:
-        body["ConditionExpression"] = kwargs["condition"]
-
-    if not kwargs["expression"] and not kwargs["attributes"]:
-        raise RuntimeError("One of expression or attributes must be populated for update item")
-
-    if kwargs["expression"]:
-        http_method = "POST"
-        function_name = "UpdateItem"
-        body["UpdateExpression"] = kwargs["expression"]
-
-    if kwargs["alternate_expression"]:
-        http_method = "POST"
-        function_name = "UpdateItem"
-        body["AlternateUpdateExpression"] = kwargs["alternate_expression"]
-
-    elif kwargs["attributes"]:
-        http_method = "PUT"
-        function_name = "PutItem"
-        body["Item"] = _dict_to_typed_attributes(kwargs["attributes"])
+    http_method, function_name, body = _encode_update_item_body(
+        kwargs["attributes"],
+        kwargs["expression"],
+        kwargs["condition"],
+        kwargs.get("update_mode"),
+        kwargs["alternate_expression"],
+    )
 
     return _encode(
         http_method,
@@ -189,8 +261,6 @@ def encode_update_item(container_name, access_key, kwargs):
 
 
 def encode_get_item(container_name, access_key, kwargs):
-    body = {"AttributesToGet": ",".join(kwargs["attribute_names"])}
-
     return _encode(
         "PUT",
         container_name,
@@ -198,7 +268,7 @@ def encode_get_item(container_name, access_key, kwargs):
         kwargs.get("path") or os.path.join(kwargs["table_path"], kwargs["key"]),
         None,
         {"X-v3io-function": "GetItem"},
-        body,
+        _encode_get_item_body(kwargs["attribute_names"]),
     )
 
 
@@ -322,8 +392,12 @@ def encode_seek_shard(container_name, access_key, kwargs):
 
 def encode_put_records(container_name, access_key, kwargs):
     records = []
+    compression = kwargs.get("compression")
 
     for record in kwargs["records"]:
+        if compression is not None:
+            record = v3io.dataplane.compression.encode_record(compression, record)
+
         record_body = {
             "Data": _to_base64(record["data"]),
         }
@@ -394,6 +468,46 @@ def _encode(method, container_name, access_key, path, query, headers, body):
     return method, path, query, headers, body
 
 
+def _encode_put_item_body(attributes, condition):
+    body = {"Item": _dict_to_typed_attributes(attributes)}
+
+    if condition is not None:
+        body["ConditionExpression"] = condition
+
+    return body
+
+
+def _encode_update_item_body(attributes, expression, condition, update_mode, alternate_expression):
+    body = {"UpdateMode": update_mode or "CreateOrReplaceAttributes"}
+
+    if condition is not None:
+        body["ConditionExpression"] = condition
+
+    if not expression and not attributes:
+        raise RuntimeError("One of expression or attributes must be populated for update item")
+
+    if expression:
+        http_method = "POST"
+        function_name = "UpdateItem"
+        body["UpdateExpression"] = expression
+
+    if alternate_expression:
+        http_method = "POST"
+        function_name = "UpdateItem"
+        body["AlternateUpdateExpression"] = alternate_expression
+
+    elif attributes:
+        http_method = "PUT"
+        function_name = "PutItem"
+        body["Item"] = _dict_to_typed_attributes(attributes)
+
+    return http_method, function_name, body
+
+
+def _encode_get_item_body(attribute_names):
+    return {"AttributesToGet": ",".join(attribute_names)}
+
+
 def _typed_attributes_to_dict(self):
     pass
 
@@ -459,7 +573,7 @@ def _resolve_body_and_headers(access_key, headers, body):
     if not isinstance(body, dict):
         return headers, body
 
-    body = ujson.dumps(body, reject_bytes=False)
+    # the request encodes the body with its json codec
     headers["Content-Type"] = "application/json"
 
     return headers, body
@@ -12,12 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
-import xml.etree.ElementTree
-
-import ujson
-
+import v3io.dataplane.output
 import v3io.dataplane.transport
 
+# the default number of bytes in the chunks of a streamed body
+default_chunk_size = 64 * 1024
+
 
 class HttpResponseError(Exception):
     """Exception raised on bad http status"""
@@ -31,10 +31,11 @@ class HttpResponseError(Exception):
 
 
 class Response(object):
-    def __init__(self, output, status_code, headers, body):
+    def __init__(self, output, status_code, headers, body, json_codec=None):
         self.status_code = status_code
         self.body = body
         self.headers = headers
+        self.json_codec = json_codec
         self._output = output
         self._parsed_output = None
 
@@ -45,12 +46,9 @@ class Response(object):
 
         if self._output and self.body:
             try:
-                # TODO: It's expensive to always try to parse as JSON first. Better
-                #       use headers or a heuristic to decide the format.
-                try:
-                    parsed_output = ujson.loads(self.body)
-                except Exception:
-                    parsed_output = xml.etree.ElementTree.fromstring(self.body)
+                self._parsed_output = v3io.dataplane.output.decode_output(
+                    self._output, self.body, self.headers, self.json_codec
+                )
             except Exception:
                 raise HttpResponseError(
                     f"Failed to parse response with status {self.status_code}, "
@@ -58,8 +56,6 @@ class Response(object):
                     self.status_code,
                 )
 
-            self._parsed_output = self._output(parsed_output)
-
             return self._parsed_output
 
     def raise_for_status(self, expected_statuses=None):
@@ -78,6 +74,70 @@ class Response(object):
             )
 
 
+class BodyStream(object):
+    """The body of a response, read as it arrives from a file-like raw body. Iterating the stream yields chunks of up
+    to chunk_size bytes. The connection the body is read from is released once the body is drained or the stream is
+    closed, so streams must be drained or closed (e.g. by using them as context managers)"""
+
+    def __init__(self, raw, release=None, chunk_size=default_chunk_size):
+        self._raw = raw
+        self._release = release
+        self._released = False
+
+        self.chunk_size = chunk_size
+        self.closed = False
+
+    def read(self, num_bytes=-1):
+        """Returns up to num_bytes bytes of the body (all the remaining bytes if num_bytes is negative), or an empty
+        bytes once the body is drained"""
+        if self.closed:
+            raise ValueError("Read from a closed body stream")
+
+        if self._released:
+            return b""
+
+        try:
+            data = self._raw.read() if num_bytes < 0 else self._raw.read(num_bytes)
+        except BaseException:
+            self._release_raw(False)
+            raise
+
+        if num_bytes < 0 or (num_bytes and not data):
+            self._release_raw(True)
+
+        return data
+
+    def close(self):
+        """Releases the connection the body is read from. A body that wasn't drained is discarded along with its
+        connection"""
+        self._release_raw(False)
+        self.closed = True
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.chunk_size)
+
+            if not chunk:
+                return
+
+            yield chunk
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _release_raw(self, drained):
+        if self._released:
+            return
+
+        self._released = True
+
+        if self._release is not None:
+            self._release(drained)
+
+
 class Responses(object):
     def __init__(self):
         self.responses = []
@@ -0,0 +1,64 @@
+# Copyright 2019 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import concurrent.futures
+import threading
+
+
+class SingleFlight(object):
+    def __init__(self):
+        """Shares a single in-flight call among threads that make the same call at the same time. To coalesce
+        identical reads, assign it to the `single_flight` attribute of the client's kv and/or object models (e.g.
+        client.kv.single_flight = SingleFlight()). kv.get and object.get calls with the same arguments that are made
+        while such a call is in flight wait for it and receive its response (or exception) rather than sending a
+        request of their own. The shared response must not be modified.
+
+        Return Value
+        ----------
+        A `SingleFlight` object
+        """
+        self.num_shared = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function):
+        """Calls function, unless a call with the same key is in flight - in which case its result is returned"""
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+
+            if is_leader:
+                call = self._calls[key] = concurrent.futures.Future()
+            else:
+                self.num_shared += 1
+
+        if not is_leader:
+            return call.result()
+
+        try:
+            result = function()
+        except BaseException as e:
+            call.set_exception(e)
+            raise e
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+def get_call_key(*args):
+    """Returns a hashable key for a call with the given arguments"""
+    return tuple(tuple(arg) if isinstance(arg, list) else arg for arg in args)
@@ -18,6 +18,11 @@ import v3io.dataplane.kv_cursor
 import v3io.dataplane.model
 import v3io.dataplane.output
 import v3io.dataplane.request
+import v3io.dataplane.stream_checkpoint
+import v3io.dataplane.stream_consumer
+import v3io.dataplane.stream_group
+import v3io.dataplane.stream_producer
+import v3io.dataplane.stream_router
 
 
 class Model(v3io.dataplane.model.Model):
@@ -26,6 +31,260 @@ class Model(v3io.dataplane.model.Model):
         self._access_key = client._access_key
         self._transport = client._transport
 
+    def new_consumer(
+        self,
+        container,
+        stream_path,
+        shard_ids=None,
+        seek_type="EARLIEST",
+        access_key=None,
+        raise_for_status=None,
+        starting_sequence_numbers=None,
+        timestamp_sec=None,
+        timestamp_nsec=None,
+        limit=None,
+        poll_interval=1.0,
+        prefetch=1,
+        checkpoint_store=None,
+    ):
+        """Creates a consumer which polls the shards of a stream concurrently, starting at the location returned by
+        seeking each shard. Each shard requests its next records (by the location returned with the current ones)
+        while the application processes the current ones.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        stream_path (Required) : str
+            The stream_path of the stream.
+        shard_ids (Optional) : []int
+            The shards to consume. Defaults to all the shards of the stream, as returned by `describe`
+        seek_type (Optional) : str
+            Where to start consuming each shard - one of EARLIEST (default), LATEST, TIME or SEQUENCE. See `seek`
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        starting_sequence_numbers (Optional) : dict
+            For a SEQUENCE seek, the sequence number at which to start consuming each shard (by shard ID). Shards
+            that don't appear in it are consumed from their earliest record
+        timestamp_sec (Optional) : int
+            For a TIME seek, the base time in seconds. See `seek`
+        timestamp_nsec (Optional) : int
+            For a TIME seek, the nanoseconds unit of the base time. See `seek`
+        limit (Optional) : int
+            The maximum number of records to read from a shard per request. See `get_records`
+        poll_interval (Optional) : float
+            The number of seconds to wait before polling a shard that had no new records
+        prefetch (Optional) : int
+            The number of record lists that a shard may read ahead of the application. Must be at least 1
+        checkpoint_store (Optional) : CheckpointStore
+            A checkpoint store (see `new_checkpoint_store`). Shards that have a stored checkpoint are consumed from
+            the record following it, regardless of seek_type, and `checkpoint(record)` stores progress
+
+        Return Value
+        ----------
+        A `Consumer` object, whose records (`GetRecordsResult`) have a `shard_id`. `close()` must be called on it
+        when done.
+        """
+        return v3io.dataplane.stream_consumer.Consumer(
+            self._client,
+            container,
+            access_key or self._access_key,
+            stream_path,
+            shard_ids,
+            seek_type,
+            raise_for_status,
+            starting_sequence_numbers,
+            timestamp_sec,
+            timestamp_nsec,
+            limit,
+            poll_interval,
+            prefetch,
+            checkpoint_store,
+        )
+
+    def new_checkpoint_store(self, container, table_path, access_key=None, interval=5.0):
+        """Creates a checkpoint store which keeps the sequence number of the last processed record of every shard of
+        a stream as an item (named by the shard ID) in a KV table. Checkpoints are written at most once every
+        interval seconds, through conditional updates that never move a stored checkpoint backwards.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        table_path (Required) : str
+            The path of the table holding the checkpoints - one per stream and consuming application
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        interval (Optional) : float
+            The minimum number of seconds between writes of the checkpoints
+
+        Return Value
+        ----------
+        A `CheckpointStore` object, to pass to `new_consumer`
+        """
+        return v3io.dataplane.stream_checkpoint.CheckpointStore(
+            self._client, container, access_key or self._access_key, table_path, interval
+        )
+
+    def new_consumer_group(
+        self,
+        container,
+        stream_path,
+        lease_table_path,
+        member_id=None,
+        lease_duration=10.0,
+        checkpoint_store=None,
+        seek_type="EARLIEST",
+        access_key=None,
+        raise_for_status=None,
+        limit=None,
+        poll_interval=1.0,
+        prefetch=1,
+    ):
+        """Creates a member of a consumer group, which consumes a share of the shards of a stream. The members of a
+        group (in any process) hold leases on the shards, stored as items in a KV table, and balance them among
+        themselves through conditional updates - renewing their leases every third of lease_duration, taking leases
+        that weren't renewed for lease_duration and stealing leases from members holding more than their share.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        stream_path (Required) : str
+            The stream_path of the stream.
+        lease_table_path (Required) : str
+            The path of the table holding the leases - one per stream and consumer group
+        member_id (Optional) : str
+            The ID of the member, unique in the group. Defaults to an ID made of the host name and process ID
+        lease_duration (Optional) : float
+            The number of seconds after which the leases of a member that stopped renewing them may be taken
+        checkpoint_store (Optional) : CheckpointStore
+            A checkpoint store (see `new_checkpoint_store`), through which members resume shards where their
+            previous holders stopped. Without it, shards are consumed from seek_type whenever they change hands
+        seek_type (Optional) : str
+            Where to start consuming shards without a checkpoint - EARLIEST (default) or LATEST. See `seek`
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        limit (Optional) : int
+            The maximum number of records to read from a shard per request. See `get_records`
+        poll_interval (Optional) : float
+            The number of seconds to wait before polling a shard that had no new records
+        prefetch (Optional) : int
+            The number of record lists that a shard may read ahead of the application. Must be at least 1
+
+        Return Value
+        ----------
+        A `ConsumerGroup` object, consumed like a `Consumer`. `close()` must be called on it to release its leases.
+        """
+        return v3io.dataplane.stream_group.ConsumerGroup(
+            self._client,
+            container,
+            access_key or self._access_key,
+            stream_path,
+            lease_table_path,
+            member_id,
+            lease_duration,
+            checkpoint_store,
+            seek_type,
+            raise_for_status,
+            limit,
+            poll_interval,
+            prefetch,
+        )
+
+    def new_producer(
+        self,
+        container,
+        access_key=None,
+        max_records=v3io.dataplane.stream_producer.max_records_per_request,
+        max_bytes=4 * 1024 * 1024,
+        linger=0.05,
+        max_retries=3,
+        max_pending_requests=None,
+        on_failure=None,
+        router=None,
+        aggregate=False,
+        compression=None,
+    ):
+        """Creates a producer which buffers records per stream and sends them through put_records in the background.
+        A buffer is sent once it holds max_records records or max_bytes bytes, or once its oldest record has
+        waited linger seconds.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        max_records (Optional) : int
+            The maximum number of records per request - up to 1000
+        max_bytes (Optional) : int
+            The approximate maximum size of a request
+        linger (Optional) : float
+            The maximum number of seconds a record waits for more records to be sent with
+        max_retries (Optional) : int
+            The number of times to retry records that failed to be put. Only the failed records of a request are
+            retried
+        max_pending_requests (Optional) : int
+            The number of requests that may wait to be sent before putting records blocks. Defaults to twice the
+            number of connections of the client
+        on_failure (Optional) : callable
+            Called with (stream_path, record, error) for every record that failed to be put after all retries,
+            where error is either the record's `PutRecordsResult` or an exception. By default, failures are logged
+        router (Optional) : Router
+            A router (see `new_router`) with which to route records to shards on the client. Records are then
+            buffered per shard and the requests of a shard are sent one at a time, so that records with the same
+            partition key are put in order
+        aggregate (Optional) : bool
+            Whether to pack the records of every request into aggregated records (see
+            v3io.dataplane.stream_aggregation), saving the per-record overhead of small records. Consumers unpack
+            aggregated records transparently. Records are aggregated per shard ID, or per partition key for records
+            without one, so it pays to route records through a router
+        compression (Optional) : str
+            The codec with which to compress the data of the records. See `put_records`
+
+        Return Value
+        ----------
+        A `Producer` object, whose `put(stream_path, record)` adds a record. `close()` must be called on it to send
+        the buffered records.
+        """
+        return v3io.dataplane.stream_producer.Producer(
+            self._client,
+            container,
+            access_key or self._access_key,
+            max_records,
+            max_bytes,
+            linger,
+            max_retries,
+            max_pending_requests,
+            on_failure,
+            router,
+            aggregate,
+            compression,
+        )
+
+    def new_router(self, container, access_key=None, refresh_interval=60.0):
+        """Creates a router which maps the partition keys of records to shards on the client, rather than letting the
+        stream place them. A partition key is hashed to the same shard for as long as the stream's shard count
+        doesn't change, so the router can also be used to partition work between consumers.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        refresh_interval (Optional) : float
+            The number of seconds for which the shard count of a stream is cached
+
+        Return Value
+        ----------
+        A `Router` object, whose `get_shard_id(stream_path, partition_key)` returns the shard of a partition key
+        """
+        return v3io.dataplane.stream_router.Router(
+            self._client, container, access_key or self._access_key, refresh_interval
+        )
+
     def create(
         self,
         container,
@@ -230,7 +489,14 @@ class Model(v3io.dataplane.model.Model):
         )
 
     def put_records(
-        self, container, stream_path, records, access_key=None, raise_for_status=None, transport_actions=None
+        self,
+        container,
+        stream_path,
+        records,
+        access_key=None,
+        raise_for_status=None,
+        transport_actions=None,
+        compression=None,
     ):
         """Adds records to a stream.
 
@@ -281,6 +547,9 @@ class Model(v3io.dataplane.model.Model):
                     {'shard_id': 2, 'data': 'second shard record #1'},
                     {'data': 'some shard record #1'},
                 ]
+        compression (Optional) : str
+            The codec with which to compress the data of the records (see v3io.dataplane.compression) - zlib, lz4 or
+            zstd. The codec is recorded in the client info of the records, which `get_records` decompresses
 
         Return Value
         ----------
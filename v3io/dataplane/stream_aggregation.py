@@ -0,0 +1,281 @@
+# Copyright 2019 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Packs many small records into a single stream record, to save the per-record overhead of the stream. An aggregated
+record's data is laid out as follows (integers are unsigned LEB128 varints):
+
+    magic (4 bytes) | version (1 byte)
+    number of partition keys | for each: length, UTF-8 bytes
+    number of records | for each: partition key index + 1 (0 for none), client info length + 1 (0 for none),
+                                  client info bytes, data length, data bytes
+    CRC32 of all the preceding bytes (4 bytes, big endian)
+"""
+import copy
+import struct
+import zlib
+
+magic = b"V3AG"
+version = 1
+
+# the default maximum size of the data of an aggregated record
+default_max_record_size = 256 * 1024
+
+_header = magic + bytes([version])
+
+
+class Aggregator(object):
+    """Accumulates records sent to the same shard (or with the same partition key) into aggregated records"""
+
+    def __init__(self, max_record_size=default_max_record_size):
+        self.max_record_size = max_record_size
+        self._records = []
+        self._partition_keys = {}
+        self._num_bytes = len(_header) + 4
+
+    def __len__(self):
+        return len(self._records)
+
+    def add(self, record):
+        """Adds a record (see stream.put_records). Returns the aggregated record of the records added so far if
+        the record doesn't fit in it, and None otherwise"""
+        record_size = _get_encoded_record_size(record, record.get("partition_key") in self._partition_keys)
+        aggregated_record = None
+
+        if self._records and self._num_bytes + record_size > self.max_record_size:
+            aggregated_record = self.flush()
+            record_size = _get_encoded_record_size(record, False)
+
+        partition_key = record.get("partition_key")
+        if partition_key is not None and partition_key not in self._partition_keys:
+            self._partition_keys[partition_key] = len(self._partition_keys)
+
+        self._records.append(record)
+        self._num_bytes += record_size
+
+        return aggregated_record
+
+    def flush(self):
+        """Returns the aggregated record of the records added so far (or None if none were) and resets the
+        aggregator"""
+        if not self._records:
+            return None
+
+        aggregated_record = {"data": encode_aggregated_record_data(self._records)}
+
+        # the aggregated record is routed like the records in it
+        for name in ("shard_id", "partition_key"):
+            value = self._records[0].get(name)
+            if value is not None:
+                aggregated_record[name] = value
+
+        self._records = []
+        self._partition_keys = {}
+        self._num_bytes = len(_header) + 4
+
+        return aggregated_record
+
+
+def aggregate(records, max_record_size=default_max_record_size):
+    """Returns the aggregated records packing the records (see stream.put_records). Records are aggregated by their
+    shard ID, or by their partition key if they have no shard ID, so that every record is routed as it would be if
+    put on its own"""
+    aggregators = {}
+    aggregated_records = []
+
+    for record in records:
+        shard_id = record.get("shard_id")
+        routing_key = (shard_id, None if shard_id is not None else record.get("partition_key"))
+
+        aggregator = aggregators.get(routing_key)
+        if aggregator is None:
+            aggregator = aggregators[routing_key] = Aggregator(max_record_size)
+
+        aggregated_record = aggregator.add(record)
+        if aggregated_record is not None:
+            aggregated_records.append(aggregated_record)
+
+    for aggregator in aggregators.values():
+        aggregated_records.append(aggregator.flush())
+
+    return aggregated_records
+
+
+def deaggregate(records):
+    """Returns the records (`GetRecordsResult`) with every aggregated record replaced by the records packed in it.
+    Unpacked records share the sequence number and arrival time of their aggregated record, and have a
+    sub_sequence_number"""
+    if not any(is_aggregated_record_data(record.data) for record in records):
+        return records
+
+    deaggregated_records = []
+
+    for record in records:
+        if not is_aggregated_record_data(record.data):
+            deaggregated_records.append(record)
+            continue
+
+        sub_records = decode_aggregated_record_data(record.data)
+
+        for sub_sequence_number, sub_record in enumerate(sub_records):
+            deaggregated_record = copy.copy(record)
+            deaggregated_record.data = sub_record["data"]
+            deaggregated_record.partition_key = sub_record.get("partition_key")
+            deaggregated_record.client_info = sub_record.get("client_info")
+            deaggregated_record.sub_sequence_number = sub_sequence_number
+            deaggregated_record.num_sub_records = len(sub_records)
+
+            deaggregated_records.append(deaggregated_record)
+
+    return deaggregated_records
+
+
+def encode_aggregated_record_data(records):
+    """Returns the data of an aggregated record packing the records (see stream.put_records)"""
+    partition_keys = {}
+
+    for record in records:
+        partition_key = record.get("partition_key")
+        if partition_key is not None and partition_key not in partition_keys:
+            partition_keys[partition_key] = len(partition_keys)
+
+    encoded = bytearray(_header)
+    _encode_varint(encoded, len(partition_keys))
+
+    for partition_key in partition_keys:
+        _encode_bytes(encoded, partition_key.encode("utf-8"))
+
+    _encode_varint(encoded, len(records))
+
+    for record in records:
+        partition_key = record.get("partition_key")
+        _encode_varint(encoded, partition_keys[partition_key] + 1 if partition_key is not None else 0)
+
+        client_info = record.get("client_info")
+        if client_info is None:
+            _encode_varint(encoded, 0)
+        else:
+            client_info = _to_bytes(client_info)
+            _encode_varint(encoded, len(client_info) + 1)
+            encoded += client_info
+
+        _encode_bytes(encoded, _to_bytes(record["data"]))
+
+    encoded += struct.pack(">I", zlib.crc32(encoded))
+
+    return bytes(encoded)
+
+
+def decode_aggregated_record_data(data):
+    """Returns the records (dicts with data and, if they were set, partition_key and client_info) packed in the data
+    of an aggregated record"""
+    data = memoryview(data)[len(_header) : -4]
+    offset = 0
+
+    num_partition_keys, offset = _decode_varint(data, offset)
+    partition_keys = []
+
+    for _ in range(num_partition_keys):
+        partition_key, offset = _decode_bytes(data, offset)
+        partition_keys.append(partition_key.decode("utf-8"))
+
+    num_records, offset = _decode_varint(data, offset)
+    records = []
+
+    for _ in range(num_records):
+        record = {}
+
+        partition_key_index, offset = _decode_varint(data, offset)
+        if partition_key_index:
+            record["partition_key"] = partition_keys[partition_key_index - 1]
+
+        client_info_length, offset = _decode_varint(data, offset)
+        if client_info_length:
+            record["client_info"] = bytes(data[offset : offset + client_info_length - 1])
+            offset += client_info_length - 1
+
+        record["data"], offset = _decode_bytes(data, offset)
+        records.append(record)
+
+    return records
+
+
+def is_aggregated_record_data(data):
+    """Returns whether the data of a record is that of an aggregated record"""
+    return (
+        data is not None
+        and len(data) >= len(_header) + 4
+        and data.startswith(_header)
+        and struct.unpack(">I", data[-4:])[0] == zlib.crc32(memoryview(data)[:-4])
+    )
+
+
+def get_checkpoint(record):
+    """Returns the (sequence number, sub-sequence number) up to which records were processed once the record was. A
+    record that wasn't aggregated is the only record at its sequence number, with a sub-sequence number of 0"""
+    return record.sequence_number, record.sub_sequence_number or 0
+
+
+def is_after_checkpoint(record, checkpoint):
+    """Returns whether a record (unpacked, see `deaggregate`) follows a checkpoint returned by `get_checkpoint`"""
+    return (record.sequence_number, record.sub_sequence_number or 0) > checkpoint
+
+
+def _get_encoded_record_size(record, partition_key_exists):
+    size = 8 + len(_to_bytes(record["data"])) + len(_to_bytes(record.get("client_info") or b""))
+
+    partition_key = record.get("partition_key")
+    if partition_key is not None and not partition_key_exists:
+        size += 4 + len(partition_key.encode("utf-8"))
+
+    return size
+
+
+def _to_bytes(value):
+    if isinstance(value, str):
+        return value.encode("utf-8")
+
+    return value
+
+
+def _encode_varint(encoded, value):
+    while value >= 0x80:
+        encoded.append((value & 0x7F) | 0x80)
+        value >>= 7
+
+    encoded.append(value)
+
+
+def _decode_varint(data, offset):
+    value = shift = 0
+
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+
+        if byte < 0x80:
+            return value, offset
+
+        shift += 7
+
+
+def _encode_bytes(encoded, value):
+    _encode_varint(encoded, len(value))
+    encoded += value
+
+
+def _decode_bytes(data, offset):
+    length, offset = _decode_varint(data, offset)
+
+    return bytes(data[offset : offset + length]), offset + length
@@ -0,0 +1,150 @@
+# Copyright 2019 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import threading
+import time
+
+import v3io.dataplane.response
+
+# precedes every checkpoint
+no_checkpoint = (-1, -1)
+
+
+class CheckpointStore(object):
+    """Stores the sequence number (and sub-sequence number, for records unpacked from an aggregated record) of the last
+    record processed in every shard of a stream, as an item per shard in a KV table. Checkpoints are kept in memory
+    and written at most once every interval seconds, all shards at once, so that checkpointing every record costs no
+    requests. Writes are conditioned on the stored checkpoint being lower, so checkpoints never move backwards"""
+
+    def __init__(self, context, container_name, access_key, table_path, interval=5.0):
+        self._context = context
+        self._container_name = container_name
+        self._access_key = access_key
+        self._lock = threading.Lock()
+
+        # shard id -> the (sequence number, sub-sequence number) not written yet
+        self._pending_checkpoints = {}
+        self._last_flush_time = time.monotonic()
+
+        self.table_path = table_path
+        self.interval = interval
+
+    def checkpoint(self, shard_id, sequence_number, sub_sequence_number=0):
+        """Records that the records of the shard up to and including sequence_number were processed - of the record
+        at sequence_number, if it's aggregated, the ones up to and including sub_sequence_number. Writes the
+        checkpoints of all shards if interval seconds passed since they were last written"""
+        checkpoint = (sequence_number, sub_sequence_number)
+
+        with self._lock:
+            if checkpoint <= self._pending_checkpoints.get(shard_id, no_checkpoint):
+                return
+
+            self._pending_checkpoints[shard_id] = checkpoint
+
+            if time.monotonic() - self._last_flush_time < self.interval:
+                return
+
+        self.flush()
+
+    def flush(self):
+        """Writes the checkpoints recorded since the last write"""
+        with self._lock:
+            checkpoints = self._pending_checkpoints
+            self._pending_checkpoints = {}
+            self._last_flush_time = time.monotonic()
+
+        if not checkpoints:
+            return
+
+        requests = [
+            (str(shard_id), encode_checkpoint_update(*checkpoint)) for shard_id, checkpoint in checkpoints.items()
+        ]
+
+        failed_responses = {}
+
+        for (key, _), response in self._context.kv.request_many(
+            "update", self._container_name, self.table_path, requests, self._access_key
+        ):
+            if response.status_code != 200:
+                failed_responses[int(key)] = response
+
+        if failed_responses:
+            self._handle_failed_writes(checkpoints, failed_responses)
+
+    def load(self, shard_ids):
+        """Returns a dict of shard id -> the stored (sequence number, sub-sequence number) of the shard, for the shards
+        that have one"""
+        items = self._context.kv.get_many(
+            self._container_name,
+            self.table_path,
+            [str(shard_id) for shard_id in shard_ids],
+            self._access_key,
+            attribute_names=["sequence_number", "sub_sequence_number"],
+        )
+
+        return decode_checkpoints(shard_ids, items)
+
+    def close(self):
+        """Writes the checkpoints recorded since the last write"""
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _handle_failed_writes(self, checkpoints, failed_responses):
+        # a write fails its condition if a checkpoint at least as recent is stored (e.g. by another consumer)
+        stored_checkpoints = self.load(list(failed_responses))
+
+        failed_shard_ids = [
+            shard_id
+            for shard_id in failed_responses
+            if stored_checkpoints.get(shard_id, no_checkpoint) < checkpoints[shard_id]
+        ]
+
+        if not failed_shard_ids:
+            return
+
+        # keep the checkpoints so that the next flush retries them
+        with self._lock:
+            for shard_id in failed_shard_ids:
+                if checkpoints[shard_id] > self._pending_checkpoints.get(shard_id, no_checkpoint):
+                    self._pending_checkpoints[shard_id] = checkpoints[shard_id]
+
+        failed_responses[failed_shard_ids[0]].raise_for_status()
+
+
+def encode_checkpoint_update(sequence_number, sub_sequence_number=0):
+    """Returns the kv.update arguments which store a checkpoint, unless a more recent one is stored"""
+    return {
+        "expression": f"sequence_number={sequence_number};sub_sequence_number={sub_sequence_number}",
+        "condition": f"NOT exists(sequence_number) OR sequence_number < {sequence_number} OR "
+        f"(sequence_number == {sequence_number} AND sub_sequence_number < {sub_sequence_number})",
+    }
+
+
+def decode_checkpoints(shard_ids, items):
+    """Returns the checkpoints of the shards given the kv.get_many result of their items"""
+    checkpoints = {}
+
+    for shard_id, item in zip(shard_ids, items):
+        if isinstance(item, v3io.dataplane.response.HttpResponseError):
+            raise item
+
+        if item is not None and item.get("sequence_number") is not None:
+            checkpoints[shard_id] = (int(item["sequence_number"]), int(item.get("sub_sequence_number") or 0))
+
+    return checkpoints
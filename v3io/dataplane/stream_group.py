@@ -0,0 +1,417 @@
+# Copyright 2019 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import collections
+import os
+import socket
+import threading
+import time
+import uuid
+
+import v3io.dataplane.response
+import v3io.dataplane.stream_aggregation
+import v3io.dataplane.stream_consumer
+
+
+class ConsumerGroup(object):
+    """Consumes the shards of a stream together with the other members of a consumer group - in this process or in
+    others. Every shard is consumed by the member holding its lease, an item (named by the shard ID) in a KV table.
+    Members renew their leases periodically, take leases that expired and steal leases from members holding more than
+    their share, all through conditional updates, so that the shards are spread evenly across the live members"""
+
+    def __init__(
+        self,
+        context,
+        container_name,
+        access_key,
+        stream_path,
+        lease_table_path,
+        member_id=None,
+        lease_duration=10.0,
+        checkpoint_store=None,
+        seek_type="EARLIEST",
+        raise_for_status=None,
+        limit=None,
+        poll_interval=1.0,
+        prefetch=1,
+    ):
+        if prefetch < 1:
+            raise ValueError(f"prefetch must be at least 1, got {prefetch}")
+
+        self._context = context
+        self._container_name = container_name
+        self._access_key = access_key
+        self._current_records = []
+        self._current_record_index = 0
+        self._consumer = None
+        self._balancer = None
+        self._condition = threading.Condition()
+        self._closed = threading.Event()
+
+        # shard id -> the counter of the lease held by this member
+        self._owned_leases = {}
+
+        # when the owned leases were last renewed
+        self._leases_renewed_at = None
+
+        self.stream_path = stream_path
+        self.lease_table_path = lease_table_path
+        self.member_id = member_id or get_member_id()
+        self.lease_duration = lease_duration
+        self.checkpoint_store = checkpoint_store
+        self.seek_type = seek_type
+        self.raise_for_status = raise_for_status
+        self.limit = limit
+        self.poll_interval = poll_interval
+        self.prefetch = prefetch
+        self.shard_ids = None
+        self._leases = Leases(self.member_id, lease_duration)
+
+    @property
+    def owned_shard_ids(self):
+        """The IDs of the shards whose leases this member holds"""
+        with self._condition:
+            self._expire_owned_leases()
+
+            return sorted(self._owned_leases)
+
+    def next_record(self, timeout=None):
+        """Returns the next record (`GetRecordsResult`) of any shard this member holds, or None if no record arrived
+        within timeout seconds or the group was closed"""
+        while self._current_record_index >= len(self._current_records):
+            records = self.next_records(timeout)
+            if records is None:
+                return None
+
+            self._current_records = records
+            self._current_record_index = 0
+
+        record = self._current_records[self._current_record_index]
+        self._current_record_index += 1
+
+        return record
+
+    def next_records(self, timeout=None):
+        """Returns the next non-empty list of records read from a shard this member holds, or None if no records
+        arrived within timeout seconds or the group was closed"""
+        self._current_records = []
+        self._current_record_index = 0
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        while True:
+            consumer = self._get_consumer(deadline)
+            if consumer is None:
+                return None
+
+            # wake up periodically to follow changes in the leases this member holds, and before they expire
+            wait_timeout = min(self._get_balance_interval(), self._get_lease_time_left())
+            if deadline is not None:
+                wait_timeout = max(min(wait_timeout, deadline - time.monotonic()), 0)
+
+            try:
+                records = consumer.next_records(wait_timeout)
+
+            # the consumer closes itself when a shard fails. release the leases so that other members take the shards
+            except Exception:
+                self.close()
+                raise
+
+            if records is not None:
+                return records
+
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+
+    def checkpoint(self, record):
+        """Records that the record, and all records that preceded it in its shard, were processed"""
+        if self.checkpoint_store is None:
+            raise RuntimeError("Cannot checkpoint records of a consumer group without a checkpoint store")
+
+        self.checkpoint_store.checkpoint(record.shard_id, *v3io.dataplane.stream_aggregation.get_checkpoint(record))
+
+    def close(self):
+        """Stops consuming and releases the leases of this member, so that other members can take them at once"""
+        if self._closed.is_set():
+            return
+
+        self._closed.set()
+
+        with self._condition:
+            self._condition.notify_all()
+
+        if self._balancer is not None:
+            self._balancer.join()
+
+        if self._consumer is not None:
+            self._consumer.close()
+
+        if self.checkpoint_store is not None:
+            self.checkpoint_store.flush()
+
+        with self._condition:
+            owned_leases = self._owned_leases
+            self._owned_leases = {}
+
+        requests = [
+            (str(shard_id), encode_lease_release(self.member_id, counter)) for shard_id, counter in owned_leases.items()
+        ]
+
+        # leases that fail to be released expire
+        for _ in self._context.kv.request_many(
+            "update", self._container_name, self.lease_table_path, requests, self._access_key
+        ):
+            pass
+
+    def __iter__(self):
+        while True:
+            record = self.next_record()
+
+            if record is None:
+                return
+
+            yield record
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _get_consumer(self, deadline):
+        with self._condition:
+            if self._balancer is None:
+                self._start()
+
+            self._expire_owned_leases()
+            has_owned_leases = bool(self._owned_leases)
+
+        # stop reading shards that other members may have taken while this member waits for leases
+        if not has_owned_leases and self._consumer is not None and self._consumer.shard_ids:
+            self._consumer.set_shard_ids([])
+
+        with self._condition:
+            # wait until this member holds a lease
+            while not self._owned_leases and not self._closed.is_set():
+                timeout = deadline - time.monotonic() if deadline is not None else None
+                if timeout is not None and timeout <= 0:
+                    return None
+
+                self._condition.wait(timeout)
+
+            if self._closed.is_set():
+                return None
+
+            shard_ids = sorted(self._owned_leases)
+
+        # consume the shards this member holds now, without interrupting the shards it kept. Records read but not
+        # checkpointed are read again by the member that takes their shard
+        if self._consumer is None:
+            self._consumer = v3io.dataplane.stream_consumer.Consumer(
+                self._context,
+                self._container_name,
+                self._access_key,
+                self.stream_path,
+                shard_ids,
+                self.seek_type,
+                self.raise_for_status,
+                limit=self.limit,
+                poll_interval=self.poll_interval,
+                prefetch=self.prefetch,
+                checkpoint_store=self.checkpoint_store,
+            )
+
+        elif self._consumer.shard_ids != shard_ids:
+            self._consumer.set_shard_ids(shard_ids)
+
+        return self._consumer
+
+    def _start(self):
+        response = self._context.stream.describe(
+            self._container_name, self.stream_path, self._access_key, self.raise_for_status
+        )
+
+        self.shard_ids = list(range(response.output.shard_count))
+
+        self._balance()
+
+        self._balancer = threading.Thread(target=self._balance_periodically, daemon=True)
+        self._balancer.start()
+
+    def _balance_periodically(self):
+        while not self._closed.wait(self._get_balance_interval()):
+            try:
+                self._balance()
+            except Exception as e:
+                self._context._logger.warn_with("Failed to balance shard leases", error=str(e))
+
+    def _balance(self):
+        # other members measure the expiry of a lease from when they observe its renewal, which is later than this
+        started_at = time.monotonic()
+
+        items = self._context.kv.get_many(
+            self._container_name,
+            self.lease_table_path,
+            [str(shard_id) for shard_id in self.shard_ids],
+            self._access_key,
+            attribute_names=["owner", "lease_counter"],
+        )
+
+        self._leases.observe(self.shard_ids, items)
+
+        requests = []
+        next_counters = {}
+
+        for shard_id, counter in self._leases.get_owned_leases().items():
+            requests.append((str(shard_id), encode_lease_renewal(self.member_id, counter)))
+            next_counters[shard_id] = counter + 1
+
+        for shard_id, counter in self._leases.get_leases_to_take():
+            requests.append((str(shard_id), encode_lease_take(self.member_id, counter)))
+            next_counters[shard_id] = (counter or 0) + 1
+
+        owned_leases = {}
+
+        # leases whose update failed were taken by other members
+        for (key, _), response in self._context.kv.request_many(
+            "update", self._container_name, self.lease_table_path, requests, self._access_key
+        ):
+            if response.status_code == 200:
+                owned_leases[int(key)] = next_counters[int(key)]
+
+        with self._condition:
+            self._owned_leases = owned_leases
+            self._leases_renewed_at = started_at
+            self._condition.notify_all()
+
+    def _expire_owned_leases(self):
+        # leases that failed to be renewed for lease_duration may have been taken by other members. called with the
+        # condition held
+        if self._owned_leases and time.monotonic() - self._leases_renewed_at >= self.lease_duration:
+            self._owned_leases = {}
+
+    def _get_lease_time_left(self):
+        with self._condition:
+            return max(self._leases_renewed_at + self.lease_duration - time.monotonic(), 0)
+
+    def _get_balance_interval(self):
+        return self.lease_duration / 3
+
+
+class Leases(object):
+    """The leases of the shards of a stream as observed by a member of a consumer group. A lease whose counter wasn't
+    incremented for lease_duration seconds, as measured by the observer, has expired - so members don't depend on
+    their clocks being in sync"""
+
+    def __init__(self, member_id, lease_duration):
+        self.member_id = member_id
+        self.lease_duration = lease_duration
+
+        # shard id -> (owner, lease counter, the time at which they were first observed)
+        self._observations = {}
+
+    def observe(self, shard_ids, items):
+        """Records the lease items of the shards, as returned by kv.get_many"""
+        now = time.monotonic()
+
+        for shard_id, item in zip(shard_ids, items):
+            if isinstance(item, v3io.dataplane.response.HttpResponseError):
+                raise item
+
+            owner = counter = None
+
+            if item is not None:
+                owner = item.get("owner") or None
+                counter = item.get("lease_counter")
+                counter = int(counter) if counter is not None else None
+
+            observation = self._observations.get(shard_id)
+
+            if observation is None or observation[:2] != (owner, counter):
+                self._observations[shard_id] = (owner, counter, now)
+
+    def get_owned_leases(self):
+        """Returns a dict of shard id -> lease counter of the leases held by the member"""
+        return {
+            shard_id: counter for shard_id, (owner, counter, _) in self._observations.items() if owner == self.member_id
+        }
+
+    def get_leases_to_take(self):
+        """Returns the (shard id, lease counter) of the leases the member should take so that it holds its share of
+        the shards - expired leases first, otherwise a single lease of the member holding the most leases, if it
+        holds more than its share"""
+        now = time.monotonic()
+        num_owned_leases = 0
+        expired_leases = []
+        leases_by_owner = collections.defaultdict(list)
+
+        for shard_id, (owner, counter, observed_at) in sorted(self._observations.items()):
+            if owner == self.member_id:
+                num_owned_leases += 1
+            elif owner is None or now - observed_at >= self.lease_duration:
+                expired_leases.append((shard_id, counter))
+            else:
+                leases_by_owner[owner].append((shard_id, counter))
+
+        # the members are the owners of leases that haven't expired, and this member
+        num_members = len(leases_by_owner) + 1
+        share = -(-len(self._observations) // num_members)
+        num_leases_to_take = share - num_owned_leases
+
+        if num_leases_to_take <= 0:
+            return []
+
+        if expired_leases:
+            return expired_leases[:num_leases_to_take]
+
+        # steal gradually, so that members don't keep taking the same leases from one another
+        busiest_owner_leases = max(leases_by_owner.values(), key=len, default=[])
+        if len(busiest_owner_leases) > share:
+            return busiest_owner_leases[-1:]
+
+        return []
+
+
+def get_member_id():
+    """Returns an ID for a consumer group member that is unique across processes and hosts"""
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+def encode_lease_take(member_id, lease_counter):
+    """Returns the kv.update arguments which take a lease, unless it changed since it was observed"""
+    if lease_counter is None:
+        condition = "NOT exists(lease_counter)"
+    else:
+        condition = f"lease_counter == {lease_counter}"
+
+    return {
+        "expression": f"owner='{member_id}';lease_counter={(lease_counter or 0) + 1}",
+        "condition": condition,
+    }
+
+
+def encode_lease_renewal(member_id, lease_counter):
+    """Returns the kv.update arguments which renew a lease, unless it was taken by another member"""
+    return {
+        "expression": f"lease_counter={lease_counter + 1}",
+        "condition": f"owner == '{member_id}' AND lease_counter == {lease_counter}",
+    }
+
+
+def encode_lease_release(member_id, lease_counter):
+    """Returns the kv.update arguments which release a lease, unless it was taken by another member"""
+    return {
+        "expression": f"owner='';lease_counter={lease_counter + 1}",
+        "condition": f"owner == '{member_id}' AND lease_counter == {lease_counter}",
+    }
@@ -0,0 +1,335 @@
+# Copyright 2019 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import collections
+import concurrent.futures
+import functools
+import threading
+import time
+
+import v3io.common.helpers
+import v3io.dataplane.stream_aggregation
+
+# the maximum number of records in a single put_records request
+max_records_per_request = 1000
+
+
+class Producer(object):
+    """Buffers records per stream and sends each buffer through a single put_records request once it is full or its
+    oldest record has waited linger seconds. Requests are sent in the background, several at a time, and records
+    that the stream failed to put are retried.
+
+    If a router is passed, records are routed to shards on the client and buffered per shard, and the requests of
+    a shard are sent one at a time - so records with the same partition key are put in the order in which they
+    were passed to put. Records that failed are retried along with the records that followed them in their shard,
+    which are put again even if they succeeded. Without a router, the shard of a record is only known to the stream,
+    and retries may reorder the records of a partition key.
+
+    If aggregate is set, the records of a request are packed into aggregated records (see
+    v3io.dataplane.stream_aggregation), and buffers are sent by size only"""
+
+    def __init__(
+        self,
+        context,
+        container_name,
+        access_key,
+        max_records=max_records_per_request,
+        max_bytes=4 * 1024 * 1024,
+        linger=0.05,
+        max_retries=3,
+        max_pending_requests=None,
+        on_failure=None,
+        router=None,
+        aggregate=False,
+        compression=None,
+    ):
+        self._context = context
+        self._container_name = container_name
+        self._access_key = access_key
+        self._buffers = {}
+        self._num_pending_requests = 0
+
+        # (stream path, shard id) -> the records waiting for the request in flight to the shard to complete
+        self._shard_queues = {}
+        self._condition = threading.Condition()
+        self._executor = None
+        self._flusher = None
+        self._closed = False
+
+        self.max_records = min(max_records, max_records_per_request)
+        self.max_bytes = max_bytes
+        self.linger = linger
+        self.max_retries = max_retries
+        self.max_pending_requests = max_pending_requests or context._transport.max_connections * 2
+        self.on_failure = on_failure
+        self.router = router
+        self.aggregate = aggregate
+        self.compression = compression
+        self._pending_request_slots = threading.Semaphore(self.max_pending_requests)
+
+    def put(self, stream_path, record):
+        """Adds a record (see stream.put_records) to the buffer of the stream. Blocks if max_pending_requests
+        requests are waiting to be sent"""
+        shard_id = None
+
+        if self.router is not None:
+            shard_id = self.router.route(stream_path, record)
+
+            if shard_id is not None and record.get("shard_id") is None:
+                record = dict(record, shard_id=shard_id)
+
+        buffer_key = (stream_path, shard_id)
+
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Cannot put records through a closed producer")
+
+            if self._executor is None:
+                self._start()
+
+            buffer = self._buffers.get(buffer_key)
+            if buffer is None:
+                buffer = self._buffers[buffer_key] = Buffer()
+
+                # the flusher may need to wake up earlier, for this buffer
+                self._condition.notify_all()
+
+            buffer.add(record)
+
+            if not self._is_full(buffer):
+                return
+
+            del self._buffers[buffer_key]
+
+        self._send(buffer_key, buffer.records)
+
+    def flush(self):
+        """Sends all buffered records and waits for all requests to complete"""
+        with self._condition:
+            buffers = self._buffers
+            self._buffers = {}
+
+        for buffer_key, buffer in buffers.items():
+            self._send(buffer_key, buffer.records)
+
+        with self._condition:
+            while self._num_pending_requests:
+                self._condition.wait()
+
+    def close(self):
+        """Flushes the buffered records and stops the producer"""
+        with self._condition:
+            if self._closed:
+                return
+
+            self._closed = True
+            self._condition.notify_all()
+
+        if self._executor is not None:
+            self.flush()
+            self._flusher.join()
+            self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _is_full(self, buffer):
+        # aggregated records are sent by size, as many records are packed into each
+        return (not self.aggregate and len(buffer.records) >= self.max_records) or buffer.num_bytes >= self.max_bytes
+
+    def _start(self):
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self._context._transport.max_connections)
+        self._flusher = threading.Thread(target=self._flush_lingering_buffers, daemon=True)
+        self._flusher.start()
+
+    def _flush_lingering_buffers(self):
+        while True:
+            with self._condition:
+                if self._closed:
+                    return
+
+                now = time.monotonic()
+                lingering_buffer_keys = [
+                    buffer_key for buffer_key, buffer in self._buffers.items() if now - buffer.created_at >= self.linger
+                ]
+
+                lingering_buffers = [(key, self._buffers.pop(key)) for key in lingering_buffer_keys]
+
+                # sleep until the oldest buffer lingers enough, or until a new buffer is created
+                if not lingering_buffers:
+                    oldest_created_at = min((buffer.created_at for buffer in self._buffers.values()), default=None)
+                    timeout = oldest_created_at + self.linger - now if oldest_created_at is not None else None
+                    self._condition.wait(timeout)
+                    continue
+
+            for buffer_key, buffer in lingering_buffers:
+                self._send(buffer_key, buffer.records)
+
+    def _send(self, buffer_key, records):
+        # block the caller when too many requests wait to be sent
+        self._pending_request_slots.acquire()
+
+        with self._condition:
+            self._num_pending_requests += 1
+
+            # send the requests of a shard one at a time, so that its records are put in order
+            if buffer_key[1] is not None:
+                shard_queue = self._shard_queues.get(buffer_key)
+                if shard_queue is not None:
+                    shard_queue.append(records)
+                    return
+
+                self._shard_queues[buffer_key] = collections.deque()
+
+        self._submit(buffer_key, records)
+
+    def _submit(self, buffer_key, records):
+        future = self._executor.submit(self._put_records, buffer_key[0], records)
+        future.add_done_callback(functools.partial(self._on_request_done, buffer_key))
+
+    def _on_request_done(self, buffer_key, future):
+        next_records = None
+
+        with self._condition:
+            self._num_pending_requests -= 1
+            self._condition.notify_all()
+
+            shard_queue = self._shard_queues.get(buffer_key)
+            if shard_queue:
+                next_records = shard_queue.popleft()
+            elif shard_queue is not None:
+                del self._shard_queues[buffer_key]
+
+        self._pending_request_slots.release()
+
+        if next_records is not None:
+            self._submit(buffer_key, next_records)
+
+    def _put_records(self, stream_path, records):
+        if not self.aggregate:
+            self._put_request(stream_path, records)
+            return
+
+        # records with many partition keys may be packed into more records than fit in a request
+        aggregated_records = v3io.dataplane.stream_aggregation.aggregate(records)
+
+        for index in range(0, len(aggregated_records), max_records_per_request):
+            self._put_request(stream_path, aggregated_records[index : index + max_records_per_request])
+
+    def _put_request(self, stream_path, records):
+        for retry in range(self.max_retries + 1):
+            if retry:
+                time.sleep(v3io.common.helpers.get_retry_interval(retry))
+
+            try:
+                response = self._context.stream.put_records(
+                    self._container_name, stream_path, records, self._access_key, compression=self.compression
+                )
+                output = response.output
+            except Exception as e:
+                failures = [(record, e) for record in records]
+                continue
+
+            if not output.failed_record_count:
+                return
+
+            failures = [(record, result) for record, result in zip(records, output.records) if result.error_code]
+            records = get_records_to_retry(records, output.records)
+
+        for record, error in failures:
+            self._report_failure(stream_path, record, error)
+
+    def _report_failure(self, stream_path, record, error):
+        # report the records that were packed into a failed aggregated record
+        if self.aggregate:
+            for sub_record in v3io.dataplane.stream_aggregation.decode_aggregated_record_data(record["data"]):
+                if "shard_id" in record:
+                    sub_record["shard_id"] = record["shard_id"]
+
+                self._on_failure(stream_path, sub_record, error)
+
+            return
+
+        self._on_failure(stream_path, record, error)
+
+    def _on_failure(self, stream_path, record, error):
+        if self.on_failure is not None:
+            self.on_failure(stream_path, record, error)
+        else:
+            self._context._logger.warn_with(
+                "Failed to put record", stream_path=stream_path, error=get_error_message(error)
+            )
+
+
+def get_record_size(record):
+    """Returns the approximate number of bytes a record adds to a put_records request"""
+    size = 64
+
+    # data and client info are sent base64 encoded, strings as utf-8
+    for name in ("data", "client_info"):
+        value = record.get(name)
+        if value is not None:
+            size += (len(_to_bytes(value)) + 2) // 3 * 4
+
+    return size + len(_to_bytes(record.get("partition_key") or ""))
+
+
+def get_records_to_retry(records, results):
+    """Returns the records of a put_records request to send again, given the results of the request - the records
+    that failed and, so that the records of a shard are put in order, the records that followed a failed record in
+    its shard. Records without a shard id are retried only if they failed"""
+    failed_shard_ids = set()
+    records_to_retry = []
+
+    for record, result in zip(records, results):
+        shard_id = record.get("shard_id")
+
+        if result.error_code or (shard_id is not None and shard_id in failed_shard_ids):
+            records_to_retry.append(record)
+
+            if shard_id is not None:
+                failed_shard_ids.add(shard_id)
+
+    return records_to_retry
+
+
+def get_error_message(error):
+    """Returns the message of an error passed to on_failure - an exception or a failed PutRecordsResult"""
+    if isinstance(error, Exception):
+        return str(error)
+
+    return f"{error.error_message} (error code {error.error_code})"
+
+
+def _to_bytes(value):
+    if isinstance(value, str):
+        return value.encode("utf-8")
+
+    return value
+
+
+class Buffer(object):
+    """The records waiting to be sent to a stream"""
+
+    def __init__(self):
+        self.records = []
+        self.num_bytes = 0
+        self.created_at = time.monotonic()
+
+    def add(self, record):
+        self.records.append(record)
+        self.num_bytes += get_record_size(record)
@@ -0,0 +1,88 @@
+# Copyright 2019 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import hashlib
+import threading
+import time
+
+
+class Router(object):
+    """Routes records to shards by hashing their partition keys on the client, so that the records of a shard can be
+    batched together and every partition key maps to the same shard for as long as the shard count doesn't change.
+    The shard count of every stream is read with describe and cached for refresh_interval seconds"""
+
+    def __init__(self, context, container_name, access_key, refresh_interval=60.0):
+        self._context = context
+        self._container_name = container_name
+        self._access_key = access_key
+        self._lock = threading.Lock()
+
+        # stream path -> (shard count, time read)
+        self._shard_counts = {}
+
+        self.refresh_interval = refresh_interval
+
+    def get_shard_count(self, stream_path):
+        """Returns the (cached) number of shards of the stream"""
+        with self._lock:
+            shard_count, read_at = self._shard_counts.get(stream_path, (None, None))
+
+        if shard_count is not None and time.monotonic() - read_at < self.refresh_interval:
+            return shard_count
+
+        response = self._context.stream.describe(self._container_name, stream_path, self._access_key)
+        shard_count = response.output.shard_count
+
+        with self._lock:
+            self._shard_counts[stream_path] = (shard_count, time.monotonic())
+
+        return shard_count
+
+    def get_shard_id(self, stream_path, partition_key):
+        """Returns the ID of the shard to which records with the partition key are routed"""
+        return get_shard_id(partition_key, self.get_shard_count(stream_path))
+
+    def route(self, stream_path, record):
+        """Returns the ID of the shard to which the record (see stream.put_records) should be put - its shard_id if
+        set, the shard of its partition key otherwise. Returns None for records that have neither, and are left for
+        the stream to place"""
+        shard_id = record.get("shard_id")
+        if shard_id is not None:
+            return shard_id
+
+        partition_key = record.get("partition_key")
+        if partition_key is None:
+            return None
+
+        return self.get_shard_id(stream_path, partition_key)
+
+    def invalidate(self, stream_path=None):
+        """Makes the router re-read the shard count of the stream (or of all streams) on next use, e.g. after the
+        stream was updated with more shards"""
+        with self._lock:
+            if stream_path is None:
+                self._shard_counts.clear()
+            else:
+                self._shard_counts.pop(stream_path, None)
+
+
+def get_shard_id(partition_key, shard_count):
+    """Returns the shard to which a partition key maps in a stream of shard_count shards. The mapping is the same
+    across processes and client versions"""
+    if isinstance(partition_key, str):
+        partition_key = partition_key.encode("utf-8")
+
+    digest = hashlib.md5(partition_key).digest()
+
+    return int.from_bytes(digest[:8], "big") % shard_count
@@ -24,6 +24,7 @@ class Transport(object):
         self._endpoint = self._get_endpoint(endpoint)
         self._timeout = timeout
         self.max_connections = max_connections or 8
+        self.json_codec = None
 
         self._set_log_method(verbosity)
 
@@ -41,7 +42,9 @@ class Transport(object):
         transport_actions = transport_actions or v3io.dataplane.transport.Actions.send_and_receive
 
         # allocate a request
-        request = v3io.dataplane.request.Request(container, access_key, raise_for_status, encoder, encoder_args, output)
+        request = v3io.dataplane.request.Request(
+            container, access_key, raise_for_status, encoder, encoder_args, output, self.json_codec
+        )
 
         # if all we had to do is encode, return now
         if transport_actions == v3io.dataplane.transport.Actions.encode_only:
@@ -50,6 +53,10 @@ class Transport(object):
         # send the request
         inflight_request = self.send_request(request)
 
+        # if all we had to do is send, return the inflight request. the caller will wait for the response later
+        if transport_actions == v3io.dataplane.transport.Actions.encode_and_send:
+            return inflight_request
+
         # wait for the response
         return self.wait_response(inflight_request)
 
@@ -59,6 +66,11 @@ class Transport(object):
     def wait_response(self, request, raise_for_status=None, num_retries=1):
         pass
 
+    def wait_readable(self, inflight_requests):
+        """Blocks until the response of at least one of the inflight requests can be read and returns its index in
+        inflight_requests. Transports that can't tell which response arrived first return the oldest request"""
+        return 0
+
     @staticmethod
     def _get_endpoint(endpoint):
         if endpoint is None:
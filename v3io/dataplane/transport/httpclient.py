@@ -12,8 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import functools
 import http.client
 import queue
+import selectors
 import socket
 import ssl
 import sys
@@ -103,21 +105,35 @@ class Transport(abstract.Transport):
                     connection = request.transport.connection_used
 
                 response = connection.getresponse()
-                response_body = response.read()
-
                 status_code, headers = self._get_status_and_headers(response)
 
+                if request.stream_body and 200 <= status_code < 300:
+                    response_body = v3io.dataplane.response.BodyStream(
+                        response, functools.partial(self._release_connection, connection)
+                    )
+                elif request.body_buffer is not None and 200 <= status_code < 300:
+                    response_body = self._read_body_into(response, request.body_buffer)
+                else:
+                    response_body = response.read()
+
                 self.log("Rx", connection=connection, status_code=status_code, body=response_body)
 
-                response = v3io.dataplane.response.Response(request.output, status_code, headers, response_body)
+                response = v3io.dataplane.response.Response(
+                    request.output, status_code, headers, response_body, request.json_codec
+                )
 
-                self._free_connections.put(connection, block=True)
+                # streamed bodies return the connection once they're drained or closed
+                if not isinstance(response_body, v3io.dataplane.response.BodyStream):
+                    self._free_connections.put(connection, block=True)
 
                 response.raise_for_status(request.raise_for_status or raise_for_status)
 
                 return response
 
             except v3io.dataplane.response.HttpResponseError as response_error:
+                if isinstance(response_body, v3io.dataplane.response.BodyStream):
+                    response_body.close()
+
                 self._logger.warn_with(f"Response error: {response_error}")
                 raise response_error
             except BaseException as e:
@@ -146,6 +162,53 @@ class Transport(abstract.Transport):
             num_retries -= 1
             is_retry = True
 
+    def wait_readable(self, inflight_requests):
+        selector = selectors.DefaultSelector()
+
+        try:
+            for index, request in enumerate(inflight_requests):
+                sock = request.transport.connection_used.sock
+
+                # a closed connection will fail (and be retried) in wait_response, and a TLS connection may already
+                # hold a decrypted response that select() can't see - don't block on either
+                if sock is None or (isinstance(sock, ssl.SSLSocket) and sock.pending()):
+                    return index
+
+                selector.register(sock, selectors.EVENT_READ, index)
+
+            # if several responses arrived together, prefer the oldest request
+            return min(key.data for key, _ in selector.select())
+        finally:
+            selector.close()
+
+    def _release_connection(self, connection, drained):
+        # a connection whose response wasn't read to its end can't be reused
+        if not drained:
+            connection.close()
+            connection = self._create_connection(self._host, self._ssl_context)
+
+        self._free_connections.put(connection, block=True)
+
+    @staticmethod
+    def _read_body_into(response, body_buffer):
+        body_view = memoryview(body_buffer).cast("B")
+        length = response.length
+
+        # bodies of unknown length or that don't fit are read as usual
+        if length is None or length > len(body_view):
+            return response.read()
+
+        num_bytes_read = 0
+
+        while num_bytes_read < length:
+            num_bytes = response.readinto(body_view[num_bytes_read:length])
+            if not num_bytes:
+                raise http.client.IncompleteRead(bytes(body_view[:num_bytes_read]), length - num_bytes_read)
+
+            num_bytes_read += num_bytes
+
+        return body_view[:length]
+
     def _send_request_on_connection(self, request, connection):
         request.transport.connection_used = connection
 
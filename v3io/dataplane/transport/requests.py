@@ -44,12 +44,15 @@ class Transport(abstract.Transport):
         return request
 
     def wait_response(self, request, raise_for_status=None, num_retries=1):
+        http_response = request.transport.http_response
+
         # create a response
         response = v3io.dataplane.response.Response(
             request.output,
-            request.transport.http_response.status_code,
-            request.headers,
-            request.transport.http_response.content,
+            http_response.status_code,
+            http_response.headers,
+            http_response.content,
+            request.json_codec,
         )
 
         # enforce raise for status